@@ -14,7 +14,21 @@ from .kgfirm import KGFirm
 from .bank import Bank
 from .household import Household
 from .bookkeeper import Bookkeeper, FirmBookkeeper, CGFirmBookkeeper, HHBookkeeper
-from .goods import Good, ConsumptionGood, CapitalGood, Labor, Loan
+from .goods import Good, ConsumptionGood, CapitalGood, Labor, Loan, PartialFill
+from .goods import GoodType, GoodCategory, GoodConsume
+from .goods_store import GoodsStore
+from .ledger import Ledger
+from .journal import TransactionJournal
+from .clock import SimulationClock
+from .indexed_dict import IndexedDict
+from .workforce import Workforce
+from .capital_stock import CapitalStock
+from .loan_book import LoanBook, LoanIdAllocator
+from .snapshot import save_snapshot, load_snapshot
+from .cgfirm_sector import CGFirmSector
+from .household_sector import HouseholdSector
+from .rng import RNGService, RNGStream
+from .equation_graph import EquationGraph, EquationValues
 
 
 
@@ -27,5 +41,11 @@ __copyright__ = 'Copyright %s Ecos_p Team' % datetime.date.today().year
 
 __all__ = ["EconomicAgent", "Household", "Firm", "CGFirm", "KGFirm", 
            "Bank", "Bookkeeper", "FirmBookkeeper", "CGFirmBookkeeper",  "HHBookkeeper",
-           "Good", "ConsumptionGood", "CapitalGood", "Labor", "Loan"]
+           "Good", "ConsumptionGood", "CapitalGood", "Labor", "Loan", "PartialFill",
+           "GoodType", "GoodCategory", "GoodConsume", "GoodsStore", "Ledger", "TransactionJournal",
+           "SimulationClock",
+           "IndexedDict", "Workforce", "CapitalStock", "LoanBook",
+           "LoanIdAllocator", "save_snapshot", "load_snapshot",
+           "CGFirmSector", "HouseholdSector", "RNGService", "RNGStream",
+           "EquationGraph", "EquationValues"]
 
@@ -89,8 +89,8 @@ class EconomicAgent(DiscreteEventAgent):
     def select_deposit_bank(self):
         """Economic Agent select deposit bank"""
 
-    def pay(self, seller, quantity):
-        self.bookkeeper.pay(seller, quantity)
+    def pay(self, seller, quantity, category=None):
+        self.bookkeeper.pay(seller, quantity, category)
 
     def receive(self, quantity):
         self.bookkeeper.receive(quantity)
@@ -1,7 +1,14 @@
 
-from .goods import CapitalGood, Cash, Loan, Labor
+from .goods import CapitalGood, Cash, Loan, Labor, GoodCategory
+from .ledger import ASSET, LIABILITY
+from .capital_stock import CapitalStock
+from .loan_book import LoanBook, AGGREGATE_LOAN_ID
 
 class BalanceSheet:
+
+    # economy-wide Ledger in use, see ledger.py
+    ledger = None
+
     def __init__(self, bookkeeper,  assets=None, liabilities=None, cash=None):
         """
         Initialize a BalanceSheet instance.
@@ -15,8 +22,8 @@ class BalanceSheet:
         """
         self.bk = bookkeeper
         
-        self.capital_stock = {}
-        self.loans = {}
+        self.capital_stock = CapitalStock()
+        self.loans = LoanBook()
         self.transactions = {}
 
         if assets is not None:
@@ -40,6 +47,19 @@ class BalanceSheet:
            my_cash = Cash(c_quantity=0.0)
         self.assets[my_cash.c_name] = my_cash
 
+        self.ledger_row = None
+        if self.ledger is not None:
+            self.ledger.attach(self)
+
+    def _book(self, name, a_good, side):
+        """Book a new entry in the ledger, if any"""
+        if self.ledger_row is not None:
+            self.ledger.post(self.ledger_row, name, a_good, side)
+
+    def _unbook(self, name, a_good, side):
+        """Remove an entry from the ledger, if any"""
+        if self.ledger_row is not None:
+            self.ledger.unpost(self.ledger_row, name, a_good, side)
 
    
 
@@ -64,6 +84,7 @@ class BalanceSheet:
             existing_asset.c_price = (existing_asset.c_price + asset.c_price) / 2
         else:
             self.assets[asset.c_name] = asset
+            self._book(asset.c_name, asset, ASSET)
 
     def exclude_asset(self, asset):
         """
@@ -73,10 +94,34 @@ class BalanceSheet:
             asset (Good): The asset to be excluded.
         """
         if asset.c_name in self.assets:
-            del self.assets[asset.c_name]
+            self._unbook(asset.c_name, self.assets.pop(asset.c_name), ASSET)
         else:
             raise ValueError("Asset not found in balance sheet.")
 
+    def restore_entries(self, assets, liabilities):
+        """
+        Replaces all the assets and liabilities (e.g. from a snapshot).
+
+        The old entries are unbooked and the new ones booked, so an
+        active ledger follows the restored balance sheet.
+
+        Args:
+            assets (dict): {name: Good} of the assets
+            liabilities (dict): {name: Good} of the liabilities
+        """
+        for name, a_good in self.assets.items():
+            self._unbook(name, a_good, ASSET)
+        for name, a_good in self.liabilities.items():
+            self._unbook(name, a_good, LIABILITY)
+        self.assets.clear()
+        self.liabilities.clear()
+        for name, a_good in assets.items():
+            self.assets[name] = a_good
+            self._book(name, a_good, ASSET)
+        for name, a_good in liabilities.items():
+            self.liabilities[name] = a_good
+            self._book(name, a_good, LIABILITY)
+
 
     #################################
     ### Labor
@@ -129,8 +174,11 @@ class BalanceSheet:
 
     def create_labor_capacity(self, labor):
 
-        if labor.c_category == "w":
+        if labor.c_category == GoodCategory.W:
+            if "labor" in self.assets:
+                self._unbook("labor", self.assets["labor"], ASSET)
             self.assets['labor'] = labor
+            self._book("labor", labor, ASSET)
         else:
             raise ValueError("object needs to be from Labor class")
 
@@ -167,6 +215,7 @@ class BalanceSheet:
             existing_liability.c_price = (existing_liability.c_price + liability.c_price) / 2
         else:
             self.liabilities[liability.c_name] = liability
+            self._book(liability.c_name, liability, LIABILITY)
 
     def exclude_liability(self, liability):
         """
@@ -176,7 +225,7 @@ class BalanceSheet:
             liability (Loan): The liability to be excluded.
         """
         if liability.c_name in self.assets:
-            del self.liabilities[liability.c_name]
+            self._unbook(liability.c_name, self.liabilities.pop(liability.c_name), LIABILITY)
         else:
             raise ValueError("Liability not found in balance sheet.")
 
@@ -207,6 +256,7 @@ class BalanceSheet:
             self.assets["cash"].c_quantity += cash
         else:
             self.assets["cash"] = Cash(c_quantity=cash)
+            self._book("cash", self.assets["cash"], ASSET)
 
 
     def have_money(self, quantity):
@@ -258,33 +308,44 @@ class BalanceSheet:
     ### Loans
     #################################
 
-    def include_loan(self, loan):
+    def include_loan(self, loan, n_term=None):
         """
         Adds a loan to the balance sheet.
         Parameters:
         loan (Loan): The loan to be added. Must be an instance of the Loan class.
+        n_term (int, optional): Number of terms, loan.n_term if not given.
         Raises:
         TypeError: If the loan is not an instance of the Loan class.
-        NameError: If the loan is already present in the loans dictionary.
+        NameError: If the loan is already present in the loan book.
         Updates:
-        - Adds the loan to the loans dictionary using the loan's c_name as the key.
-        - Updates the liabilities dictionary by adding the loan amount to the existing 
-        "loan" liability or creating a new "loan" liability if it does not exist.
+        - Books the loan and its amortization schedule in the loan book.
+        - Updates the "loan" liability to the principal outstanding.
         """
 
         if not isinstance(loan, Loan):
             raise TypeError("loan must be an instance of the Loan class")
-        
-        if loan.date_contract in self.loans:
-            raise NameError("This loan is already in the loans dict")
-        else:
-            self.loans[loan.date_contract] = loan
+        if n_term is None and loan.n_term is None:
+            raise ValueError("The number of terms of the loan is not set")
+
+        self.loans.book(loan, loan.c_id, n_term)
+        self.update_loan_liability()
 
+    def update_loan_liability(self):
+        """Set the "loan" liability from the loan book
 
+        Nothing is booked while the agent never had a loan.
+        """
+        if not self.loans and "loan" not in self.liabilities:
+            return
+        outstanding = self.loans.outstanding()
         if "loan" in self.liabilities:
-            self.liabilities["loan"].l_quantity += loan
+            self.liabilities["loan"].c_quantity = outstanding
+            self.liabilities["loan"].c_price = self.loans.mean_rate()
         else:
-            self.liabilities["loan"] = Loan(l_quantity=loan)
+            self.liabilities["loan"] = Loan(c_quantity=outstanding,
+                                            c_price=self.loans.mean_rate(),
+                                            c_id=AGGREGATE_LOAN_ID)
+            self._book("loan", self.liabilities["loan"], LIABILITY)
 
 
     def exclude_loan(self, loan):
@@ -294,39 +355,38 @@ class BalanceSheet:
         loan (Loan): The loan to be excluded. Must be an instance of the Loan class.
         Raises:
         TypeError: If the loan is not an instance of the Loan class.
-        NameError: If the loan is not present in the loans dictionary.
+        NameError: If the loan is not present in the loan book.
         Updates:
-        - Removes the loan from the loans dictionary using the loan's c_name as the key.
-        - Updates the liabilities dictionary by subtracting the loan amount from the existing 
-        "loan" liability or removing the "loan" liability if the amount becomes zero.
+        - Removes the loan from the loan book.
+        - Updates the "loan" liability to the principal outstanding.
         """
         
         if not isinstance(loan, Loan):
             raise TypeError("loan must be an instance of the Loan class")
         
-        if loan.c_name not in self.loans:
+        if loan.c_id not in self.loans:
             raise NameError("This loan is not in the loans dict")
         else:
-            del self.loans[loan.c_name]
+            self.loans.remove(loan.c_id)
 
-        if "loan" in self.liabilities:
-            self.liabilities["loan"].l_quantity -= loan.l_quantity
-            if self.liabilities["loan"].l_quantity <= 0:
-                self.liabilities["loan"].l_quantity = 0 ### check consistency of this
+        self.update_loan_liability()
 
 
     def loan_costs(self, eta):
         """Return the total loan costs
 
+        The interest and principal due in the period come from the
+        amortization schedules of the loan book.
+
         Returns:
             float: The sum of the loan costs by period.
         """
-        Lp_ct = 0.0
+        return self.loans.total_due()
 
-        for loan in self.loans:
-            Lp_ct += loan.one_term_ammount()
-
-        return Lp_ct        
+    def close_loan_period(self):
+        """Records the terms due in the period and moves the loan book on"""
+        self.loans.advance()
+        self.update_loan_liability()
 
 
     ##############################
@@ -343,50 +403,60 @@ class BalanceSheet:
         TypeError: If the provided capital is not an instance of the CapitalGood class.
         NameError: If the equipment is already present in the capital_stock.
         Updates:
-        - Adds the equipment to the capital_stock dictionary using the equipment's name as the key.
-        - Updates the liabilities under "capital" by increasing the quantity if a loan exists in assets,
-          otherwise, it creates a new CapitalGood entry in liabilities with the provided capital.
+        - Adds the equipment to the capital_stock vintage table using its c_id.
+        - Updates the "capital" asset, whose quantity is the quantity of the
+          capital stock and whose price is its average price.
         """
 
         if not isinstance(equipment, CapitalGood):
             raise TypeError("Equipment must be an instance of the CapitalGood class")
         
-        if equipment.c_name in self.capital_stock:
-            raise NameError("This equipment is already in the capital_stock")
-        else:
-            self.capital_stock[equipment.id] = equipment
+        self.capital_stock.add(equipment)
+        self.update_capital_asset()
 
+    def update_capital_asset(self):
+        """Set the "capital" asset from the capital stock"""
+        quantity = self.capital_stock.total_quantity()
+        price = self.capital_stock.value / quantity if quantity > 0 else 0.0
         if "capital" in self.assets:
-            self.assets["capital"].l_quantity += equipment
+            self.assets["capital"].c_quantity = quantity
+            self.assets["capital"].c_price = price
         else:
-            self.assets["capital"] = CapitalGood(l_quantity=equipment)
+            self.assets["capital"] = CapitalGood(c_quantity=quantity, c_price=price)
+            self._book("capital", self.assets["capital"], ASSET)
+
+    def depreciate_capital(self, kappa):
+        """
+        Ages the capital stock one period and scraps the machines older than kappa.
+
+        Returns:
+            list: The scrapped machines.
+        """
+        scrapped = self.capital_stock.depreciate(kappa)
+        if scrapped:
+            self.update_capital_asset()
+        return scrapped
 
 
     def last_id(self):
         """
-        Retrieve the c_id of the last item in the capital_stock dictionary.
+        Retrieve the last c_id given in the capital stock.
 
         Returns:
-            int: The c_id of the last item in the capital_stock dictionary.
+            int: The last c_id of the capital stock, 0 if it is empty.
         """
-        if self.capital_stock:
-            return list(self.capital_stock.values())[-1].c_id
-        else:
-            return 0
+        return self.capital_stock.last_id()
 
 
     def capital_costs(self, kappa):
         """
         Calculate the total capital costs.
-        This method iterates over the capital stock and calculates the total cost
-        by summing the product of the quantity and price of each capital good.
+        The total value (quantity * price) of the capital stock is kept
+        up to date by the vintage table, so the cost is one division.
         Returns:
             float: The total capital costs.
         """
-        return sum(
-                    (capital_good.c_quantity * capital_good.c_price) / kappa 
-                     for capital_good in self.capital_stock.values()
-                     ) 
+        return self.capital_stock.capital_costs(kappa)
 
 
 
@@ -401,8 +471,14 @@ class BalanceSheet:
     def add_liability(self, name, value):
         self.liabilities[name] = value
 
-    def add_capital_stock(self, name, value):
-        self.capital_stock[name] = value
+    def add_capital_stock(self, k_good, productivity=1.0):
+        """Add a machine to the capital stock, with a new c_id if it has none"""
+        if not isinstance(k_good, CapitalGood):
+            raise TypeError("Equipment must be an instance of the CapitalGood class")
+        if not k_good.c_id:
+            k_good.c_id = self.capital_stock.next_id()
+        self.capital_stock.add(k_good, productivity)
+        self.update_capital_asset()
 
     def generate_report(self):
         report = "Balance Sheet Report\n"
@@ -410,22 +486,22 @@ class BalanceSheet:
         
         report += "Assets:\n"
         for name, value in self.assets.items():
-            report += f"{name}: ${value}\n"
+            report += f"{name}: ${_amount(value)}\n"
         report += "\n"
 
         report += "Liabilities:\n"
         for name, value in self.liabilities.items():
-            report += f"{name}: ${value}\n"
+            report += f"{name}: ${_amount(value)}\n"
         report += "\n"
 
         report += "Capital Stock:\n"
-        for name, value in self.capital_stock.items():
-            report += f"{name}: ${value}\n"
+        for k_good in self.capital_stock.values():
+            report += f"{k_good.c_id}: ${k_good.ammount()}\n"
         report += "\n"
 
-        total_assets = sum(self.assets.values())
-        total_liabilities = sum(self.liabilities.values())
-        total_capital_stock = sum(self.capital_stock.values())
+        total_assets = sum(_amount(value) for value in self.assets.values())
+        total_liabilities = sum(_amount(value) for value in self.liabilities.values())
+        total_capital_stock = self.capital_stock.value
         
         report += f"Total Assets: ${total_assets}\n"
         report += f"Total Liabilities: ${total_liabilities}\n"
@@ -434,9 +510,16 @@ class BalanceSheet:
 
         return report
 
+
+def _amount(value):
+    """Value of an entry of the report, a good or a number"""
+    if hasattr(value, "ammount"):
+        return value.ammount()
+    return value
+
 # Example usage:
-# balance_sheet = BalanceSheet()
+# balance_sheet = BalanceSheet(None)
 # balance_sheet.add_asset("Cash", 10000)
 # balance_sheet.add_liability("Loan", 5000)
-# balance_sheet.add_capital_stock("Common Stock", 2000)
+# balance_sheet.add_capital_stock(CapitalGood(c_quantity=2.0, c_price=1000.0))
 # print(balance_sheet.generate_report())
\ No newline at end of file
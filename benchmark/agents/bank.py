@@ -27,6 +27,8 @@ Todo:
 
 from .agents import EconomicAgent
 from .equations import Equations
+from .goods import Loan
+from .loan_book import LoanBook
 import random as rnd
 
 
@@ -34,7 +36,10 @@ class Bank(EconomicAgent):
     """ Bank Agent """
     def __init__(self, simulation, scenario, agent_number, agent_def):
         super().__init__(simulation, scenario, agent_number, agent_def)
-        self.eq = Equations(self.active_scenario)
+        self.eq = Equations(self.active_scenario, self)
+        self.loan_book = LoanBook()
+        self.interest_on_loans = 0.0
+        self.principal_on_loans = 0.0
         
 
         ## Bank Variables:
@@ -54,7 +59,15 @@ class Bank(EconomicAgent):
         self.zet = self.eq.zet(self.zt, self.zet_1)
 
     def compute_interest_loans(self):
-        """ Bank Compute the interest on loans """
+        """ Bank Compute the interest on loans
+
+            The interest and principal due by all the loans granted
+            come from the amortization schedules of the loan book.
+        """
+        _, interest, principal = self.loan_book.due()
+        self.interest_on_loans = float(interest.sum())
+        self.principal_on_loans = float(principal.sum())
+        self.loan_book.advance()
 
 
     def compute_interest_deposits(self):
@@ -66,6 +79,35 @@ class Bank(EconomicAgent):
     def supply_credit(self):
         """ Bank supply demanded credit """    
 
+    def grant_loan(self, borrower, quantity, rate, n_term):
+        """ Bank grants a loan to a borrower
+
+        The principal is paid first, the loan is only booked (in the
+        loan book of the bank and of the borrower) if the bank has the
+        cash.
+
+        Args:
+            borrower (Firm): the borrower, with a bookkeeper with add_loan
+            quantity (float): principal of the loan
+            rate (float): interest rate per term
+            n_term (int): number of terms
+
+        Returns:
+            Loan: the loan granted, None if the bank cannot pay it
+        """
+        if not self.bookkeeper.balance_sheet.have_money(quantity):
+            return None
+        a_loan = Loan(c_quantity=quantity,
+                      c_price=rate,
+                      c_owner=borrower,
+                      c_producer=self,
+                      n_term=n_term)
+        if not self.bookkeeper.pay(borrower, quantity, a_loan.c_category):
+            return None
+        self.loan_book.book(a_loan, a_loan.c_id)
+        borrower.bookkeeper.add_loan(a_loan)
+        return a_loan
+
     def pay_interest(self):
         """ Bank pays interest on deposits """
         
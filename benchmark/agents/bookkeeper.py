@@ -1,7 +1,9 @@
 # -*- coding: utf-8 -*-
-from .goods import ConsumptionGood, Cash
+import math
+
+from .goods import ConsumptionGood, Cash, GoodCategory
 from .balance_sheet import BalanceSheet
-import random
+from .workforce import Workforce
 
 class Bookkeeper:
     """
@@ -28,6 +30,9 @@ class Bookkeeper:
         receive(self, quantity): Receives a specified amount of money.
     """
 
+    # TransactionJournal in use, see journal.py
+    journal = None
+
 
     def __init__(self, owner, assets=None, liabilities=None, cash=None):
         self.owner = owner
@@ -35,6 +40,7 @@ class Bookkeeper:
 
         
         self.offer = None
+        self.posted_offer = None
         
             
 
@@ -89,19 +95,23 @@ class Bookkeeper:
             raise ValueError("Cash not found in Balance Sheet")
 
 
-    def pay(self, an_agent, quantity):
+    def pay(self, an_agent, quantity, category=None):
         """
         Pays a specified amount to another agent.
 
         Args:
             an_agent_balance_sheet (Bookkeeper): The balance sheet of the agent to pay.
             quantity: The amount of money to pay.
+            category (GoodCategory, optional): What is paid, recorded in
+                the transaction journal.
 
         Returns:
             bool: True if the payment was successful, False otherwise.
         """
         if self.balance_sheet.pay(an_agent, quantity):
             an_agent.bookkeeper.receive(quantity)
+            if self.journal is not None:
+                self.journal.record(self.owner, an_agent, quantity, category)
             return True
         else:
             return False        
@@ -125,8 +135,33 @@ class Bookkeeper:
 
       
     def set_offer(self, space, offer):
+        """
+        Posts an offer in a market.
+
+        If the market keeps a persistent book, the offer only touches
+        the book when it changed since it was last posted: an offer
+        with no quantity left is cancelled and a changed offer is
+        amended.
+
+        Args:
+            space (Market): The market where the offer is posted.
+            offer (Good): The good being offered.
+        """
+        if not space.is_persistent():
+            self.offer = offer
+            space.set_offer(self.owner, self.offer)
+            return
+
+        posted = (space.name, offer.c_quantity, offer.c_price)
+        if (offer is self.offer and posted == self.posted_offer
+                and space.has_offer_from(self.owner)):
+            return
         self.offer = offer
-        space.set_offer(self.owner, self.offer)
+        self.posted_offer = posted
+        if offer.c_quantity > 0:
+            space.amend_offer(self.owner, offer)
+        else:
+            space.cancel_offer(self.owner)
 
 
     def offer_accepted(self,
@@ -134,7 +169,7 @@ class Bookkeeper:
                        buyer, 
                        ):
         
-        buyer.bookkeeper.pay(self.owner, self.offer.ammount())
+        buyer.bookkeeper.pay(self.owner, self.offer.ammount(), self.offer.c_category)
         self.offer.c_owner = buyer
         buyer.bookkeeper.got_good(self.offer)
         self.owner.got_contract(market, self.offer, buyer)
@@ -146,7 +181,7 @@ class Bookkeeper:
                                  an_offer 
                        ):
         
-        buyer.bookkeeper.pay(self.owner, an_offer.ammount())
+        buyer.bookkeeper.pay(self.owner, an_offer.ammount(), an_offer.c_category)
         an_offer.c_owner = buyer
         buyer.bookkeeper.got_good(an_offer)
         self.offer.c_quantity -= an_offer.c_quantity
@@ -155,14 +190,93 @@ class Bookkeeper:
 
 
 
+    @staticmethod
+    def settle_fills(market, fills):
+        """
+        Settles all the fills of a market round in one pass.
+
+        Each fill sells ``quantity`` units of the current offer of the
+        seller to the buyer at ``price``, the price of the good sold.
+        The cash goods of the agents are looked up once per round and
+        updated in place, so a fill costs one transfer instead of the
+        pay / receive / got_good / got_contract / release_offer chain
+        of ``offer_accepted``. A fill that takes the whole remaining
+        offer (up to rounding of the allocated quantities) is a full
+        acceptance, any other fill is a partial acceptance.
+
+        A buyer short of cash only takes the quantity it can pay for
+        (nothing if it has no cash left), the rest stays with the
+        seller.
+
+        Args:
+            market (Market): The market where the fills were matched.
+            fills (list): (seller, buyer, quantity, price) tuples, in
+                matching order.
+
+        Returns:
+            tuple: The accepted offers of each buyer,
+                ``{buyer: {seller.name: good}}``, and the quantity the
+                buyers short of cash could not take, ``{buyer: quantity}``.
+        """
+        cash = {}
+        accepted = {}
+        rationed = {}
+        journal = Bookkeeper.journal
+
+        for seller, buyer, quantity, price in fills:
+            buyer_cash = cash.get(buyer)
+            if buyer_cash is None:
+                buyer_cash = cash[buyer] = buyer.bookkeeper.balance_sheet.assets["cash"]
+            seller_cash = cash.get(seller)
+            if seller_cash is None:
+                seller_cash = cash[seller] = seller.bookkeeper.balance_sheet.assets["cash"]
+
+            value = quantity * price
+            if value > buyer_cash.c_quantity:
+                value = max(buyer_cash.c_quantity, 0.0)
+                affordable = value / price
+                rationed[buyer] = rationed.get(buyer, 0.0) + quantity - affordable
+                quantity = affordable
+                if quantity <= 0.0:
+                    continue
+            buyer_cash.c_quantity -= value
+            seller_cash.c_quantity += value
+            if journal is not None:
+                journal.record(buyer, seller, value, seller.bookkeeper.offer.c_category)
+
+            offer = seller.bookkeeper.offer
+            if quantity >= offer.c_quantity or math.isclose(quantity, offer.c_quantity):
+                offer.c_price = price
+                offer.c_owner = buyer
+                buyer.bookkeeper.got_good(offer)
+                seller.got_contract(market, offer, buyer)
+                seller.release_offer(market, offer)
+                seller.has_offer = False
+                a_good = offer
+            else:
+                a_good = market.set_partial_offer(offer, quantity)
+                a_good.c_price = price
+                a_good.c_owner = buyer
+                buyer.bookkeeper.got_good(a_good)
+                offer.c_quantity -= quantity
+                seller.got_partial_contract(market, offer, buyer)
+
+            buyer_offers = accepted.get(buyer)
+            if buyer_offers is None:
+                buyer_offers = accepted[buyer] = {}
+            buyer_offers[seller.name] = a_good
+
+        return accepted, rationed
+
+
     def get_accepted_offers(self, accepted_offers):
 
         first_offer = next(iter(accepted_offers.values()))
-        if first_offer.c_category == "kg":
+        if first_offer.c_category == GoodCategory.KG:
             self.add_to_capital_stock(accepted_offers)
-        elif first_offer.c_category == "w":
+        elif first_offer.c_category == GoodCategory.W:
             self.add_to_workforce(accepted_offers)
-        # elif first_offer.c_category == "l":
+        # elif first_offer.c_category == GoodCategory.L:
         #     self.add_to_loans(accepted_offers)
 
 
@@ -173,63 +287,74 @@ class FirmBookkeeper(Bookkeeper):
     def __init__(self, owner, assets=None, liabilities=None, cash=None):
             super().__init__(owner, assets, liabilities, cash)
 
-            self.workforce = {}
+            self.workforce = Workforce()
             self.capital_stock = {}
+            # wage of each worker at hire time and their running total
+            self.wages = {}
+            self.wage_bill = 0.0
                 
 
     def add_to_capital_stock(self, accepted_offers):
 
-        id = self.balance_sheet.last_id()
+        capital_stock = self.balance_sheet.capital_stock
 
         for k_good in accepted_offers.values():
-            id = id+1
-            k_good.c_id = id
+            k_good.c_id = capital_stock.next_id()
             k_good.c_owner = self.owner
             self.balance_sheet.add_equipment(k_good)
 
+    def depreciate_capital(self, kappa):
+        """Age the capital stock and scrap the machines older than kappa"""
+        return self.balance_sheet.depreciate_capital(kappa)
+
     def add_to_workforce(self, accepted_offers):
  
         for labor in accepted_offers.values():
             labor.c_owner = self.owner
             worker = labor.c_producer
+            if worker in self.wages:
+                self.wage_bill -= self.wages[worker]
             self.workforce[worker] = labor
+            wage = labor.ammount()
+            self.wages[worker] = wage
+            self.wage_bill += wage
             self.balance_sheet.add_labor(labor)
             worker.is_employed()
 
+    def remove_from_workforce(self, worker):
+        """Remove a worker and its wage from the workforce"""
+        labor = self.workforce.pop(worker)
+        self.wage_bill -= self.wages.pop(worker)
+        if not self.workforce:
+            # no rounding residue in an empty wage bill
+            self.wage_bill = 0.0
+        self.balance_sheet.reduce_labor(labor)
+        worker.is_unemployed()
+
     def lay_off(self, N_ct):
-        N_ct = int(N_ct)
-        for _ in range(N_ct):
-            if len(self.workforce) > 0:
-                worker = random.choice(list(self.workforce.keys()))
-                labor = self.workforce.pop(worker)
-                self.balance_sheet.reduce_labor(labor)
-                worker.is_unemployed()
+        for worker in self.workforce.sample_without_replacement(int(N_ct)):
+            self.remove_from_workforce(worker)
         
 
     def lay_off_from_turnover(self, upsilon):
         lay_offs = int(len(self.workforce) * upsilon)
-        lay_offs = int(lay_offs)
-        for _ in range(lay_offs):
-            worker = random.choice(list(self.workforce.keys()))
-            labor = self.workforce.pop(worker)
-            self.balance_sheet.reduce_labor(labor)
-            worker.is_unemployed()
+        for worker in self.workforce.sample_without_replacement(lay_offs):
+            self.remove_from_workforce(worker)
 
     
     def pay_wages(self):
         # NOTE: Salários negativos ou zero e muito grandes. Checar.
 
-        for worker, labor in self.workforce.items():
-            wage = labor.ammount()
-            self.pay(worker, wage)
+        for worker, wage in self.wages.items():
+            self.pay(worker, wage, GoodCategory.W)
      
     def labor_costs(self):
-        """Calculate labor costs"""
-        W_ct = 0
-        for worker, labor in self.workforce.items():
-            W_ct += labor.ammount()
-            
-        return W_ct
+        """Calculate labor costs
+
+        The wages are taken when the workers are hired and their total
+        is kept up to date by the hiring and lay off methods.
+        """
+        return self.wage_bill
     
     def workforce_size(self):
         """Size of the workforce in the firm"""
@@ -246,9 +371,21 @@ class CGFirmBookkeeper(FirmBookkeeper):
         super().__init__(owner, assets, liabilities, cash)
 
 
-    def add_loan(self, a_loan):
+    def add_loan(self, a_loan, n_term=None):
+
+        self.balance_sheet.include_loan(a_loan, n_term)
 
-        self.balance_sheet.include_loan(a_loan)
+    def pay_loans(self):
+        """Pay the interest and principal due on the loans to the lenders"""
+        loans = self.balance_sheet.loans
+        if loans:
+            rows, interest, principal = loans.due()
+            for row, i_due, p_due in zip(rows, interest, principal):
+                lender = loans.loans[row].c_producer
+                if lender is not None:
+                    self.pay(lender, float(i_due), GoodCategory.IL)
+                    self.pay(lender, float(p_due), GoodCategory.L)
+        self.balance_sheet.close_loan_period()
 
 
     def loan_costs(self, eta):
@@ -286,13 +423,13 @@ class HHBookkeeper(Bookkeeper):
 
     def got_good(self, a_good):
 
-        if a_good.c_category == "l":
+        if a_good.c_category == GoodCategory.L:
             self.include_liability(a_good)
-        elif a_good.c_category == "cg":
+        elif a_good.c_category == GoodCategory.CG:
             self.add_consumption_goods(a_good)
-        elif a_good.c_category == "w":
+        elif a_good.c_category == GoodCategory.W:
             self.add_labor(a_good)
-        elif a_good.c_category == "k":
+        elif a_good.c_category == GoodCategory.K:
             self.include_asset(a_good)
         else: 
             raise ValueError("Asset must be a Good")
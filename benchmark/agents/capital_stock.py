@@ -0,0 +1,140 @@
+""" Capital stock
+
+This module implements the capital stock of a firm as a vintage
+table. Every machine (a ``CapitalGood`` bought by the firm) is one row
+of NumPy arrays with its id, quantity, price, age and productivity, so
+ageing, scrapping and costing the whole stock are array operations.
+
+The ids are given by a counter, so the next id is O(1), and the value
+(quantity * price) of the stock is kept as a running total.
+
+Example:
+
+    stock = CapitalStock()
+    k_good.c_id = stock.next_id()
+    stock.add(k_good)
+    costs = stock.capital_costs(kappa)
+    stock.depreciate(kappa)      # one period older, scrap the old ones
+
+Todo:
+
+"""
+
+import numpy as np
+
+
+class CapitalStock:
+    """Vintage table of the machines of a firm
+
+    Args:
+        capacity (int): initial number of rows, the arrays double
+            when they are full.
+    """
+
+    def __init__(self, capacity=16):
+        capacity = max(1, int(capacity))
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.quantity = np.zeros(capacity)
+        self.price = np.zeros(capacity)
+        self.age = np.zeros(capacity, dtype=np.int64)
+        self.productivity = np.zeros(capacity)
+        self.size = 0
+        self.value = 0.0
+        self.goods = []
+        self._last_id = 0
+        self._rows = {}
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, c_id):
+        return c_id in self._rows
+
+    def __getitem__(self, c_id):
+        return self.goods[self._rows[c_id]]
+
+    def __iter__(self):
+        return iter(list(self.ids[:self.size]))
+
+    def values(self):
+        return list(self.goods)
+
+    def next_id(self):
+        """Return a new machine id"""
+        self._last_id += 1
+        return self._last_id
+
+    def last_id(self):
+        """Return the last machine id given"""
+        return self._last_id
+
+    def _grow(self):
+        capacity = 2 * self.ids.size
+        for column in ("ids", "quantity", "price", "age", "productivity"):
+            old = getattr(self, column)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:old.size] = old
+            setattr(self, column, new)
+
+    def add(self, k_good, productivity=1.0):
+        """Add a machine to the stock
+
+        Args:
+            k_good (CapitalGood): the machine, with its c_id set
+            productivity (float): productivity of the machine
+
+        Raises:
+            NameError: If a machine with the same id is in the stock.
+        """
+        c_id = k_good.c_id
+        if c_id in self._rows:
+            raise NameError("This equipment is already in the capital_stock")
+        if self.size == self.ids.size:
+            self._grow()
+        row = self.size
+        self.ids[row] = c_id
+        self.quantity[row] = k_good.c_quantity
+        self.price[row] = k_good.c_price
+        self.age[row] = 0
+        self.productivity[row] = productivity
+        self.goods.append(k_good)
+        self._rows[c_id] = row
+        self._last_id = max(self._last_id, c_id)
+        self.size += 1
+        self.value += k_good.c_quantity * k_good.c_price
+
+    def total_quantity(self):
+        """Quantity of capital in the stock"""
+        return float(self.quantity[:self.size].sum())
+
+    def capacity(self):
+        """Productive capacity (quantity * productivity) of the stock"""
+        n = self.size
+        return float(np.dot(self.quantity[:n], self.productivity[:n]))
+
+    def capital_costs(self, kappa):
+        """Capital costs: the value of the stock spread over kappa periods"""
+        return self.value / kappa
+
+    def depreciate(self, kappa):
+        """Age the stock one period and scrap the machines older than kappa
+
+        Returns:
+            list: the scrapped machines (CapitalGood)
+        """
+        n = self.size
+        self.age[:n] += 1
+        keep = self.age[:n] <= kappa
+        if keep.all():
+            return []
+
+        scrapped = [self.goods[row] for row in np.flatnonzero(~keep)]
+        m = int(keep.sum())
+        for column in ("ids", "quantity", "price", "age", "productivity"):
+            array = getattr(self, column)
+            array[:m] = array[:n][keep]
+        self.goods = [a_good for a_good, kept in zip(self.goods, keep) if kept]
+        self._rows = {int(c_id): row for row, c_id in enumerate(self.ids[:m])}
+        self.size = m
+        self.value = float(np.dot(self.quantity[:m], self.price[:m]))
+        return scrapped
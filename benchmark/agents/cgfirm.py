@@ -28,19 +28,46 @@ Todo:
 from .firm import Firm
 from  .bookkeeper import CGFirmBookkeeper
 from .equations import CGFirmEquations
+from .equation_graph import EquationGraph, EquationValues
 from .goods import CapitalGood, ConsumptionGood, Labor
+from . import model_equations
 import random as rnd
 
 
+# Costs, revenues and profits of the CG firms (leaves are firm attributes)
+CG_FIRM_EQUATIONS = EquationGraph()
+CG_FIRM_EQUATIONS.add("labor_costs", CGFirmEquations.W_ct, ("eq",))
+CG_FIRM_EQUATIONS.add("loan_costs", CGFirmEquations.Lp_ct, ("eq",))
+CG_FIRM_EQUATIONS.add("capital_costs", CGFirmEquations.Ck_ct, ("eq",))
+CG_FIRM_EQUATIONS.add("C_ct", model_equations.C_ct,
+                      ("labor_costs", "loan_costs", "capital_costs"))
+CG_FIRM_EQUATIONS.add("sales_revenue", CGFirmEquations.S_ct, ("eq",))
+CG_FIRM_EQUATIONS.add("deposit_interest", CGFirmEquations.Id_ct, ("eq",))
+CG_FIRM_EQUATIONS.add("inventory_revenue", CGFirmEquations.Inv_ct, ("eq",))
+CG_FIRM_EQUATIONS.add("R_ct", model_equations.R_ct,
+                      ("sales_revenue", "deposit_interest", "inventory_revenue"))
+CG_FIRM_EQUATIONS.add("pi_ct", model_equations.pi_ct, ("R_ct", "C_ct"))
+
+
 
 class CGFirm(Firm):
     """ Consumers Goods Firm """
+
+    # vectorized CGFirmSector in use, see cgfirm_sector.py
+    sector = None
+
+    # variables of CG_FIRM_EQUATIONS read outside the step (observers,
+    # capacity growth of the next step), the others are only evaluated
+    # when asked for
+    equation_outputs = ("C_ct", "R_ct")
+
     def __init__(self, simulation, scenario, agent_number, agent_def):
         super().__init__(simulation, scenario, agent_number, agent_def)
 
         self.bookkeeper = CGFirmBookkeeper(self)
         self.eq = CGFirmEquations(self.active_scenario, self)
         self.eq.set_bookkeeper(self.bookkeeper)
+        self.equations = EquationValues(CG_FIRM_EQUATIONS, self, self.equation_outputs)
         
         self.labor_mkt_name = "Labor_Market"
         self.cg_mkt_name = "CG_Market"
@@ -57,13 +84,19 @@ class CGFirm(Firm):
             self.create_initial_values()
             self.first = False
 
-        self.create_expectations()
-        self.compute_desired_output()
-        self.compute_capacity_utilization()
-        self.compute_labor_demand()
-        self.demand_labor()
-        self.set_output_price()
-        self.compute_rate_of_capacity_growth()
+        self.equations.clear()
+        if self.sector is not None and self.sector.step(self):
+            self.lay_off_from_turnover()
+            self.adjust_labor_demand()
+            self.demand_labor()
+        else:
+            self.create_expectations()
+            self.compute_desired_output()
+            self.compute_capacity_utilization()
+            self.compute_labor_demand()
+            self.demand_labor()
+            self.set_output_price()
+            self.compute_rate_of_capacity_growth()
         self.compute_demand_of_K_goods()
         self.choose_K_supplier()
         self.compute_credit_demand()
@@ -74,6 +107,7 @@ class CGFirm(Firm):
         self.compute_total_revenue()
         self.compute_total_profits()
         self.buy_K_goods()
+        self.depreciate_capital()
         self.pay_loans()
         self.pay_wages()
 
@@ -122,6 +156,11 @@ class CGFirm(Firm):
         self.Ndc_t = self.eq.ndct(self.K_ct.c_quantity, self.ud_ct)
   
         self.delta_N_ct = self.Ndc_t - self.Ndc_t_1
+        self.adjust_labor_demand()
+
+    def adjust_labor_demand(self):
+        """Consumer good firm demands labor or lays off employees
+        """
 
         if self.delta_N_ct > 0:
             self.labor_demand.c_quantity = self.delta_N_ct
@@ -187,7 +226,7 @@ class CGFirm(Firm):
                 - Cost on Loans
                 - Capital Costs
         """
-        self.C_ct = self.eq.C_ct()
+        self.evaluate("C_ct")
 
 
 
@@ -213,6 +252,12 @@ class CGFirm(Firm):
         """ CG Firms buy capital goods
         """
 
+    def depreciate_capital(self):
+        """ CG Firms age their capital stock and scrap
+            the machines older than kappa
+        """
+        self.bookkeeper.depreciate_capital(self.eq.kappa)
+
     def create_initial_production(self, quantity, price):
         """Firm creates intitial production of goods
 
@@ -277,6 +322,10 @@ class CGFirm(Firm):
 
         self.bookkeeper.pay_wages()
 
+    def pay_loans(self):
+        """ CG Firm pays interest and principal due on loans """
+        self.bookkeeper.pay_loans()
+
     def workforce(self):
         """Return the size of the workforce for the firm"""
 
@@ -284,11 +333,26 @@ class CGFirm(Firm):
 
     def compute_total_revenue(self):
 
-        self.R_ct = self.eq.R_ct()
+        self.evaluate("R_ct")
 
     def compute_total_profits(self):
 
-        self.eq.pi_ct(self.R_ct, self.C_ct)
+        if "pi_ct" in self.equations.needed:
+            self.evaluate("pi_ct")
+
+    def evaluate(self, name):
+        """Evaluate a variable of the equation graph (once per step)
+        and keep it as an attribute
+
+        Args:
+            name (str): name of the variable, e.g. "pi_ct"
+
+        Returns:
+            number: the value of the variable
+        """
+        value = self.equations[name]
+        setattr(self, name, value)
+        return value
 
 
 
@@ -0,0 +1,215 @@
+""" Consumer goods firm sector
+
+This module implements a population-level engine for the consumer
+goods firms. The sector keeps the state used by the firm equations
+(expected sales, inventories, desired output, capacity utilization,
+labor demand, mark-up, prices, ...) for all the CG firms in NumPy
+arrays, one row per firm, and evaluates the equations of
+``CGFirmEquations`` for the whole sector at once.
+
+The equations of a step only depend on the state of the firms at the
+start of the step, so the sector is computed once per step of the
+simulation clock (see clock.py), lazily, when the first firm steps.
+The lay-offs and the labor demand posted before the price and the
+rate of capacity growth in CGFirm.step do not change their inputs
+(mark-up, inventories, sales, wage, labor demand, output, revenue), so
+computing them with the other equations gives the same values. Every firm then copies its row back to its
+attributes, so the firms stay the objects the markets, the observers
+and the bookkeepers work with.
+
+A firm joins the sector the first time it steps with it and steps on
+its own in that step, as the other firms may not have their initial
+values yet.
+
+Example:
+
+    sector = CGFirmSector().activate()    # before the first step
+    ...                                   # run the simulation
+    sector.column("mu_ct")
+
+Todo:
+
+"""
+
+import operator
+
+import numpy as np
+
+from .clock import clock
+
+
+class CGFirmSector:
+    """Vectorized step of the consumer goods firms
+
+    Args:
+        capacity (int): initial number of firms, the arrays double
+            when they are full.
+    """
+
+    # state read from the firms at every step
+    INPUTS = (("Se_ct", "Se_ct"),
+              ("Se_ct_1", "Se_ct_1"),
+              ("inv_ct_1", "inv_ct_1.c_quantity"),
+              ("K_ct", "K_ct.c_quantity"),
+              ("S_ct", "S_ct.c_quantity"),
+              ("y_ct", "y_ct.c_quantity"),
+              ("mu_ct", "mu_ct"),
+              ("W_ct", "W_ct"),
+              ("Ndc_t_1", "Ndc_t_1"),
+              ("R_ct", "R_ct"))
+
+    # state computed by the sector
+    OUTPUTS = ("yd_ct", "ud_ct", "Ndc_t", "delta_N_ct", "mu_ct_1", "p_ct", "g_ct")
+
+    CONSTANTS = ("expect_lambda", "nu", "l_k", "mu_k", "r_bar", "u_bar",
+                 "gamma_1", "gamma_2")
+
+    def __init__(self, capacity=128):
+        capacity = max(1, int(capacity))
+        self.columns = {}
+        for column, _ in self.INPUTS:
+            self.columns[column] = np.zeros(capacity)
+        for column in self.OUTPUTS:
+            self.columns[column] = np.zeros(capacity)
+        self._getters = [(column, operator.attrgetter(attribute))
+                         for column, attribute in self.INPUTS]
+        self.firms = []
+        self.rows = {}
+        self.size = 0
+        self.values = {}
+        self.constants = None
+        self.eq = None
+        self.step_computed = None
+
+    def activate(self):
+        """Step the CG firms with this sector"""
+        from .cgfirm import CGFirm
+        CGFirm.sector = self
+        return self
+
+    def deactivate(self):
+        """Step the CG firms one by one again"""
+        from .cgfirm import CGFirm
+        if CGFirm.sector is self:
+            CGFirm.sector = None
+
+    def __len__(self):
+        return self.size
+
+    def column(self, name):
+        """Values of a column for all the firms"""
+        return self.columns[name][:self.size]
+
+    def get_constants(self, eq):
+        """Copy the constants of the model from the equations of a firm"""
+        self.constants = {name: getattr(eq, name) for name in self.CONSTANTS}
+        self.eq = eq
+
+    def _grow(self):
+        for column, old in self.columns.items():
+            new = np.zeros(2 * old.size)
+            new[:old.size] = old
+            self.columns[column] = new
+
+    def add(self, firm):
+        """Add a firm to the sector
+
+        Returns:
+            int: the row of the firm
+        """
+        if self.constants is None:
+            self.get_constants(firm.eq)
+        if self.size == self.columns["Se_ct"].size:
+            self._grow()
+        row = self.rows[firm] = self.size
+        self.firms.append(firm)
+        self.size += 1
+        return row
+
+    def gather(self, start=0):
+        """Read the state of the firms from start on"""
+        firms = self.firms[start:self.size]
+        for column, getter in self._getters:
+            self.columns[column][start:self.size] = [getter(firm) for firm in firms]
+
+    def compute(self, start=0):
+        """Evaluate the firm equations for the rows from start on
+
+        Same equations as CGFirm.create_expectations,
+        compute_desired_output, compute_capacity_utilization,
+        compute_labor_demand, set_output_price and
+        compute_rate_of_capacity_growth.
+        """
+        c = self.constants
+        rows = slice(start, self.size)
+        col = {name: values[rows] for name, values in self.columns.items()}
+
+        # expectations (zet)
+        col["Se_ct"][:] = col["Se_ct_1"] + c["expect_lambda"] * (col["Se_ct"] - col["Se_ct_1"])
+        col["Se_ct_1"][:] = col["Se_ct"]
+
+        # desired output (ydt)
+        col["yd_ct"][:] = np.where(col["inv_ct_1"] > col["Se_ct"], 0.0,
+                                   col["Se_ct"] * (1 + c["nu"]) - col["inv_ct_1"])
+
+        # capacity utilization (udct)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            col["ud_ct"][:] = np.minimum(1, col["yd_ct"] / (col["K_ct"] * c["mu_k"]))
+
+        # labor demand (ndct)
+        col["Ndc_t"][:] = np.where(col["K_ct"] == 0, 0.0,
+                                   col["ud_ct"] * (col["K_ct"] / c["l_k"]))
+        col["delta_N_ct"][:] = col["Ndc_t"] - col["Ndc_t_1"]
+
+        # mark-up (muxt)
+        col["mu_ct_1"][:] = col["mu_ct"]
+        FN_mu = self.eq.draw("lognormal", 1.0, 0.03, size=col["mu_ct"].size)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            low_inventory = col["inv_ct_1"] / col["S_ct"] <= c["nu"]
+        mu_t = col["mu_ct_1"] + np.where(low_inventory, 1 + FN_mu, 1 - FN_mu)
+        col["mu_ct"][:] = np.where(mu_t < 0, col["mu_ct_1"], mu_t)
+
+        # price (pt), y_ct + 1 as in set_output_price
+        y = col["y_ct"] + 1
+        with np.errstate(divide="ignore", invalid="ignore"):
+            col["p_ct"][:] = np.where(y == 0, 1.0,
+                                      (1 + col["mu_ct"]) * (col["W_ct"] * col["Ndc_t"]) / y)
+
+        # rate of capacity growth (g_ct)
+        col["g_ct"][:] = (c["gamma_1"] * ((col["R_ct"] - c["r_bar"]) / c["r_bar"])
+                          + c["gamma_2"] * ((col["ud_ct"] - c["u_bar"]) / c["u_bar"]))
+
+    def update(self):
+        """Compute the sector and keep the values as lists for the
+        firms to copy
+        """
+        self.gather()
+        self.compute()
+        self.values = {name: values[:self.size].tolist()
+                       for name, values in self.columns.items()}
+        self.step_computed = (clock.simulation, clock.step)
+
+    def step(self, firm):
+        """Step the equations of a firm: compute the sector if needed
+        and copy the row of the firm to its attributes
+        """
+        row = self.rows.get(firm)
+        if row is None:
+            self.add(firm)
+            return False
+        if self.step_computed != (clock.simulation, clock.step):
+            self.update()
+
+        col = self.values
+        firm.Se_ct = col["Se_ct"][row]
+        firm.Se_ct_1 = col["Se_ct_1"][row]
+        firm.yd_ct.c_quantity = col["yd_ct"][row]
+        firm.yd_ct_q = firm.yd_ct.c_quantity
+        firm.ud_ct = col["ud_ct"][row]
+        firm.Ndc_t = col["Ndc_t"][row]
+        firm.delta_N_ct = col["delta_N_ct"][row]
+        firm.mu_ct_1 = col["mu_ct_1"][row]
+        firm.mu_ct = col["mu_ct"][row]
+        firm.y_ct.c_price = col["p_ct"][row]
+        firm.g_ct = col["g_ct"][row]
+        return True
@@ -0,0 +1,69 @@
+""" Simulation clock
+
+This module implements the step counter shared by the parts of the
+model that label or key their state by simulation step: the
+transaction journal, the loan ids and loan periods and the vectorized
+sectors.
+
+Every market registers with the clock when it is created and reports
+when it has cleared (``Market.update``). A step ends when all the
+registered markets have cleared, so the step advances before the
+agents of the next step pay wages or loans. A market that clears twice
+before the others also ends the step, for markets that do not clear
+every step.
+
+A market registered after the clock ran starts a new simulation, so
+the clock starts again from step 0. Without markets (e.g. in tests) the
+step is advanced by hand with ``advance()``.
+
+Example:
+
+    from agents.clock import clock
+
+    clock.register("CG_Market")
+    clock.cleared("CG_Market")      # step 0 -> 1
+    clock.step
+
+Todo:
+
+"""
+
+
+class SimulationClock:
+    """Step counter of a simulation"""
+
+    def __init__(self):
+        self.step = 0
+        self.simulation = 0
+        self.markets = set()
+        self._cleared = set()
+
+    def register(self, market):
+        """Register a market, a new simulation if the clock already ran"""
+        if self.step > 0 or self._cleared:
+            self.reset()
+        self.markets.add(market)
+
+    def cleared(self, market):
+        """A market cleared, end the step when all of them cleared"""
+        if market in self._cleared:
+            self.advance()
+        self._cleared.add(market)
+        if self._cleared >= self.markets:
+            self.advance()
+
+    def advance(self):
+        """Start the next step"""
+        self.step += 1
+        self._cleared.clear()
+
+    def reset(self):
+        """Start a new simulation from step 0"""
+        self.step = 0
+        self.simulation += 1
+        self.markets.clear()
+        self._cleared.clear()
+
+
+# clock of the simulation in this process
+clock = SimulationClock()
@@ -0,0 +1,116 @@
+""" Equation graph
+
+This module implements a declarative graph of the equations of an
+agent. Every node is a variable computed by a function (e.g. one of
+model_equations.py) of other variables, its inputs. An input that is
+not a node is a leaf, read from the agent (an attribute).
+
+The values of an agent (``EquationValues``) are evaluated lazily and
+memoized for the step: asking for a variable evaluates its inputs
+first, once, and ``clear()`` starts a new step. The variables read
+outside the step (by observers, markets or the next step) are the
+outputs of the values. A variable that no output depends on is
+``needed`` by no one, so the agent can skip it.
+
+Example:
+
+    graph = EquationGraph()
+    graph.add("C_ct", model_equations.C_ct, ("labor_costs", "loan_costs", "capital_costs"))
+    graph.add("pi_ct", model_equations.pi_ct, ("R_ct", "C_ct"))
+
+    values = EquationValues(graph, firm, outputs=("C_ct",))
+    values["C_ct"]
+    "pi_ct" in values.needed     # False
+    values.clear()               # next step
+
+Todo:
+
+"""
+
+import inspect
+
+
+class EquationGraph:
+    """Directed acyclic graph of equations"""
+
+    def __init__(self):
+        self.nodes = {}
+
+    def __contains__(self, name):
+        return name in self.nodes
+
+    def add(self, name, function, inputs=None):
+        """Add a variable to the graph
+
+        Args:
+            name (str): name of the variable
+            function (callable): computes the variable from the inputs
+            inputs (tuple, optional): names of the inputs, in the order
+                of the arguments of function; the argument names if not
+                given
+
+        Raises:
+            NameError: If the variable is in the graph.
+            ValueError: If the variable depends on itself.
+        """
+        if name in self.nodes:
+            raise NameError("%s is already in the equation graph" % name)
+        if inputs is None:
+            inputs = tuple(inspect.signature(function).parameters)
+        if name in inputs or any(name in self.nodes[a_node][1]
+                                 for a_node in self.dependencies(inputs)):
+            raise ValueError("%s depends on itself" % name)
+        self.nodes[name] = (function, tuple(inputs))
+
+    def dependencies(self, names):
+        """Variables of the graph the given variables depend on
+        (the variables included)
+
+        Returns:
+            set: names of the variables
+        """
+        needed = set()
+        pending = [name for name in names if name in self.nodes]
+        while pending:
+            name = pending.pop()
+            if name in needed:
+                continue
+            needed.add(name)
+            pending.extend(an_input for an_input in self.nodes[name][1]
+                           if an_input in self.nodes)
+        return needed
+
+
+class EquationValues:
+    """Values of the equation graph of one agent in one step
+
+    Args:
+        graph (EquationGraph): the equations
+        agent: the agent, the leaves are its attributes
+        outputs (tuple): variables read outside the step
+    """
+
+    def __init__(self, graph, agent, outputs=()):
+        self.graph = graph
+        self.agent = agent
+        self.outputs = tuple(outputs)
+        self.needed = graph.dependencies(self.outputs)
+        self.cache = {}
+
+    def __getitem__(self, name):
+        if name in self.cache:
+            return self.cache[name]
+        node = self.graph.nodes.get(name)
+        if node is None:
+            return getattr(self.agent, name)
+        function, inputs = node
+        value = self.cache[name] = function(*[self[an_input] for an_input in inputs])
+        return value
+
+    def __contains__(self, name):
+        """True if the variable was evaluated in this step"""
+        return name in self.cache
+
+    def clear(self):
+        """Start a new step"""
+        self.cache.clear()
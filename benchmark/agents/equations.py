@@ -22,6 +22,10 @@ import numpy as np
 
 class Equations():
     """ The equations class for the benchmark model implementation"""
+
+    # RNGService in use, see rng.py
+    rng = None
+
     def __init__(self, active_scenario, agent):
         self.active_scenario = active_scenario
         self.ag = agent
@@ -78,6 +82,21 @@ class Equations():
         self.bookkeeper = bookkeeper
 
 
+    def draw(self, distribution, *args, size=None):
+        """Draw random numbers from the stream of the agent class
+
+        Uses np.random if no RNGService is active.
+
+        Args:
+            distribution (str): "random", "lognormal" or "normal"
+            size (int, optional): number of draws, one float if not given
+        """
+        if self.rng is None:
+            return getattr(np.random, distribution)(*args, size=size)
+        stream = self.rng.stream(type(self.ag).__name__)
+        return getattr(stream, distribution)(*args, size=size)
+
+
 
     def zet(self, zt, zet_1):
         """Compute expectations in t
@@ -152,7 +171,7 @@ class Equations():
             number: new mark-up
         """
 
-        FN_mu = np.random.lognormal(1.0, 0.03)
+        FN_mu = self.draw("lognormal", 1.0, 0.03)
         if inv_t_1/s_et <= self.nu:
             mu_t = mu_xt + (1 + FN_mu)
         else:
@@ -272,15 +291,15 @@ class CGFirmEquations(Equations):
     
     def S_ct(self):
         """Sales Revenues"""
-        return np.random.random() #change on implementation
+        return self.draw("random") #change on implementation
 
     def Id_ct(self):
         """Interest on deposits"""
-        return np.random.random() #change on implementation
+        return self.draw("random") #change on implementation
 
     def Inv_ct(self):
         """Difference on inventory costs"""
-        return np.random.random() #change on implementation
+        return self.draw("random") #change on implementation
 
     def g_ct(self, R_ct, ud_ct):
         """Calculates the desired productive capacity growth
@@ -350,7 +369,7 @@ class HHEquations(Equations):
 
     def wd_ht(self, wd_ht_1, u_ht_n):
 
-        FN_w = np.random.lognormal(1.0, 0.03)
+        FN_w = self.draw("lognormal", 1.0, 0.03)
         
         if FN_w > 1:
             FN_w = FN_w - 1
@@ -1,26 +1,63 @@
-import datetime
+from enum import IntEnum
+
+from . import loan_book
+from .loan_book import annuity_coefficient
 
 """ Goods
 
 This module implements the commodities traded in an economy.
 Subclasses will implement specific goods if necessary.
 
+The goods use ``__slots__`` and keep their type, category and consume
+as small-int enums (``GoodType``, ``GoodCategory`` and ``GoodConsume``),
+so a good holds no ``__dict__`` and no per-instance strings. The enums
+are built from the short codes used before ("real", "w", "immediate",
+...) and print as those codes.
+
 Example:
 
+    GoodCategory("w") is GoodCategory.W
+    str(GoodCategory.W) == "w"
 
 Todo:
 
 """
 
-class Good(object):
-    """A Basic Class representing a good."""
-    
-    TYPE = ["real", "financial"]
 
-    """
+class GoodCode(IntEnum):
+    """Small-int enum with a short string code"""
+
+    def __new__(cls, value, code):
+        member = int.__new__(cls, value)
+        member._value_ = value
+        member.code = code
+        return member
+
+    @classmethod
+    def _missing_(cls, value):
+        for member in cls:
+            if member.code == value:
+                return member
+        return None
+
+    def __str__(self):
+        return self.code
+
+
+class GoodType(GoodCode):
+    """Type of a good"""
+
+    REAL = 0, "real"
+    FINANCIAL = 1, "financial"
+
+
+class GoodCategory(GoodCode):
+    """Category of a good
+
         w  - Labor (wages are the payment for labor)
         cg - Consumer_Good
         k  - Capital
+        kg - Capital_Good
         ph - Dividends
         d  - Deposit
         l  - Loan
@@ -30,27 +67,55 @@ class Good(object):
         ib - Interests on bonds
         gw - Government wages
         gt - Government transfers (to households)
-        csh - Cash 
+        csh - Cash
     """
 
-    c_CATEGORY = ['w', 
-                  'cg', 
-                  'k', 
-                  'ph', 
-                  'd', 
-                  'l', 
-                  'id', 
-                  'il', 
-                  'b', 
-                  'ib', 
-                  'gw', 
-                  'gt',
-                  'csh']
-    
+    W = 0, "w"
+    CG = 1, "cg"
+    K = 2, "k"
+    KG = 3, "kg"
+    PH = 4, "ph"
+    D = 5, "d"
+    L = 6, "l"
+    ID = 7, "id"
+    IL = 8, "il"
+    B = 9, "b"
+    IB = 10, "ib"
+    GW = 11, "gw"
+    GT = 12, "gt"
+    CSH = 13, "csh"
+
+
+class GoodConsume(GoodCode):
+    """How a good is consumed"""
+
+    IMMEDIATE = 0, "immediate"
+    DEPRECIABLE = 1, "depreciable"
+    DEBT = 2, "debt"
+    CONTINUOUS = 3, "continuous"
+    CASH = 4, "cash"
+
+
+class Good(object):
+    """A Basic Class representing a good."""
 
-    CONSUME = ["immediate", "depreciable", "debt", "continuous", "cash"]
+    __slots__ = ("c_name", "c_type", "c_category", "c_consume",
+                 "c_quantity", "c_price", "c_owner", "c_producer")
 
+    # valid codes, see GoodType, GoodCategory and GoodConsume
+    TYPE = [str(c_type) for c_type in GoodType]
+    c_CATEGORY = [str(c_category) for c_category in GoodCategory]
+    CONSUME = [str(c_consume) for c_consume in GoodConsume]
 
+    # GoodsStore in use, see goods_store.py
+    _store = None
+    _stored = False
+
+    def __new__(cls, *args, **kwargs):
+        store = Good._store
+        if store is None or cls._stored:
+            return object.__new__(cls)
+        return store.new_view(cls)
 
     def __init__(self, 
                  c_name,
@@ -66,19 +131,19 @@ class Good(object):
 
         self.c_name = c_name
 
-        if c_type in self.TYPE:
-            self.c_type = c_type
-        else:
+        try:
+            self.c_type = GoodType(c_type)
+        except ValueError:
             raise Exception("Type of ", c_name, " not valid - type: ", c_type)
 
-        if c_category in self.c_CATEGORY:
-            self.c_category = c_category
-        else:
+        try:
+            self.c_category = GoodCategory(c_category)
+        except ValueError:
             raise Exception("Type of asset of :  ", c_name, "  not valid - type: ", c_category)
 
-        if c_consume in self.CONSUME:
-            self.c_consume = c_consume
-        else:
+        try:
+            self.c_consume = GoodConsume(c_consume)
+        except ValueError:
             raise Exception("Type of consume from ", c_name, " not valid - consume: ", c_consume)
 
         self.c_quantity = c_quantity
@@ -86,6 +151,16 @@ class Good(object):
         self.c_owner = c_owner
         self.c_producer = c_producer
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # class of the good, the same for the views of a GoodsStore
+        cls._good_class = cls
+        # all the slots of the class, in MRO order, for copy_attributes
+        fields = []
+        for klass in reversed(cls.__mro__):
+            fields.extend(getattr(klass, "__dict__", {}).get("__slots__", ()))
+        cls._fields = tuple(fields)
+
     def c_value(self):
         "Return the value of good - c_price * c_quantity"
         return self.c_price * self.c_quantity
@@ -96,12 +171,74 @@ class Good(object):
 
     
     def copy_attributes(self, a_good):
-        """Copy attributes from self to a_good if they are of the same class."""
-        if isinstance(a_good, self.__class__):
-            for attr in self.__dict__:
-                setattr(a_good, attr, getattr(self, attr))
+        """Copy attributes from self to a_good if they are of the same class.
+
+        A good and a GoodsStore view of the same class are of the same
+        class, whichever of them is the view.
+        """
+        if isinstance(a_good, self._good_class):
+            for attr in self._fields:
+                value = getattr(self, attr, _UNSET)
+                if value is not _UNSET:
+                    setattr(a_good, attr, value)
         return a_good
 
+    def partial_fill(self, quantity):
+        "Return a PartialFill record for a part of this good"
+        return PartialFill(self, quantity)
+
+
+Good._fields = Good.__slots__
+Good._good_class = Good
+_UNSET = object()
+
+
+class PartialFill(object):
+    """A partial execution of an offered good
+
+       A light record used by the markets when only a part of an
+       offer is bought. It keeps the quantity, price, owner and
+       producer of the fill and reads the name, type, category and
+       consume of the offered good, so it can be used where a Good
+       is expected (balance sheets, workforce, accepted offers)
+       without creating and copying a full Good object.
+       Capital goods are filled with a CapitalGood instead (see
+       ``CapitalGood.partial_fill``).
+    """
+
+    __slots__ = ("good", "c_quantity", "c_price", "c_owner", "c_producer")
+
+    def __init__(self, good, c_quantity):
+        self.good = good
+        self.c_quantity = c_quantity
+        self.c_price = good.c_price
+        self.c_owner = good.c_owner
+        self.c_producer = good.c_producer
+
+    @property
+    def c_name(self):
+        return self.good.c_name
+
+    @property
+    def c_type(self):
+        return self.good.c_type
+
+    @property
+    def c_category(self):
+        return self.good.c_category
+
+    @property
+    def c_consume(self):
+        return self.good.c_consume
+
+    def c_value(self):
+        "Return the value of the fill - c_price * c_quantity"
+        return self.c_price * self.c_quantity
+
+    def ammount(self):
+        "Return the value of the fill - c_price * c_quantity"
+        return self.c_price * self.c_quantity
+
 
 class ConsumptionGood(Good):
     """A Consumer Good
@@ -113,6 +250,8 @@ class ConsumptionGood(Good):
        CONSUME: immediate
     """
 
+    __slots__ = ()
+
     def __init__(self, 
                  c_name = None,
                  c_type = None,  
@@ -126,9 +265,9 @@ class ConsumptionGood(Good):
         """" Init method for a consumption good """
 
         self.c_name = "consumer good"
-        self.c_type = "real"
-        self.c_category = "cg"
-        self.c_consume = "immediate"
+        self.c_type = GoodType.REAL
+        self.c_category = GoodCategory.CG
+        self.c_consume = GoodConsume.IMMEDIATE
         self.c_quantity = c_quantity
         self.c_price = c_price
         self.c_owner = c_owner
@@ -145,6 +284,8 @@ class CapitalGood(Good):
        CONSUME: depreciable
     """
 
+    __slots__ = ("c_id",)
+
     def __init__(self, 
                  c_name = None,
                  c_type = None,  
@@ -158,15 +299,26 @@ class CapitalGood(Good):
         """" Init method for a consumption good """
 
         self.c_name = "capital good"
-        self.c_type = "real"
-        self.c_category = "kg"
-        self.c_consume = "depreciable"
+        self.c_type = GoodType.REAL
+        self.c_category = GoodCategory.KG
+        self.c_consume = GoodConsume.DEPRECIABLE
         self.c_id = 0
         self.c_quantity = c_quantity
         self.c_price = c_price
         self.c_owner = c_owner
         self.c_producer = c_producer
 
+    def partial_fill(self, quantity):
+        """Return a CapitalGood for a part of this good
+
+        A capital good bought in part enters the capital stock of the
+        buyer with its own id, so the fill is a real CapitalGood and
+        not a PartialFill record.
+        """
+        a_fill = self.copy_attributes(CapitalGood())
+        a_fill.c_quantity = quantity
+        return a_fill
+
 
 
 
@@ -180,6 +332,8 @@ class Labor(Good):
        CONSUME: immediate
     """
 
+    __slots__ = ()
+
     def __init__(self, 
                  c_name = None,
                  c_type = None,  
@@ -193,9 +347,9 @@ class Labor(Good):
         """" Init method for Workers Labor """
 
         self.c_name = "labor"
-        self.c_type = "real"
-        self.c_category = "w"
-        self.c_consume = "immediate"
+        self.c_type = GoodType.REAL
+        self.c_category = GoodCategory.W
+        self.c_consume = GoodConsume.IMMEDIATE
         self.c_quantity = c_quantity
         self.c_price = c_price
         self.c_owner = c_owner
@@ -204,6 +358,8 @@ class Labor(Good):
 
 class Loan(Good):
 
+    __slots__ = ("c_id", "n_term", "n_paid", "value_paid", "ammount_due", "date_contract")
+
     def __init__(self, 
                  c_name = None,
                  c_type = None,  
@@ -213,14 +369,19 @@ class Loan(Good):
                  c_price = None,
                  c_owner=None,
                  c_producer=None,
-                 n_term=None):
+                 n_term=None,
+                 c_id=None):
         
-        """" Init method for Loans """
+        """" Init method for Loans
+
+            The id of the loan is given by the shared LoanIdAllocator
+            and date_contract is the simulation step of the contract.
+        """
 
         self.c_name = "loan"
-        self.c_type = "financial"
-        self.c_category = "l"
-        self.c_consume = "debt"
+        self.c_type = GoodType.FINANCIAL
+        self.c_category = GoodCategory.L
+        self.c_consume = GoodConsume.DEBT
         self.c_quantity = c_quantity  # value of the loan
         self.c_price = c_price # interest rate of the loan
         self.c_owner = c_owner # borower
@@ -228,8 +389,14 @@ class Loan(Good):
         self.n_term = n_term # number of payments 
         self.n_paid = 0   # number 
         self.value_paid = 0.0
-        self.ammount_due = c_quantity * (1 + c_price)^n_term
-        self.date_contract = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        if c_quantity is not None and c_price is not None and n_term is not None:
+            self.ammount_due = c_quantity * (1 + c_price)**n_term
+        else:
+            self.ammount_due = c_quantity
+        if c_id is None:
+            c_id = loan_book.loan_ids.next_id()
+        self.c_id = c_id
+        self.date_contract = loan_book.loan_ids.step
     
     def term_payment(self, a_value):
         """ Execute a term payment of a loan
@@ -242,10 +409,8 @@ class Loan(Good):
 
 
     def one_term_ammount(self):
-
-        coef = self.c_price/(1 - (1 + self.c_price)^self.n_term)
-
-        return self.c_quantity*coef
+        "Return the annuity paid in every term of the loan"
+        return self.c_quantity*annuity_coefficient(self.c_price, self.n_term)
 
 
 
@@ -253,6 +418,8 @@ class Loan(Good):
 
 class Cash(Good):
 
+      __slots__ = ()
+
       def __init__(self, 
                  c_name = None,
                  c_type = None,  
@@ -266,9 +433,9 @@ class Cash(Good):
         """" Init method for Workers Labor """
 
         self.c_name = "cash"
-        self.c_type = "financial"
-        self.c_category = "csh"
-        self.c_consume = "cash"
+        self.c_type = GoodType.FINANCIAL
+        self.c_category = GoodCategory.CSH
+        self.c_consume = GoodConsume.CASH
         self.c_quantity = c_quantity
         self.c_price = 1
         self.c_owner = c_owner
@@ -0,0 +1,311 @@
+""" Goods store
+
+This module implements a columnar (struct-of-arrays) store for the
+goods of a simulation. A ``GoodsStore`` keeps the quantity, price,
+owner id, producer id and category of every good in NumPy arrays, one
+row per good, and the goods become thin views onto their row.
+
+The store is opt-in. While a store is active every good created
+(``Labor(...)``, ``Cash(...)``, ...) is a view of the same class, so
+the agents, bookkeepers and markets do not change, and aggregates
+over all the holdings of the economy are single NumPy reductions.
+Rows of goods that are no longer referenced are reused.
+
+Example:
+
+    store = GoodsStore().activate()
+    ...                                  # run the simulation
+    store.total_quantity(GoodCategory.CG)  # inventory of consumer goods
+    store.mean_price(GoodCategory.W)       # mean wage
+    store.wage_bill()
+    store.deactivate()
+
+Todo:
+
+"""
+
+import weakref
+
+import numpy as np
+
+from .goods import Good, GoodCategory
+
+
+CATEGORIES = tuple(GoodCategory)
+NO_AGENT = -1
+NO_CATEGORY = -1
+
+
+class StoredGood(object):
+    """Mixin for the goods kept in a GoodsStore
+
+    The columns of the store replace the slots of the good. The other
+    attributes (name, type, consume, ...) stay in the slots. A quantity
+    or price of None (the default of e.g. ``Labor()``) is stored as 0.0,
+    so it does not turn the sums of the store into NaN.
+    """
+
+    __slots__ = ()
+    _stored = True
+
+    @property
+    def c_quantity(self):
+        return float(self._store.quantity[self._row])
+
+    @c_quantity.setter
+    def c_quantity(self, value):
+        self._store.quantity[self._row] = 0.0 if value is None else value
+
+    @property
+    def c_price(self):
+        return float(self._store.price[self._row])
+
+    @c_price.setter
+    def c_price(self, value):
+        self._store.price[self._row] = 0.0 if value is None else value
+
+    @property
+    def c_owner(self):
+        return self._store.agent(self._store.owner[self._row])
+
+    @c_owner.setter
+    def c_owner(self, an_agent):
+        self._store.owner[self._row] = self._store.agent_id(an_agent)
+
+    @property
+    def c_producer(self):
+        return self._store.agent(self._store.producer[self._row])
+
+    @c_producer.setter
+    def c_producer(self, an_agent):
+        self._store.producer[self._row] = self._store.agent_id(an_agent)
+
+    @property
+    def c_category(self):
+        category = self._store.category[self._row]
+        if category == NO_CATEGORY:
+            return None
+        return CATEGORIES[category]
+
+    @c_category.setter
+    def c_category(self, value):
+        self._store.category[self._row] = GoodCategory(value)
+
+    def __del__(self):
+        try:
+            self._store.free(self._row)
+        except Exception:
+            # store already gone (interpreter shutdown)
+            pass
+
+
+class GoodsStore:
+    """Columnar store of the goods of a simulation
+
+    Args:
+        capacity (int): initial number of rows, the arrays double
+            when they are full.
+    """
+
+    def __init__(self, capacity=1024):
+        capacity = max(1, int(capacity))
+        self._columns = []
+        self.add_column("quantity", float, 0.0, capacity)
+        self.add_column("price", float, 0.0, capacity)
+        self.add_column("owner", np.int64, NO_AGENT, capacity)
+        self.add_column("producer", np.int64, NO_AGENT, capacity)
+        self.add_column("category", np.int8, NO_CATEGORY, capacity)
+        self.add_column("alive", bool, False, capacity)
+        self.size = 0
+        self._free = []
+        # the store does not keep the agents alive: they are held
+        # weakly, and the id of an agent is released when it is freed
+        self._agents = weakref.WeakValueDictionary()
+        self._other_agents = {}
+        self._agent_ids = {}
+        self._agent_count = 0
+        self._views = {}
+
+    def activate(self):
+        """Create the goods in this store from now on"""
+        Good._store = self
+        return self
+
+    def deactivate(self):
+        """Create plain goods again (the views stay valid)"""
+        if Good._store is self:
+            Good._store = None
+
+    def __len__(self):
+        return int(self.alive.sum())
+
+    # --- rows ---------------------------------------------------------
+
+    def add_column(self, name, dtype, fill, capacity=None):
+        """Add a column to the store
+
+        The column grows with the store and is reset to ``fill`` when
+        a row is released, so other structures (e.g. the Ledger) can
+        keep per-good data next to the goods.
+        """
+        if capacity is None:
+            capacity = self.quantity.size
+        setattr(self, name, np.full(capacity, fill, dtype=dtype))
+        self._columns.append((name, fill))
+
+    def _grow(self):
+        capacity = 2 * self.quantity.size
+        for column, fill in self._columns:
+            old = getattr(self, column)
+            new = np.full(capacity, fill, dtype=old.dtype)
+            new[:old.size] = old
+            setattr(self, column, new)
+
+    def allocate(self):
+        """Return a free row"""
+        if self._free:
+            row = self._free.pop()
+        else:
+            if self.size == self.quantity.size:
+                self._grow()
+            row = self.size
+            self.size += 1
+        self.alive[row] = True
+        return row
+
+    def free(self, row):
+        """Release the row of a good"""
+        for column, fill in self._columns:
+            getattr(self, column)[row] = fill
+        self._free.append(row)
+
+    # --- agents -------------------------------------------------------
+
+    def agent_id(self, an_agent):
+        """Integer id of an agent in the owner/producer columns"""
+        if an_agent is None:
+            return NO_AGENT
+        agent_id = self._agent_ids.get(id(an_agent))
+        if agent_id is None:
+            agent_id = self._agent_ids[id(an_agent)] = self._agent_count
+            self._agent_count += 1
+            try:
+                self._agents[agent_id] = an_agent
+                weakref.finalize(an_agent, self._agent_ids.pop, id(an_agent), None)
+            except TypeError:
+                # e.g. the name of an agent, it cannot be held weakly
+                self._other_agents[agent_id] = an_agent
+        return agent_id
+
+    def agent(self, agent_id):
+        """Agent of an integer id, None if the agent was freed"""
+        if agent_id == NO_AGENT:
+            return None
+        an_agent = self._agents.get(agent_id)
+        if an_agent is None:
+            return self._other_agents.get(agent_id)
+        return an_agent
+
+    # --- views --------------------------------------------------------
+
+    def view_class(self, good_class):
+        """Class of the views of a Good class"""
+        view = self._views.get(good_class)
+        if view is None:
+            view = type(good_class.__name__, (StoredGood, good_class),
+                        {"__slots__": ("_store", "_row"),
+                         "__module__": good_class.__module__})
+            # copy_attributes must not copy the row, and copies between
+            # views and plain goods of good_class
+            view._fields = good_class._fields
+            view._good_class = good_class
+            self._views[good_class] = view
+        return view
+
+    def new_view(self, good_class):
+        """Create an uninitialised good of good_class on a new row"""
+        a_good = object.__new__(self.view_class(good_class))
+        a_good._store = self
+        a_good._row = self.allocate()
+        return a_good
+
+    def create(self, good_class, **kwargs):
+        """Create a good of good_class in this store"""
+        a_good = self.new_view(good_class)
+        a_good.__init__(**kwargs)
+        return a_good
+
+    # --- aggregates ---------------------------------------------------
+
+    def _mask(self, category=None, owner=None):
+        n = self.size
+        mask = self.alive[:n].copy()
+        if category is not None:
+            mask &= self.category[:n] == GoodCategory(category)
+        if owner is not None:
+            mask &= self.owner[:n] == self._agent_ids.get(id(owner), NO_AGENT - 1)
+        return mask
+
+    def total_quantity(self, category=None, owner=None):
+        """Total quantity of the goods of a category (and owner)"""
+        return float(self.quantity[:self.size][self._mask(category, owner)].sum())
+
+    def total_value(self, category=None, owner=None):
+        """Total value (price * quantity) of the goods of a category"""
+        mask = self._mask(category, owner)
+        return float(np.dot(self.price[:self.size][mask], self.quantity[:self.size][mask]))
+
+    def mean_price(self, category=None, weighted=True):
+        """Mean price of the goods of a category
+
+        Args:
+            category (GoodCategory, optional): the category
+            weighted (bool): weight the prices by the quantities
+
+        Returns:
+            float: the mean price, or nan if there are no goods
+        """
+        mask = self._mask(category)
+        prices = self.price[:self.size][mask]
+        if prices.size == 0:
+            return float("nan")
+        if weighted:
+            quantity = self.quantity[:self.size][mask]
+            total = quantity.sum()
+            if total == 0.0:
+                return float("nan")
+            return float(np.dot(prices, quantity) / total)
+        return float(prices.mean())
+
+    def wage_bill(self):
+        """Total value of the labor goods"""
+        return self.total_value(GoodCategory.W)
+
+    def by_category(self, value=False):
+        """Total quantity (or value) of every category
+
+        Returns:
+            dict: {GoodCategory: total}
+        """
+        n = self.size
+        mask = self.alive[:n] & (self.category[:n] != NO_CATEGORY)
+        weights = self.quantity[:n][mask]
+        if value:
+            weights = weights * self.price[:n][mask]
+        totals = np.bincount(self.category[:n][mask], weights=weights,
+                             minlength=len(CATEGORIES))
+        return {category: float(totals[category]) for category in CATEGORIES}
+
+    def by_owner(self, category=None, value=False):
+        """Total quantity (or value) held by every agent
+
+        Returns:
+            numpy.ndarray: totals indexed by agent id (see agent_id)
+        """
+        n = self.size
+        mask = self._mask(category) & (self.owner[:n] != NO_AGENT)
+        weights = self.quantity[:n][mask]
+        if value:
+            weights = weights * self.price[:n][mask]
+        return np.bincount(self.owner[:n][mask], weights=weights,
+                           minlength=self._agent_count)
@@ -33,6 +33,9 @@ class Household(EconomicAgent):
         * Organize equations cals
     """
 
+    # vectorized HouseholdSector in use, see household_sector.py
+    sector = None
+
     def __init__(self, simulation, scenario, agent_number, agent_def):
         super().__init__(simulation, scenario, agent_number, agent_def)
     
@@ -57,11 +60,17 @@ class Household(EconomicAgent):
             self.eq.get_constants(self.active_scenario)
             self.create_initial_values()
             self.first_step = False
-        self.create_expectations()
-        self.compute_reservation_wages()
-        self.check_if_unemployed()
-        self.calculate_income()
-        self.demand_goods()
+        if self.sector is not None and self.sector.step(self):
+            if self.unemployed:
+                self.post_labor_offer()
+                self.receive_dole()
+            self.post_demand()
+        else:
+            self.create_expectations()
+            self.compute_reservation_wages()
+            self.check_if_unemployed()
+            self.calculate_income()
+            self.demand_goods()
         self.consume()
         self.pay_taxes()
 
@@ -118,6 +127,11 @@ class Household(EconomicAgent):
         self.update_labor_quantity()
         self.offered_labor.c_quantity = self.labor_qnt
         self.offered_labor.c_price = self.compute_reservation_wages()
+        self.post_labor_offer()
+
+    def post_labor_offer(self):
+        """ Worker posts its labor offer in labor market
+        """
         self.has_offer = True
         space = self.get_a_space(self.labor_mkt_name)
         self.bookkeeper.set_offer(space, self.offered_labor)
@@ -137,6 +151,11 @@ class Household(EconomicAgent):
         """ Household demand goods 
         """
         self.update_consumer_demand()
+        self.post_demand()
+
+    def post_demand(self):
+        """ Household posts its demand in goods market
+        """
         ## Make good offer
         self.get_a_space(self.cg_mkt_name).set_demand(self, self.consumption_good)
                      
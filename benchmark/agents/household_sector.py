@@ -0,0 +1,247 @@
+""" Household sector
+
+This module implements a population-level engine for the households.
+The sector keeps the state used by the household equations (expected
+prices, reservation wages, unemployment spells, labor income and
+consumption demand) for all the households in NumPy arrays, one row
+per household, and updates the whole sector at once. The random shocks
+of the reservation wages of a step are one batched draw.
+
+As for the CG firm sector (see cgfirm_sector.py), the sector is
+computed once per step of the simulation clock (see clock.py), lazily,
+when the first household steps, from the state of the households at
+that time. Every household then copies its row back to its attributes
+and goods and posts its labor offer and its demand in the markets
+itself. A household joins the sector the first time it steps with it
+and steps on its own in that step.
+
+A firm may lay off a worker (``Household.is_unemployed``) after the
+sector was computed and before the worker steps, if the schedule
+interleaves firms and households. The row of a household whose
+``unemployed`` flag changed since the sector was computed is computed
+again, alone, when it steps, so it counts the new unemployment spell,
+draws its second reservation wage and offers its labor. When the firms
+step before the households, a sector run gives the same values as an
+agent-by-agent run.
+
+Example:
+
+    sector = HouseholdSector().activate()    # before the first step
+    ...                                      # run the simulation
+    sector.column("wd_ht")
+
+Todo:
+
+"""
+
+import operator
+
+import numpy as np
+
+from .clock import clock
+
+
+class HouseholdSector:
+    """Vectorized step of the households
+
+    Args:
+        capacity (int): initial number of households, the arrays
+            double when they are full.
+    """
+
+    # state read from the households at every step
+    INPUTS = (("pe_ht", "pe_ht"),
+              ("p_cg", "consumption_good.c_price"),
+              ("q_cg", "consumption_good.c_quantity"),
+              ("wd_ht", "wd_ht"),
+              ("u_ht_n", "u_ht_n"),
+              ("unemployed", "unemployed"),
+              ("labor_contracted", "labor_contracted.c_quantity"),
+              ("labor_qnt", "labor_qnt"))
+
+    # state computed by the sector (labor_quantity and labor_price are
+    # the labor good in the balance sheet, the source of the income)
+    OUTPUTS = ("pe_ht_1", "wd_ht_1", "offer_price", "labor_quantity", "labor_price",
+               "own_labor", "income")
+
+    CONSTANTS = ("expect_lambda",)
+
+    def __init__(self, capacity=1024):
+        capacity = max(1, int(capacity))
+        self.columns = {}
+        for column, _ in self.INPUTS:
+            self.columns[column] = np.zeros(capacity)
+        for column in self.OUTPUTS:
+            self.columns[column] = np.zeros(capacity)
+        self._getters = [(column, operator.attrgetter(attribute))
+                         for column, attribute in self.INPUTS]
+        self.households = []
+        self.rows = {}
+        self.size = 0
+        self.values = {}
+        self.constants = None
+        self.eq = None
+        self.step_computed = None
+
+    def activate(self):
+        """Step the households with this sector"""
+        from .household import Household
+        Household.sector = self
+        return self
+
+    def deactivate(self):
+        """Step the households one by one again"""
+        from .household import Household
+        if Household.sector is self:
+            Household.sector = None
+
+    def __len__(self):
+        return self.size
+
+    def column(self, name):
+        """Values of a column for all the households"""
+        return self.columns[name][:self.size]
+
+    def get_constants(self, eq):
+        """Copy the constants of the model from the equations of a household"""
+        self.constants = {name: getattr(eq, name) for name in self.CONSTANTS}
+        self.eq = eq
+
+    def _grow(self):
+        for column, old in self.columns.items():
+            new = np.zeros(2 * old.size)
+            new[:old.size] = old
+            self.columns[column] = new
+
+    def add(self, household):
+        """Add a household to the sector
+
+        Returns:
+            int: the row of the household
+        """
+        if self.constants is None:
+            self.get_constants(household.eq)
+        if self.size == self.columns["pe_ht"].size:
+            self._grow()
+        row = self.rows[household] = self.size
+        self.households.append(household)
+        self.size += 1
+        return row
+
+    def gather(self, start=0, stop=None):
+        """Read the state of the households of the rows start:stop"""
+        if stop is None:
+            stop = self.size
+        households = self.households[start:stop]
+        for column, getter in self._getters:
+            self.columns[column][start:stop] = [getter(household)
+                                                for household in households]
+        labor = [household.bookkeeper.balance_sheet.assets["labor"]
+                 for household in households]
+        self.columns["labor_quantity"][start:stop] = [a_good.c_quantity for a_good in labor]
+        self.columns["labor_price"][start:stop] = [a_good.c_price for a_good in labor]
+        self.columns["own_labor"][start:stop] = [
+            a_good is household.offered_labor for a_good, household in zip(labor, households)]
+
+    @staticmethod
+    def reservation_wages(wd_ht_1, u_ht_n, FN_w):
+        """Reservation wages (HHEquations.wd_ht) for arrays of households"""
+        FN_w = np.where(FN_w > 1, FN_w - 1, FN_w) / 200
+        wd_ht = np.where(u_ht_n > 1, wd_ht_1 * (1 - FN_w), wd_ht_1 * (1 + FN_w))
+        return np.where(wd_ht <= 0, 0.0001, wd_ht)
+
+    def compute(self, start=0, stop=None):
+        """Update the rows start:stop
+
+        Same equations as Household.create_expectations,
+        compute_reservation_wages, check_if_unemployed (the labor offer
+        of the unemployed), calculate_income and demand_goods.
+        """
+        c = self.constants
+        rows = slice(start, self.size if stop is None else stop)
+        col = {name: values[rows] for name, values in self.columns.items()}
+        unemployed = col["unemployed"] != 0
+        n_unemployed = int(unemployed.sum())
+
+        # one draw for the reservation wages of all households and the
+        # labor offers of the unemployed, in the order the households
+        # would draw them one by one
+        FN_w = self.eq.draw("lognormal", 1.0, 0.03, size=col["wd_ht"].size + n_unemployed)
+        first_draw = np.arange(unemployed.size) + np.cumsum(unemployed) - unemployed
+        second_draw = first_draw[unemployed] + 1
+
+        # expectations (zet)
+        col["pe_ht_1"][:] = col["p_cg"]
+        col["pe_ht"][:] = col["pe_ht_1"] + c["expect_lambda"] * (col["pe_ht"] - col["pe_ht_1"])
+
+        # reservation wages
+        col["wd_ht_1"][:] = col["wd_ht"]
+        col["wd_ht"][:] = self.reservation_wages(col["wd_ht_1"], col["u_ht_n"],
+                                                 FN_w[first_draw])
+
+        # labor offer of the unemployed
+        col["u_ht_n"][unemployed] += 1
+        col["labor_qnt"][unemployed] = col["labor_contracted"][unemployed]
+        col["wd_ht_1"][unemployed] = col["wd_ht"][unemployed]
+        col["wd_ht"][unemployed] = self.reservation_wages(col["wd_ht"][unemployed],
+                                                          col["u_ht_n"][unemployed],
+                                                          FN_w[second_draw])
+        col["offer_price"][:] = col["wd_ht"]
+        offered = unemployed & (col["own_labor"] != 0)
+        col["labor_quantity"][offered] = col["labor_qnt"][offered]
+        col["labor_price"][offered] = col["offer_price"][offered]
+
+        # income and demand of consumption goods
+        col["income"][:] = col["labor_price"] * col["labor_quantity"]
+        constrained = ((col["income"] <= col["p_cg"] * col["q_cg"]) & (col["p_cg"] != 0))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            col["q_cg"][:] = np.where(constrained, col["income"] / col["p_cg"], col["q_cg"])
+
+    def update(self):
+        """Compute the sector and keep the values as lists for the
+        households to copy
+        """
+        self.gather()
+        self.compute()
+        self.values = {name: values[:self.size].tolist()
+                       for name, values in self.columns.items()}
+        self.step_computed = (clock.simulation, clock.step)
+
+    def refresh(self, row):
+        """Compute a row again from the current state of its household"""
+        self.gather(row, row + 1)
+        self.compute(row, row + 1)
+        for name, values in self.columns.items():
+            self.values[name][row] = values[row].item()
+
+    def step(self, household):
+        """Step the equations of a household: compute the sector if
+        needed and copy the row of the household to its attributes
+
+        Returns:
+            bool: False if the household joined the sector in this step, it
+                steps on its own until the next step
+        """
+        row = self.rows.get(household)
+        if row is None:
+            self.add(household)
+            return False
+        if self.step_computed != (clock.simulation, clock.step):
+            self.update()
+        elif bool(household.unemployed) != bool(self.values["unemployed"][row]):
+            # laid off (or hired) after the sector was computed
+            self.refresh(row)
+
+        col = self.values
+        household.pe_ht_1 = col["pe_ht_1"][row]
+        household.pe_ht = col["pe_ht"][row]
+        household.wd_ht_1 = col["wd_ht_1"][row]
+        household.wd_ht = col["wd_ht"][row]
+        if household.unemployed:
+            household.u_ht_n = int(col["u_ht_n"][row])
+            household.labor_qnt = col["labor_qnt"][row]
+            household.offered_labor.c_quantity = household.labor_qnt
+            household.offered_labor.c_price = col["offer_price"][row]
+        household.income = col["income"][row]
+        household.consumption_good.c_quantity = col["q_cg"][row]
+        return True
@@ -0,0 +1,122 @@
+""" Indexed dictionary
+
+This module implements the keyed container shared by the order books
+of the markets (see spaces/order_book.py) and the workforce of the
+firms (see workforce.py).
+
+An ``IndexedDict`` behaves like a plain dictionary, but keeps the
+values in a dense list with a ``key -> slot`` map. Removing a key
+moves the last item of the list to the free slot (swap-remove), so
+insertions, removals and random draws are O(1), and drawing k keys
+is O(k).
+
+Example:
+
+    items = IndexedDict()
+    items["HH_1"] = a_good
+    a_good = items.random_value()
+    items.pop("HH_1")
+
+Todo:
+
+"""
+
+import random
+
+
+class IndexedDict:
+    """Dictionary with O(1) swap-remove and random draws"""
+
+    def __init__(self):
+        self._keys = []
+        self._values = []
+        self._slots = {}
+
+    def __setitem__(self, key, value):
+        slot = self._slots.get(key)
+        if slot is None:
+            self._slots[key] = len(self._values)
+            self._keys.append(key)
+            self._values.append(value)
+        else:
+            self._values[slot] = value
+
+    def __getitem__(self, key):
+        return self._values[self._slots[key]]
+
+    def __contains__(self, key):
+        return key in self._slots
+
+    def __len__(self):
+        return len(self._values)
+
+    def __bool__(self):
+        return bool(self._values)
+
+    def __iter__(self):
+        return iter(list(self._keys))
+
+    def get(self, key, default=None):
+        slot = self._slots.get(key)
+        if slot is None:
+            return default
+        return self._values[slot]
+
+    def pop(self, key, *default):
+        """Remove a key and return its value"""
+        slot = self._slots.pop(key, None)
+        if slot is None:
+            if default:
+                return default[0]
+            raise KeyError(key)
+
+        value = self._values[slot]
+        last_key = self._keys.pop()
+        last_value = self._values.pop()
+        if slot < len(self._values):
+            self._keys[slot] = last_key
+            self._values[slot] = last_value
+            self._slots[last_key] = slot
+        return value
+
+    def popitem(self):
+        """Remove and return the last (key, value) pair"""
+        if not self._values:
+            raise KeyError("popitem(): dictionary is empty")
+        key = self._keys.pop()
+        del self._slots[key]
+        return key, self._values.pop()
+
+    def keys(self):
+        return list(self._keys)
+
+    def values(self):
+        return list(self._values)
+
+    def items(self):
+        return list(zip(self._keys, self._values))
+
+    def clear(self):
+        self._keys.clear()
+        self._values.clear()
+        self._slots.clear()
+
+    def random_key(self):
+        """Return a random key without removing it"""
+        return self._keys[random.randrange(len(self._keys))]
+
+    def random_value(self):
+        """Return a random value without removing it"""
+        return self._values[random.randrange(len(self._values))]
+
+    def sample_keys(self, k):
+        """Return k distinct random keys (all of them if k >= size)
+
+        Args:
+            k (int): number of keys
+
+        Returns:
+            list: the keys, in random order
+        """
+        k = max(0, min(int(k), len(self._keys)))
+        return random.sample(self._keys, k)
@@ -0,0 +1,202 @@
+""" Transaction journal
+
+This module implements an append-only journal of the payments between
+agents. Every payment is one double-entry row (the payer is debited,
+the payee is credited) with the columns:
+
+    - step: simulation step (see clock.py)
+    - payer: id of the paying agent
+    - payee: id of the receiving agent
+    - amount: amount of cash paid
+    - category: GoodCategory of the payment (w for wages, cg for
+      consumption goods, ...) or -1 if not given
+
+The rows are written in a preallocated NumPy structured buffer. With a
+path, a full buffer is flushed as one chunk file under the path
+(``transactions_000000.npy``, ... or ``.parquet`` if pyarrow is
+installed and asked for) and reused; without a path the buffer grows.
+The agent names of the ids are written in ``transactions_agents.npy``.
+
+Example:
+
+    "space_variables": {
+        "record_transactions": true,
+        "transactions_path": "runs/"
+    }
+
+    journal = TransactionJournal.load("runs/")
+    flows = TransactionJournal.flows_by_category(journal)
+
+Todo:
+
+"""
+
+import atexit
+import glob
+import os
+
+import numpy as np
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+from .clock import clock
+
+
+NO_CATEGORY = -1
+
+DTYPE = np.dtype([("step", np.int64),
+                  ("payer", np.int64),
+                  ("payee", np.int64),
+                  ("amount", np.float64),
+                  ("category", np.int8)])
+
+
+class TransactionJournal:
+    """Append-only journal of payments
+
+    Args:
+        path (str, optional): directory of the chunk files, the journal
+            is only kept in memory if not given.
+        chunk_size (int): rows per buffer (and per chunk file)
+        file_format (str): "npy" or "parquet"
+    """
+
+    def __init__(self, path=None, chunk_size=65536, file_format="npy"):
+        if file_format not in ("npy", "parquet"):
+            raise ValueError("Invalid journal file format: %s" % file_format)
+        if file_format == "parquet" and pyarrow is None:
+            raise ValueError("pyarrow is needed to write the journal as parquet")
+        self.path = path
+        self.file_format = file_format
+        self.buffer = np.zeros(max(1, int(chunk_size)), dtype=DTYPE)
+        self.size = 0
+        self.chunks = 0
+        self.names = []
+        self._agent_ids = {}
+        if path is not None:
+            atexit.register(self.close)
+
+    def activate(self):
+        """Record the payments of the bookkeepers in this journal"""
+        from .bookkeeper import Bookkeeper
+        Bookkeeper.journal = self
+        return self
+
+    def deactivate(self):
+        """Stop recording the payments of the bookkeepers"""
+        from .bookkeeper import Bookkeeper
+        if Bookkeeper.journal is self:
+            Bookkeeper.journal = None
+
+    @staticmethod
+    def active():
+        """Journal in use by the bookkeepers, if any"""
+        from .bookkeeper import Bookkeeper
+        return Bookkeeper.journal
+
+    def agent_id(self, an_agent):
+        """Integer id of an agent in the payer/payee columns"""
+        agent_id = self._agent_ids.get(an_agent)
+        if agent_id is None:
+            agent_id = self._agent_ids[an_agent] = len(self.names)
+            self.names.append(getattr(an_agent, "name", str(an_agent)))
+        return agent_id
+
+    def record(self, payer, payee, amount, category=None):
+        """Append one payment"""
+        if self.size == self.buffer.size:
+            self._full()
+        self.buffer[self.size] = (clock.step,
+                                  self.agent_id(payer),
+                                  self.agent_id(payee),
+                                  amount,
+                                  NO_CATEGORY if category is None else category)
+        self.size += 1
+
+    def _full(self):
+        if self.path is not None:
+            self.flush()
+        else:
+            buffer = np.zeros(2 * self.buffer.size, dtype=DTYPE)
+            buffer[:self.size] = self.buffer
+            self.buffer = buffer
+
+    def rows(self):
+        """Rows not flushed yet"""
+        return self.buffer[:self.size]
+
+    def chunk_name(self, chunk):
+        return os.path.join(self.path, "transactions_%06d.%s" % (chunk, self.file_format))
+
+    def flush(self):
+        """Write the buffered rows as a new chunk file"""
+        if self.path is None or self.size == 0:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        rows = self.rows()
+        if self.file_format == "parquet":
+            table = pyarrow.table({name: rows[name] for name in DTYPE.names})
+            pyarrow.parquet.write_table(table, self.chunk_name(self.chunks))
+        else:
+            np.save(self.chunk_name(self.chunks), rows)
+        self.chunks += 1
+        self.size = 0
+
+    def close(self):
+        """Flush the rows and write the agent names"""
+        if self.path is None:
+            return
+        self.flush()
+        os.makedirs(self.path, exist_ok=True)
+        np.save(os.path.join(self.path, "transactions_agents.npy"), np.array(self.names))
+
+    @staticmethod
+    def load(path):
+        """Read all the chunk files of a journal
+
+        Returns:
+            numpy.ndarray: the journal rows, in recording order
+        """
+        chunks = []
+        for name in sorted(glob.glob(os.path.join(path, "transactions_[0-9]*"))):
+            if name.endswith(".parquet"):
+                if pyarrow is None:
+                    raise ValueError("pyarrow is needed to read %s" % name)
+                table = pyarrow.parquet.read_table(name)
+                chunk = np.zeros(table.num_rows, dtype=DTYPE)
+                for column in DTYPE.names:
+                    chunk[column] = table.column(column).to_numpy()
+                chunks.append(chunk)
+            else:
+                chunks.append(np.load(name))
+        if not chunks:
+            return np.zeros(0, dtype=DTYPE)
+        return np.concatenate(chunks)
+
+    @staticmethod
+    def flows_by_category(rows):
+        """Total amount paid in every category
+
+        Returns:
+            dict: {category code: amount}
+        """
+        categories, index = np.unique(rows["category"], return_inverse=True)
+        totals = np.bincount(index, weights=rows["amount"], minlength=categories.size)
+        return {int(category): float(total) for category, total in zip(categories, totals)}
+
+    @staticmethod
+    def net_flows(rows, agents=None):
+        """Net cash flow (received - paid) of every agent id
+
+        Comparing the net flows with the change of the cash holdings
+        of the agents checks the stock-flow consistency of a run.
+        """
+        if agents is None:
+            agents = int(max(rows["payer"].max(initial=-1), rows["payee"].max(initial=-1))) + 1
+        received = np.bincount(rows["payee"], weights=rows["amount"], minlength=agents)
+        paid = np.bincount(rows["payer"], weights=rows["amount"], minlength=agents)
+        return received - paid
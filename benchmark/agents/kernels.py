@@ -0,0 +1,332 @@
+""" Equation kernels
+
+This module exposes the equations of model_equations.py and
+macro_equations.py as kernels over arrays of agents: every argument may
+be a scalar or an array with one value per agent (broadcast as NumPy
+does), and the kernel returns the value of the equation for every
+agent, the same the scalar equation gives for each one.
+
+    - Element-wise equations (ELEMENTWISE) with only arithmetic are
+      already array safe and are used as they are. The ones with
+      min/max, conditions or math functions have a NumPy version here.
+      If numba is installed, all of them are compiled as numba ufuncs
+      of the scalar equations instead.
+    - Equations summing over a sequence per agent (REDUCTIONS: loans,
+      machines, wages, ...) take one row per agent and sum (or average)
+      along the last axis. Ragged sequences are padded with zeros, the
+      padding does not change the sums (the averages need full rows).
+      eta and t (loan terms and clock) are scalars.
+
+The tests (tests/test_kernels.py) compare every kernel with its scalar
+equation on random arguments.
+
+Example:
+
+    from agents import kernels
+    uD = kernels.uD_ct(yD, k, mu_k)           # arrays of the CG firms
+    Lp = kernels.Lp_ct(rates, loans, eta, t)  # (firms, eta) arrays
+
+Todo:
+
+"""
+
+import functools
+import inspect
+
+import numpy as np
+
+from . import macro_equations, model_equations
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+###############################
+# CG firm equations
+###############################
+zc_expectation = model_equations.zc_expectation
+yD_ct = model_equations.yD_ct
+
+def uD_ct(yD_ct, k_ct, mu_k):
+    return np.minimum(1, yD_ct / (k_ct * mu_k))
+
+ND_ct = model_equations.ND_ct
+N_ct = model_equations.N_ct
+mu_ct = model_equations.mu_ct
+p_ct = model_equations.p_ct
+C_ct = model_equations.C_ct
+
+def W_ct(w_nt):
+    return np.sum(w_nt, axis=-1)
+
+def _loan_costs(i_l_j, L_cj, eta, t):
+    # the term of the j-th loan of a row is weighted (j + 1) / eta
+    i_l_j = np.asarray(i_l_j)
+    L_cj = np.asarray(L_cj)
+    m = min(i_l_j.shape[-1], L_cj.shape[-1], max(eta, 0))
+    weights = (np.arange(m) + 1) / eta
+    return np.sum(i_l_j[..., :m] * L_cj[..., :m] * weights, axis=-1)
+
+def Lp_ct(i_l_j, L_cj, eta, t):
+    return _loan_costs(i_l_j, L_cj, eta, t)
+
+def C_kct(k_k, p_k, kappa):
+    k_k = np.asarray(k_k)
+    p_k = np.asarray(p_k)
+    m = min(k_k.shape[-1], p_k.shape[-1])
+    return np.sum(k_k[..., :m] * p_k[..., :m] / np.expand_dims(kappa, -1), axis=-1)
+
+R_ct = model_equations.R_ct
+Sr_ct = model_equations.Sr_ct
+I_dct = model_equations.I_dct
+Inv_ct = model_equations.Inv_ct
+uc_ct = model_equations.uc_ct
+pi_ct = model_equations.pi_ct
+
+def T_ct(tau_pi_ct, pi_ct):
+    return np.maximum(tau_pi_ct * pi_ct, 0)
+
+def Div_ct(rho_c, pi_ct, tau_pi_ct):
+    return np.maximum(0, rho_c * pi_ct * (1 - tau_pi_ct))
+
+OCF_ct = model_equations.OCF_ct
+
+def r_ct(OCF, k_k, p_k, age_kt_prev, kappa):
+    k_k = np.asarray(k_k)
+    p_k = np.asarray(p_k)
+    age_kt_prev = np.asarray(age_kt_prev)
+    m = min(k_k.shape[-1], p_k.shape[-1], age_kt_prev.shape[-1])
+    kappa = np.expand_dims(kappa, -1)
+    denom = np.sum(k_k[..., :m] * p_k[..., :m] * (1 - age_kt_prev[..., :m] / kappa), axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denom != 0, OCF / denom, 0)
+
+gD_ct = model_equations.gD_ct
+iD_ct = model_equations.iD_ct
+ID_ct = model_equations.ID_ct
+LD_ct = model_equations.LD_ct
+
+###############################
+# KG firm equations
+###############################
+zk_expectation = model_equations.zk_expectation
+yD_kt = model_equations.yD_kt
+ND_kt = model_equations.ND_kt
+N_kt = model_equations.N_kt
+mu_kt = model_equations.mu_kt
+p_kt = model_equations.p_kt
+C_kt = model_equations.C_kt
+
+def W_kt(w_nt):
+    return np.sum(w_nt, axis=-1)
+
+def I_lkt(i_l_j, L_cj, eta, t):
+    return _loan_costs(i_l_j, L_cj, eta, t)
+
+R_kt = model_equations.R_kt
+Sr_kt = model_equations.Sr_kt
+I_dkt = model_equations.I_dkt
+Inv_kt = model_equations.Inv_kt
+uc_kt = model_equations.uc_kt
+pi_kt = model_equations.pi_kt
+
+def T_kt(tau_pi_kt, pi_kt):
+    return np.maximum(tau_pi_kt * pi_kt, 0)
+
+def Div_kt(rho_k, pi_kt, tau_pi_kt):
+    return np.maximum(0, rho_k * pi_kt * (1 - tau_pi_kt))
+
+OCF_kt = model_equations.OCF_kt
+
+def Lp_kt(i_l_j, L_kj, eta, t):
+    return _loan_costs(i_l_j, L_kj, eta, t)
+
+LD_kt = model_equations.LD_kt
+
+###############################
+# Bank equations
+###############################
+def CR_bt(NW_bt, Ltot_bt):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(Ltot_bt != 0, NW_bt / Ltot_bt, 0)
+
+def i_l_bt(i_l_bt_prev, FN, CR_bt, CR_T_t):
+    return np.where(CR_bt < CR_T_t, i_l_bt_prev * (1 + FN), i_l_bt_prev * (1 - FN))
+
+def i_l_bt_avg(i_l_bt_prev_list):
+    return np.mean(i_l_bt_prev_list, axis=-1)
+
+ds_Ld = model_equations.ds_Ld
+prD_x = model_equations.prD_x
+
+def i_d_bt(i_d_bt_prev, FN, LR_bt, LR_T_t):
+    return np.where(LR_bt < LR_T_t, i_d_bt_prev * (1 + FN), i_d_bt_prev * (1 - FN))
+
+def i_d_bt_avg(i_d_bt_prev_list):
+    return np.mean(i_d_bt_prev_list, axis=-1)
+
+###############################
+# Household equations
+###############################
+pe_ht = model_equations.pe_ht
+
+def wD_ht(wD_ht_prev, FN, u_hist, u_t_prev, upsilon):
+    # the second branch of the scalar equation is never taken
+    unemployed_quarters = np.sum(u_hist, axis=-1)
+    return np.where(unemployed_quarters > 2, wD_ht_prev * (1 - FN), wD_ht_prev)
+
+y_ht = model_equations.y_ht
+yd_h = model_equations.yd_h
+cD_ht = model_equations.cD_ht
+
+###############################
+# Government equations
+###############################
+T_t = model_equations.T_t
+T_t_alt = model_equations.T_t_alt
+yg_t = model_equations.yg_t
+N_gt = model_equations.N_gt
+govLayoff = model_equations.govLayoff
+
+def W_gt(W_n):
+    return np.sum(W_n, axis=-1)
+
+UD_t = model_equations.UD_t
+B_t = model_equations.B_t
+G_t = model_equations.G_t
+Gb_t = model_equations.Gb_t
+
+###############################
+# Central Bank equations
+###############################
+pi_CBt = model_equations.pi_CBt
+
+###############################
+# Macro equations
+###############################
+def prob_innovation_success(zeta, L_res):
+    return 1 - np.exp(-zeta * L_res)
+
+new_consumption_good_productivity = macro_equations.new_consumption_good_productivity
+new_capital_good_productivity = macro_equations.new_capital_good_productivity
+
+def technology_adoption_rule(p_k_old, gamma_old, p_k_new, gamma_new, b):
+    return np.minimum(p_k_old + b * gamma_old, p_k_new + b * gamma_new)
+
+def direct_labor_demand_capital(I_c_D_sum, y_k):
+    return np.ceil(I_c_D_sum / y_k)
+
+def indirect_labor_demand_capital(rho2, I_c_D_nom_sum, w_k_ind, rho3, L_k_dir):
+    return np.floor(rho2 * I_c_D_nom_sum / w_k_ind) + np.floor(rho3 * L_k_dir)
+
+def capital_goods_production(L_k_dir, y_k, h, L_k_man_D, L_k_dir_D, L_k_man, L_k_dir_actual,
+                             Q_indicator, I_c_D_sum):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        management_shortage = np.where(Q_indicator,
+                                       L_k_man_D / L_k_dir_D - L_k_man / L_k_dir_actual, 0)
+    prod = np.abs(L_k_dir * y_k * (1 - h * management_shortage))
+    return np.minimum(prod, I_c_D_sum)
+
+price_new_machines = macro_equations.price_new_machines
+
+def direct_labor_demand_consumption(Q_c_d, y_c_star_avg):
+    return np.ceil(Q_c_d / y_c_star_avg)
+
+indirect_labor_demand_consumption = macro_equations.indirect_labor_demand_consumption
+
+def consumption_goods_production(L_c_dir, y_c_avg, h, L_c_ind_D, L_c_dir_D, L_c_ind,
+                                 L_c_dir_actual, Q_indicator):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        management_shortage = np.where(Q_indicator,
+                                       L_c_ind_D / L_c_dir_D - L_c_ind / L_c_dir_actual, 0)
+    return L_c_dir * y_c_avg * (1 - h * management_shortage)
+
+payback_period = macro_equations.payback_period
+markup_market_share = macro_equations.markup_market_share
+markup_unit_costs = macro_equations.markup_unit_costs
+firm_competitiveness = macro_equations.firm_competitiveness
+market_share_evolution = macro_equations.market_share_evolution
+markup_deviation_exports = macro_equations.markup_deviation_exports
+export_price = macro_equations.export_price
+
+def export_market_share(iota2, p_x_c, p_x_x, iota3):
+    return iota2 * (1 - np.exp(-np.power(p_x_c / p_x_x, iota3)))
+
+real_export_demand = macro_equations.real_export_demand
+realized_exports = macro_equations.realized_exports
+
+def desired_wage_worker(w_h_star, gamma1, g_prev, indicator_g, T_w, gamma2):
+    return np.where(T_w == 0, w_h_star * (1 + gamma1 * g_prev * indicator_g),
+                    w_h_star * (1 - gamma2 * T_w))
+
+def household_consumption_demand(c1, C_h_prev, p_C_prev, p_C_exp, c2_j, w_h, Pi_h_prev,
+                                 tau, d_h, c3, D_h):
+    option1 = c1 * (C_h_prev / p_C_prev) * p_C_exp
+    option2 = c2_j * ((w_h + Pi_h_prev) * (1 - tau) + d_h) + c3 * D_h
+    return np.maximum(option1, option2)
+
+interest_rate_rule = macro_equations.interest_rate_rule
+firm_desired_wage = macro_equations.firm_desired_wage
+wage_setting = macro_equations.wage_setting
+price_imported_goods = macro_equations.price_imported_goods
+
+def import_market_share(iota4, p_C_avg, p_x, iota5):
+    return iota4 * (1 - np.exp(-np.power(p_C_avg / p_x, iota5)))
+
+nominal_import_demand = macro_equations.nominal_import_demand
+nominal_exchange_rate = macro_equations.nominal_exchange_rate
+real_exchange_rate = macro_equations.real_exchange_rate
+
+
+# equations summing over a sequence per agent: {name: sequence arguments}
+REDUCTIONS = {"W_ct": ("w_nt",),
+              "Lp_ct": ("i_l_j", "L_cj"),
+              "C_kct": ("k_k", "p_k"),
+              "r_ct": ("k_k", "p_k", "age_kt_prev"),
+              "W_kt": ("w_nt",),
+              "I_lkt": ("i_l_j", "L_cj"),
+              "Lp_kt": ("i_l_j", "L_kj"),
+              "i_l_bt_avg": ("i_l_bt_prev_list",),
+              "i_d_bt_avg": ("i_d_bt_prev_list",),
+              "wD_ht": ("u_hist",),
+              "W_gt": ("W_n",)}
+
+
+def _equations():
+    """Scalar equations of the kernels, {name: function}"""
+    equations = {}
+    for module in (model_equations, macro_equations):
+        for name, function in inspect.getmembers(module, inspect.isfunction):
+            if function.__module__ == module.__name__:
+                equations[name] = function
+    return equations
+
+
+EQUATIONS = _equations()
+ELEMENTWISE = tuple(name for name in EQUATIONS if name not in REDUCTIONS)
+
+
+def _vectorize(scalar, fallback):
+    """numba ufunc of a scalar equation, the NumPy kernel is used if
+    numba cannot compile it for the arguments
+    """
+    ufunc = numba.vectorize(scalar)
+
+    @functools.wraps(scalar)
+    def kernel(*args):
+        nonlocal ufunc
+        if ufunc is not None:
+            try:
+                return ufunc(*args)
+            except (numba.core.errors.NumbaError, TypeError):
+                ufunc = None
+        return fallback(*args)
+    return kernel
+
+
+if numba is not None:
+    for _name in ELEMENTWISE:
+        globals()[_name] = _vectorize(EQUATIONS[_name], globals()[_name])
+
@@ -0,0 +1,222 @@
+""" Ledger
+
+This module implements an economy-wide ledger backing the balance
+sheets of the agents. The ledger has one row per balance sheet and one
+column per account (the names used as keys of ``assets`` and
+``liabilities``: cash, labor, capital, loan, ...).
+
+The holdings themselves live in a ``GoodsStore`` (see goods_store.py).
+The ledger adds three columns to the store, the balance sheet row, the
+side (asset or liability) and the account of every good that is
+included in a balance sheet, so the asset and liability matrices of
+the whole economy are one ``bincount`` over the store. Goods that are
+not in the store (e.g. partial fills kept as assets) are tracked
+apart and added to the matrices.
+
+A good is booked in the last balance sheet that included it.
+
+Example:
+
+    ledger = Ledger().activate()     # before the agents are created
+    ...                              # run the simulation
+    ledger.total("cash")
+    ledger.by_sector("loan", LIABILITY)
+    ledger.check_consistency(expected_net_worth)
+
+Todo:
+
+"""
+
+import numpy as np
+
+from .goods_store import GoodsStore, StoredGood
+
+
+ASSET = 1
+LIABILITY = -1
+NO_SHEET = -1
+NO_ACCOUNT = -1
+
+
+class Ledger:
+    """Economy-wide ledger of the balance sheets
+
+    Args:
+        store (GoodsStore, optional): store of the goods, a new store
+            is created if not given.
+    """
+
+    def __init__(self, store=None):
+        if store is None:
+            store = GoodsStore()
+        self.store = store
+        store.add_column("sheet", np.int64, NO_SHEET)
+        store.add_column("side", np.int8, 0)
+        store.add_column("account", np.int32, NO_ACCOUNT)
+        self.sheets = []
+        self.sectors = []
+        self.sector_index = {}
+        self._sheet_sector = []
+        self.accounts = []
+        self.account_index = {}
+        self._loose = {}
+
+    def activate(self):
+        """Attach the balance sheets created from now on to this ledger"""
+        from .balance_sheet import BalanceSheet
+        self.store.activate()
+        BalanceSheet.ledger = self
+        return self
+
+    def deactivate(self):
+        """Stop attaching new balance sheets to this ledger"""
+        from .balance_sheet import BalanceSheet
+        self.store.deactivate()
+        if BalanceSheet.ledger is self:
+            BalanceSheet.ledger = None
+
+    def __len__(self):
+        return len(self.sheets)
+
+    # --- booking ------------------------------------------------------
+
+    def attach(self, balance_sheet, sector=None):
+        """Give a row of the ledger to a balance sheet
+
+        Args:
+            balance_sheet (BalanceSheet): the balance sheet
+            sector (str, optional): sector of the agent, by default the
+                class name of the owner of the bookkeeper.
+
+        Returns:
+            int: the row of the balance sheet
+        """
+        if sector is None:
+            owner = getattr(balance_sheet.bk, "owner", None)
+            sector = type(owner).__name__ if owner is not None else "None"
+        sector_id = self.sector_index.get(sector)
+        if sector_id is None:
+            sector_id = self.sector_index[sector] = len(self.sectors)
+            self.sectors.append(sector)
+
+        row = len(self.sheets)
+        self.sheets.append(balance_sheet)
+        self._sheet_sector.append(sector_id)
+        balance_sheet.ledger_row = row
+        for name, a_good in balance_sheet.assets.items():
+            self.post(row, name, a_good, ASSET)
+        for name, a_good in balance_sheet.liabilities.items():
+            self.post(row, name, a_good, LIABILITY)
+        return row
+
+    def account_id(self, account):
+        """Column of an account"""
+        account_id = self.account_index.get(account)
+        if account_id is None:
+            account_id = self.account_index[account] = len(self.accounts)
+            self.accounts.append(account)
+        return account_id
+
+    def post(self, row, account, a_good, side):
+        """Book a good in an account of a balance sheet"""
+        account_id = self.account_id(account)
+        if isinstance(a_good, StoredGood) and a_good._store is self.store:
+            store = self.store
+            store.sheet[a_good._row] = row
+            store.side[a_good._row] = side
+            store.account[a_good._row] = account_id
+        else:
+            self._loose[(row, side, account_id)] = a_good
+
+    def unpost(self, row, account, a_good, side):
+        """Remove a good from an account of a balance sheet"""
+        account_id = self.account_index.get(account)
+        self._loose.pop((row, side, account_id), None)
+        if isinstance(a_good, StoredGood) and a_good._store is self.store:
+            store = self.store
+            if store.sheet[a_good._row] == row:
+                store.sheet[a_good._row] = NO_SHEET
+                store.side[a_good._row] = 0
+                store.account[a_good._row] = NO_ACCOUNT
+
+    # --- aggregates ---------------------------------------------------
+
+    def matrix(self, side=ASSET):
+        """Values (price * quantity) of every balance sheet and account
+
+        Returns:
+            numpy.ndarray: (balance sheets, accounts) matrix
+        """
+        store = self.store
+        n = store.size
+        rows, columns = len(self.sheets), len(self.accounts)
+        mask = store.alive[:n] & (store.side[:n] == side)
+        cells = store.sheet[:n][mask] * columns + store.account[:n][mask]
+        values = store.price[:n][mask] * store.quantity[:n][mask]
+        matrix = np.bincount(cells, weights=values, minlength=rows * columns)
+        matrix = matrix.reshape(rows, columns)
+        for (row, loose_side, account_id), a_good in self._loose.items():
+            if loose_side == side:
+                matrix[row, account_id] += a_good.c_price * a_good.c_quantity
+        return matrix
+
+    def total(self, account=None, side=ASSET):
+        """Economy-wide value of an account (or of a whole side)"""
+        matrix = self.matrix(side)
+        if account is None:
+            return float(matrix.sum())
+        if account not in self.account_index:
+            return 0.0
+        return float(matrix[:, self.account_index[account]].sum())
+
+    def net_worth(self):
+        """Net worth (assets - liabilities) of every balance sheet"""
+        return self.matrix(ASSET).sum(axis=1) - self.matrix(LIABILITY).sum(axis=1)
+
+    def by_sector(self, account=None, side=ASSET):
+        """Value of an account (or of a whole side) by sector
+
+        Returns:
+            dict: {sector: value}
+        """
+        matrix = self.matrix(side)
+        if account is None:
+            values = matrix.sum(axis=1)
+        elif account in self.account_index:
+            values = matrix[:, self.account_index[account]]
+        else:
+            values = np.zeros(len(self.sheets))
+        totals = np.bincount(np.asarray(self._sheet_sector, dtype=np.int64),
+                             weights=values, minlength=len(self.sectors))
+        return {sector: float(totals[i]) for i, sector in enumerate(self.sectors)}
+
+    def check_consistency(self, net_worth, tol=1e-9):
+        """Check the balance sheets of all the agents
+
+        Every balance sheet must hold no negative asset or liability
+        and satisfy assets = liabilities + net worth. The balance
+        sheets have no net worth account (``net_worth()`` is assets -
+        liabilities), so the expected net worth comes from outside the
+        ledger, e.g. the opening net worth plus the savings of every
+        agent.
+
+        Args:
+            net_worth (array): expected net worth of every balance
+                sheet, in ledger row order
+            tol (float): absolute tolerance
+
+        Returns:
+            numpy.ndarray: rows of the balance sheets that fail the check
+
+        Raises:
+            ValueError: If net_worth has not one value per balance sheet.
+        """
+        net_worth = np.asarray(net_worth, dtype=float)
+        if net_worth.shape != (len(self.sheets),):
+            raise ValueError("net_worth must have one value per balance sheet")
+        assets = self.matrix(ASSET)
+        liabilities = self.matrix(LIABILITY)
+        bad = (assets < -tol).any(axis=1) | (liabilities < -tol).any(axis=1)
+        residual = assets.sum(axis=1) - liabilities.sum(axis=1) - net_worth
+        bad |= np.abs(residual) > tol
+        return np.flatnonzero(bad)
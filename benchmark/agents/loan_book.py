@@ -0,0 +1,317 @@
+""" Loan book
+
+This module implements the book of the loans of an agent (the loans a
+firm owes or the loans a bank granted).
+
+The loans are annuities: a loan of principal P at rate r for n terms
+is repaid with n equal payments A = P * r / (1 - (1 + r) ** -n), each
+one split in interest (r times the remaining balance) and principal.
+The schedule of every loan is computed once, when the loan is booked,
+and stored in flat NumPy arrays (one segment per loan), so the
+interest and principal due in a period by all the loans is a single
+gather.
+
+The periods of the books follow the steps of the simulation clock
+(see clock.py): a loan granted in step t pays its first term in step
+t + 1, so the lender and the borrower book it with the same start
+whichever of them closes its period first. ``advance()`` moves the
+book to the next period once the terms of the period are paid, and a
+book that did not advance in some steps catches up with the clock.
+
+The loans are identified by the ids of a ``LoanIdAllocator``. The ids
+come from the simulation clock (the step) and a sequence number within
+the step, so they increase monotonically and the same run always gives
+the same ids. Records that sum the loans of an agent (the "loan"
+liability of a balance sheet) use ``AGGREGATE_LOAN_ID`` and take no id
+from the allocator.
+
+Example:
+
+    book = LoanBook()
+    row = book.book(a_loan, a_loan.c_id, n_term=eta)
+    rows, interest, principal = book.due()
+    book.advance()
+
+Todo:
+
+"""
+
+import numpy as np
+
+from .clock import clock as simulation_clock
+
+
+class LoanIdAllocator:
+    """Monotonic loan ids from the simulation clock
+
+    The id of a loan is ``step * STEP_SPAN + sequence * workers +
+    worker``: the step is the step of the simulation clock (see
+    clock.py) and the sequence restarts every step and every new
+    simulation, so a run gives the same ids however many runs came
+    before it in the process. The worker number keeps apart the ids of
+    allocators that must not collide, e.g. of runs whose loans are
+    merged later; a single run uses the defaults.
+
+    Args:
+        worker (int): number of this allocator
+        workers (int): number of allocators whose ids must not collide
+        clock (SimulationClock): the clock, the shared one if not given
+    """
+
+    STEP_SPAN = 2 ** 32
+
+    def __init__(self, worker=0, workers=1, clock=None):
+        if not 0 <= worker < workers:
+            raise ValueError("worker must be in range(workers)")
+        self.worker = worker
+        self.workers = workers
+        self.clock = simulation_clock if clock is None else clock
+        self.sequence = 0
+        self._step = None
+
+    @property
+    def step(self):
+        """Step of the simulation clock"""
+        return self.clock.step
+
+    def sync(self):
+        """Restart the sequence if the clock moved to a new step or simulation"""
+        step = (self.clock.simulation, self.clock.step)
+        if step != self._step:
+            self._step = step
+            self.sequence = 0
+
+    def next_id(self):
+        """Return a new loan id"""
+        self.sync()
+        offset = self.sequence * self.workers + self.worker
+        if offset >= self.STEP_SPAN:
+            raise OverflowError("Too many loans in one step")
+        self.sequence += 1
+        return self.clock.step * self.STEP_SPAN + offset
+
+
+# allocator shared by the banks and the firms
+loan_ids = LoanIdAllocator()
+
+# id of the records that sum loans, never given to a loan (the loan
+# ids are not negative and -1 is the "no value" of the snapshots)
+AGGREGATE_LOAN_ID = -2
+
+
+def annuity_coefficient(rate, n_term):
+    """Share of the principal paid in every term of an annuity
+
+    Args:
+        rate (float): interest rate per term
+        n_term (int): number of terms
+
+    Returns:
+        float: r / (1 - (1 + r) ** -n), or 1 / n if the rate is zero
+    """
+    if n_term <= 0:
+        return 1.0
+    if rate == 0.0:
+        return 1.0 / n_term
+    return rate / (1.0 - (1.0 + rate) ** -n_term)
+
+
+def amortization_schedule(principal, rate, n_term):
+    """Interest, principal and balance of every term of an annuity
+
+    Returns:
+        tuple: (interest, principal, balance) arrays of n_term values,
+            the balance is the principal outstanding before the term.
+    """
+    n_term = max(1, int(n_term))
+    k = np.arange(n_term)
+    payment = principal * annuity_coefficient(rate, n_term)
+    if rate == 0.0:
+        balance = principal - payment * k
+    else:
+        growth = (1.0 + rate) ** k
+        balance = principal * growth - payment * (growth - 1.0) / rate
+    interest = rate * balance
+    return interest, payment - interest, balance
+
+
+class LoanBook:
+    """Book of loans with precomputed amortization schedules
+
+    Args:
+        capacity (int): initial number of loans, the arrays double when
+            they are full.
+        clock (SimulationClock): the clock, the shared one if not given
+    """
+
+    COLUMNS = (("principal", np.float64), ("rate", np.float64),
+               ("term", np.int64), ("start", np.int64),
+               ("offset", np.int64), ("paid", np.float64),
+               ("active", bool))
+
+    def __init__(self, capacity=16, clock=None):
+        capacity = max(1, int(capacity))
+        self.clock = simulation_clock if clock is None else clock
+        for column, dtype in self.COLUMNS:
+            setattr(self, column, np.zeros(capacity, dtype=dtype))
+        self.sched_interest = np.zeros(4 * capacity)
+        self.sched_principal = np.zeros(4 * capacity)
+        self.sched_balance = np.zeros(4 * capacity)
+        self.size = 0
+        self.sched_size = 0
+        self.period = 0
+        self.loans = []
+        self.keys = []
+        self._rows = {}
+
+    def __len__(self):
+        return int(self.active[:self.size].sum())
+
+    def __contains__(self, key):
+        return key in self._rows
+
+    def __getitem__(self, key):
+        return self.loans[self._rows[key]]
+
+    def __iter__(self):
+        return iter([key for key, row in self._rows.items() if self.active[row]])
+
+    def values(self):
+        return [self.loans[row] for row in self._rows.values() if self.active[row]]
+
+    def _grow_rows(self):
+        capacity = 2 * self.principal.size
+        for column, dtype in self.COLUMNS:
+            old = getattr(self, column)
+            new = np.zeros(capacity, dtype=dtype)
+            new[:old.size] = old
+            setattr(self, column, new)
+
+    def _grow_schedule(self, needed):
+        capacity = max(2 * self.sched_interest.size, needed)
+        for column in ("sched_interest", "sched_principal", "sched_balance"):
+            old = getattr(self, column)
+            new = np.zeros(capacity)
+            new[:old.size] = old
+            setattr(self, column, new)
+
+    def book(self, a_loan, key, n_term=None):
+        """Book a loan and compute its schedule
+
+        Args:
+            a_loan (Loan): the loan, c_quantity is the principal and
+                c_price the interest rate per term
+            key: key of the loan in the book
+            n_term (int, optional): number of terms, a_loan.n_term if
+                not given
+
+        Returns:
+            int: the row of the loan
+
+        Raises:
+            NameError: If a loan with the same key is in the book.
+        """
+        if key in self._rows:
+            raise NameError("This loan is already in the loans dict")
+        if n_term is None:
+            n_term = a_loan.n_term
+        n_term = max(1, int(n_term))
+        interest, principal, balance = amortization_schedule(
+            float(a_loan.c_quantity), float(a_loan.c_price), n_term)
+
+        if self.size == self.principal.size:
+            self._grow_rows()
+        if self.sched_size + n_term > self.sched_interest.size:
+            self._grow_schedule(self.sched_size + n_term)
+        row = self.size
+        offset = self.sched_size
+        self.sched_interest[offset:offset + n_term] = interest
+        self.sched_principal[offset:offset + n_term] = principal
+        self.sched_balance[offset:offset + n_term] = balance
+        self.principal[row] = a_loan.c_quantity
+        self.rate[row] = a_loan.c_price
+        self.term[row] = n_term
+        self.start[row] = self.clock.step + 1
+        self.offset[row] = offset
+        self.active[row] = True
+        self.size += 1
+        self.sched_size += n_term
+        self.paid[row] = 0.0
+        self.loans.append(a_loan)
+        self.keys.append(key)
+        self._rows[key] = row
+        return row
+
+    def remove(self, key):
+        """Remove a loan from the book (its schedule is not used anymore)"""
+        row = self._rows.pop(key)
+        self.active[row] = False
+        return self.loans[row]
+
+    def _terms(self, period):
+        n = self.size
+        k = period - self.start[:n]
+        rows = np.flatnonzero(self.active[:n] & (k >= 0) & (k < self.term[:n]))
+        return rows, self.offset[rows] + k[rows]
+
+    def current_period(self):
+        """Period of the book, caught up with the simulation clock"""
+        self.period = max(self.period, self.clock.step)
+        return self.period
+
+    def due(self, period=None):
+        """Interest and principal due by every loan in a period
+
+        Returns:
+            tuple: (rows, interest, principal) arrays
+        """
+        if period is None:
+            period = self.current_period()
+        rows, index = self._terms(period)
+        return rows, self.sched_interest[index], self.sched_principal[index]
+
+    def total_due(self, period=None):
+        """Total payment (interest + principal) due in a period"""
+        _, interest, principal = self.due(period)
+        return float(interest.sum() + principal.sum())
+
+    def outstanding(self, period=None):
+        """Principal outstanding of the loans at the start of a period
+
+        The loans that did not start yet owe their whole principal.
+        """
+        if period is None:
+            period = self.current_period()
+        rows, index = self._terms(period)
+        n = self.size
+        waiting = self.active[:n] & (self.start[:n] > period)
+        return float(self.sched_balance[index].sum() + self.principal[:n][waiting].sum())
+
+    def mean_rate(self):
+        """Interest rate of the active loans weighted by their principal"""
+        n = self.size
+        weights = self.principal[:n] * self.active[:n]
+        total = weights.sum()
+        if total == 0.0:
+            return 0.0
+        return float(np.dot(self.rate[:n], weights) / total)
+
+    def advance(self):
+        """Close the period: record the payments and retire paid loans"""
+        period = self.current_period()
+        rows, interest, principal = self.due(period)
+        self.paid[rows] += interest + principal
+        n = self.size
+        finished = np.flatnonzero(self.active[:n] &
+                                  (period - self.start[:n] + 1 >= self.term[:n]))
+        self.active[finished] = False
+        for row in finished:
+            self._rows.pop(self.keys[row], None)
+        self.period = period + 1
+
+    def sync_loans(self):
+        """Copy the payments recorded in the book to the Loan goods"""
+        for row, a_loan in enumerate(self.loans):
+            a_loan.n_paid = int(min(max(self.period - self.start[row], 0), self.term[row]))
+            a_loan.ammount_due -= float(self.paid[row]) - a_loan.value_paid
+            a_loan.value_paid = float(self.paid[row])
@@ -0,0 +1,127 @@
+""" Random number streams
+
+This module implements the random number service of a simulation. The
+service gives every agent class its own stream, a
+``numpy.random.Generator`` seeded from a ``SeedSequence`` spawned with
+the name of the class (and the worker number), so the draws of a class
+do not depend on the draws of the other classes nor on the order the
+streams are created.
+
+A scalar NumPy draw costs microseconds of call overhead, so the streams
+draw blocks of variates per distribution and hand them out from a
+buffer. Every distribution (with its parameters) has its own generator
+and buffer, and batched draws (``size=n``) are taken from the same
+buffer as the scalar ones, so an agent-by-agent run and a sector run
+(see cgfirm_sector.py) use the same sequence of variates.
+
+Example:
+
+    rng = RNGService(seed=42).activate()    # before the first step
+    rng.stream("Household").lognormal(1.0, 0.03)
+    rng.stream("CGFirm").random(size=100)
+
+Todo:
+
+"""
+
+import zlib
+
+import numpy as np
+
+
+class RNGStream:
+    """Buffered random numbers of one stream
+
+    Args:
+        seed_sequence (numpy.random.SeedSequence): seed of the stream
+        block_size (int): variates drawn per block and distribution
+    """
+
+    def __init__(self, seed_sequence, block_size=4096):
+        self.seed_sequence = seed_sequence
+        self.block_size = max(1, int(block_size))
+        self._generators = {}
+        self._buffers = {}
+
+    def generator(self, key):
+        """Generator of a distribution, key is its name and parameters"""
+        generator = self._generators.get(key)
+        if generator is None:
+            seed_sequence = np.random.SeedSequence(
+                self.seed_sequence.entropy,
+                spawn_key=self.seed_sequence.spawn_key + (zlib.crc32(repr(key).encode()),))
+            generator = self._generators[key] = np.random.Generator(np.random.PCG64(seed_sequence))
+        return generator
+
+    def _take(self, key, sampler, size):
+        buffer, position = self._buffers.get(key, ((), 0))
+        n = 1 if size is None else int(np.prod(size))
+        if position + n > len(buffer):
+            block = sampler(self.generator(key), max(self.block_size, n)).tolist()
+            buffer, position = list(buffer[position:]) + block, 0
+        self._buffers[key] = (buffer, position + n)
+        if size is None:
+            return buffer[position]
+        return np.array(buffer[position:position + n]).reshape(size)
+
+    def random(self, size=None):
+        """Uniform variates in [0, 1)"""
+        return self._take(("random",), _random, size)
+
+    def lognormal(self, mean=0.0, sigma=1.0, size=None):
+        """Lognormal variates"""
+        return self._take(("lognormal", mean, sigma),
+                          lambda generator, n: generator.lognormal(mean, sigma, n), size)
+
+    def normal(self, loc=0.0, scale=1.0, size=None):
+        """Normal variates"""
+        return self._take(("normal", loc, scale),
+                          lambda generator, n: generator.normal(loc, scale, n), size)
+
+
+def _random(generator, n):
+    return generator.random(n)
+
+
+class RNGService:
+    """Random number streams of a simulation
+
+    Args:
+        seed (int, optional): seed of the simulation, fresh entropy
+            from the OS if not given
+        worker (int): services with the same seed and different
+            worker numbers give independent streams
+        block_size (int): variates drawn per block and distribution
+    """
+
+    def __init__(self, seed=None, worker=0, block_size=4096):
+        self.seed_sequence = np.random.SeedSequence(seed)
+        self.worker = worker
+        self.block_size = block_size
+        self.streams = {}
+
+    def activate(self):
+        """Draw the random numbers of the equations from this service"""
+        from .equations import Equations
+        Equations.rng = self
+        return self
+
+    def deactivate(self):
+        """Draw the random numbers of the equations from np.random"""
+        from .equations import Equations
+        if Equations.rng is self:
+            Equations.rng = None
+
+    def stream(self, name):
+        """Stream of an agent class (created on first use)
+
+        Args:
+            name (str): name of the stream, e.g. the agent class name
+        """
+        stream = self.streams.get(name)
+        if stream is None:
+            seed_sequence = np.random.SeedSequence(
+                self.seed_sequence.entropy,
+                spawn_key=(zlib.crc32(name.encode()), self.worker))
+            stream = self.streams[name] = RNGStream(seed_sequence, self.block_size)
+        return stream
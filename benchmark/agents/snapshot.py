@@ -0,0 +1,453 @@
+""" Snapshots
+
+This module implements a compact binary snapshot of the state of the
+agents: their numeric variables, goods, bookkeepers and balance sheets
+(assets, liabilities, workforce, capital stock and loans). A run can
+save the economy once it has settled and later runs can start from it
+instead of repeating the warm-up steps.
+
+A snapshot is a directory with a versioned JSON header and one NumPy
+structured array (``.npy``) per table, so the tables can be memory
+mapped when loading:
+
+    header.json    - format, version, agent names, strings, loan ids
+    goods.npy      - one row per distinct good
+    refs.npy       - where the goods are (assets, liabilities,
+                     agent and bookkeeper attributes, workforce)
+    scalars.npy    - numeric state variables of the agents and
+                     bookkeepers (see STATE_VARIABLES)
+    capital.npy    - capital stock vintage tables
+    loans.npy      - loan books
+
+A good held in several places (e.g. a Labor good in the assets of a
+household and in the workforce of a firm) is saved once and shared
+again when the snapshot is loaded. The agents are matched by name and
+must exist (created by the model) before loading. The market books are
+not saved, so the offers are posted again after loading. The balance
+sheets are restored through their bookkeeping, so an active Ledger
+follows them.
+
+Example:
+
+    save_snapshot("runs/steady_state", agents)
+    ...
+    load_snapshot("runs/steady_state", agents)
+
+Todo:
+
+"""
+
+import json
+import math
+import os
+
+import numpy as np
+
+from . import loan_book
+from .capital_stock import CapitalStock
+from .clock import clock
+from .goods import (Good, ConsumptionGood, CapitalGood, Labor, Loan, Cash,
+                    PartialFill, GoodType, GoodCategory, GoodConsume)
+from .loan_book import LoanBook
+
+
+FORMAT = "benchmark-snapshot"
+VERSION = 1
+
+GOOD_CLASSES = [Good, ConsumptionGood, CapitalGood, Labor, Loan, Cash, PartialFill]
+
+NONE = -1
+
+# places of a good (refs table)
+ASSET = 0
+LIABILITY = 1
+AGENT_ATTRIBUTE = 2
+BOOKKEEPER_ATTRIBUTE = 3
+WORKFORCE = 4
+
+# owners of a numeric variable (scalars table)
+AGENT = 0
+BOOKKEEPER = 1
+
+# kinds of numeric values
+FLOAT = 0
+INT = 1
+BOOL = 2
+
+# numeric state variables saved for every class (and its subclasses),
+# the other attributes (scheduler, EcoSimpy, caches) are left alone
+STATE_VARIABLES = {
+    "EconomicAgent": ("income", "expenses", "has_offer", "demand_satisfied"),
+    "CGFirm": ("first", "Se_ct", "Se_ct_1", "yd_ct_q", "ud_ct", "kc_t",
+               "Ndc_t", "Ndc_t_1", "delta_N_ct", "N_ct", "mu_ct", "mu_ct_1",
+               "W_ct", "C_ct", "R_ct", "pi_ct", "g_ct", "desired_output"),
+    "KGFirm": ("Se_ct", "Se_ct_1", "Ndk_t"),
+    "Household": ("first_step", "unemployed", "demand_qnt", "labor_qnt",
+                  "hourly_wage", "pe_ht", "pe_ht_1", "wd_ht", "wd_ht_1",
+                  "u_ht_n", "w_ht"),
+    "Bank": ("credit", "zt", "zet", "zet_1", "interest_on_loans",
+             "principal_on_loans"),
+}
+
+
+def state_variables(an_object):
+    """Names of the numeric state variables of an object"""
+    names = []
+    for klass in reversed(type(an_object).__mro__):
+        for name in STATE_VARIABLES.get(klass.__name__, ()):
+            if name not in names:
+                names.append(name)
+    return names
+
+
+GOODS_DTYPE = np.dtype([("cls", np.int8), ("parent", np.int64), ("name", np.int64),
+                        ("type", np.int8), ("category", np.int8), ("consume", np.int8),
+                        ("quantity", np.float64), ("price", np.float64),
+                        ("owner", np.int64), ("producer", np.int64),
+                        ("c_id", np.int64), ("n_term", np.int64), ("n_paid", np.int64),
+                        ("value_paid", np.float64), ("ammount_due", np.float64),
+                        ("date_contract", np.int64)])
+
+REFS_DTYPE = np.dtype([("agent", np.int64), ("place", np.int8), ("key", np.int64),
+                       ("good", np.int64), ("value", np.float64)])
+
+SCALARS_DTYPE = np.dtype([("agent", np.int64), ("owner", np.int8), ("key", np.int64),
+                          ("kind", np.int8), ("value", np.float64)])
+
+CAPITAL_DTYPE = np.dtype([("agent", np.int64), ("good", np.int64), ("c_id", np.int64),
+                          ("quantity", np.float64), ("price", np.float64),
+                          ("age", np.int64), ("productivity", np.float64)])
+
+LOANS_DTYPE = np.dtype([("agent", np.int64), ("book", np.int64), ("good", np.int64),
+                        ("key", np.int64), ("term", np.int64), ("start", np.int64),
+                        ("paid", np.float64), ("active", bool)])
+
+TABLES = {"goods": GOODS_DTYPE, "refs": REFS_DTYPE, "scalars": SCALARS_DTYPE,
+          "capital": CAPITAL_DTYPE, "loans": LOANS_DTYPE}
+
+
+def _number(value):
+    return NONE if value is None else value
+
+
+def _float(value):
+    return math.nan if value is None else value
+
+
+def _optional(value):
+    return None if value == NONE else int(value)
+
+
+def _optional_float(value):
+    return None if math.isnan(value) else float(value)
+
+
+class _Writer:
+    """Collects the tables of a snapshot"""
+
+    def __init__(self, agents):
+        self.agents = list(agents)
+        self.agent_index = {an_agent: i for i, an_agent in enumerate(self.agents)}
+        self.strings = []
+        self.string_index = {}
+        self.good_index = {}
+        self.rows = {table: [] for table in TABLES}
+
+    def string(self, text):
+        index = self.string_index.get(text)
+        if index is None:
+            index = self.string_index[text] = len(self.strings)
+            self.strings.append(text)
+        return index
+
+    def agent(self, an_agent):
+        if an_agent is None:
+            return NONE
+        return self.agent_index.get(an_agent, NONE)
+
+    def good(self, a_good):
+        row = self.good_index.get(id(a_good))
+        if row is not None:
+            return row
+        parent = NONE
+        if isinstance(a_good, PartialFill):
+            parent = self.good(a_good.good)
+        # views of a GoodsStore are saved as their good class
+        cls = next(GOOD_CLASSES.index(klass) for klass in type(a_good).__mro__
+                   if klass in GOOD_CLASSES)
+        row = self.good_index[id(a_good)] = len(self.rows["goods"])
+        self.rows["goods"].append((
+            cls, parent,
+            self.string(a_good.c_name) if a_good.c_name is not None else NONE,
+            _number(a_good.c_type), _number(a_good.c_category), _number(a_good.c_consume),
+            _float(a_good.c_quantity), _float(a_good.c_price),
+            self.agent(a_good.c_owner), self.agent(a_good.c_producer),
+            _number(getattr(a_good, "c_id", None)),
+            _number(getattr(a_good, "n_term", None)),
+            _number(getattr(a_good, "n_paid", None)),
+            _float(getattr(a_good, "value_paid", None)),
+            _float(getattr(a_good, "ammount_due", None)),
+            _number(getattr(a_good, "date_contract", None))))
+        return row
+
+    def ref(self, agent, place, key, a_good, value=0.0):
+        self.rows["refs"].append((agent, place, key, self.good(a_good), value))
+
+    def scalars(self, agent, owner, an_object):
+        for name in state_variables(an_object):
+            value = getattr(an_object, name, None)
+            if isinstance(value, bool) or isinstance(value, np.bool_):
+                kind = BOOL
+            elif isinstance(value, (int, np.integer)):
+                kind = INT
+            elif isinstance(value, (float, np.floating)):
+                kind = FLOAT
+            else:
+                continue
+            self.rows["scalars"].append((agent, owner, self.string(name), kind, float(value)))
+
+    def goods_attributes(self, agent, place, an_object):
+        for name, value in vars(an_object).items():
+            if isinstance(value, (Good, PartialFill)):
+                self.ref(agent, place, self.string(name), value)
+
+    def loan_book(self, agent, book_name, book):
+        for key, row in list(book._rows.items()):
+            self.rows["loans"].append((agent, self.string(book_name),
+                                       self.good(book.loans[row]), key,
+                                       int(book.term[row]), int(book.start[row]),
+                                       float(book.paid[row]), bool(book.active[row])))
+        return book.period
+
+    def add(self, agent, an_agent):
+        books = {}
+        self.scalars(agent, AGENT, an_agent)
+        self.goods_attributes(agent, AGENT_ATTRIBUTE, an_agent)
+        for name, value in vars(an_agent).items():
+            if isinstance(value, LoanBook):
+                books[name] = self.loan_book(agent, name, value)
+
+        bookkeeper = getattr(an_agent, "bookkeeper", None)
+        if bookkeeper is None:
+            return books
+        self.scalars(agent, BOOKKEEPER, bookkeeper)
+        self.goods_attributes(agent, BOOKKEEPER_ATTRIBUTE, bookkeeper)
+
+        balance_sheet = bookkeeper.balance_sheet
+        for name, a_good in balance_sheet.assets.items():
+            self.ref(agent, ASSET, self.string(name), a_good)
+        for name, a_good in balance_sheet.liabilities.items():
+            self.ref(agent, LIABILITY, self.string(name), a_good)
+
+        wages = getattr(bookkeeper, "wages", {})
+        for worker, labor in getattr(bookkeeper, "workforce", {}).items():
+            self.ref(agent, WORKFORCE, self.agent(worker), labor, wages.get(worker, 0.0))
+
+        stock = balance_sheet.capital_stock
+        for row in range(stock.size):
+            self.rows["capital"].append((agent, self.good(stock.goods[row]),
+                                         int(stock.ids[row]), float(stock.quantity[row]),
+                                         float(stock.price[row]), int(stock.age[row]),
+                                         float(stock.productivity[row])))
+        books["balance_sheet"] = self.loan_book(agent, "balance_sheet", balance_sheet.loans)
+        books["capital_last_id"] = stock.last_id()
+        return books
+
+
+def save_snapshot(path, agents):
+    """Save the state of the agents in a snapshot directory
+
+    Args:
+        path (str): directory of the snapshot
+        agents (list): the agents
+    """
+    loan_book.loan_ids.sync()
+    writer = _Writer(agents)
+    books = [writer.add(i, an_agent) for i, an_agent in enumerate(writer.agents)]
+
+    os.makedirs(path, exist_ok=True)
+    for table, dtype in TABLES.items():
+        np.save(os.path.join(path, table + ".npy"), np.array(writer.rows[table], dtype=dtype))
+    header = {"format": FORMAT,
+              "version": VERSION,
+              "agents": [an_agent.name for an_agent in writer.agents],
+              "strings": writer.strings,
+              "books": books,
+              "loan_ids": {"step": clock.step,
+                           "sequence": loan_book.loan_ids.sequence}}
+    with open(os.path.join(path, "header.json"), "w") as f:
+        json.dump(header, f)
+
+
+def read_snapshot(path, mmap_mode="r"):
+    """Read the header and the (memory mapped) tables of a snapshot
+
+    Returns:
+        tuple: (header, {table: array})
+
+    Raises:
+        ValueError: If the directory is not a snapshot of a known version.
+    """
+    with open(os.path.join(path, "header.json")) as f:
+        header = json.load(f)
+    if header.get("format") != FORMAT:
+        raise ValueError("%s is not a snapshot" % path)
+    if header.get("version", 0) > VERSION:
+        raise ValueError("Snapshot version %s is newer than %s" % (header.get("version"), VERSION))
+    tables = {table: np.load(os.path.join(path, table + ".npy"), mmap_mode=mmap_mode)
+              for table in TABLES}
+    return header, tables
+
+
+def _restore_goods(goods, strings, agents):
+    restored = [None] * len(goods)
+    agent = lambda i: None if i == NONE else agents[i]
+    for row, record in enumerate(goods):
+        cls = GOOD_CLASSES[record["cls"]]
+        if cls is PartialFill:
+            a_good = PartialFill(restored[record["parent"]], 0.0)
+        else:
+            a_good = cls.__new__(cls)
+            name = record["name"]
+            a_good.c_name = None if name == NONE else strings[name]
+            a_good.c_type = None if record["type"] == NONE else GoodType(int(record["type"]))
+            a_good.c_category = (None if record["category"] == NONE
+                                 else GoodCategory(int(record["category"])))
+            a_good.c_consume = (None if record["consume"] == NONE
+                                else GoodConsume(int(record["consume"])))
+        a_good.c_quantity = _optional_float(record["quantity"])
+        a_good.c_price = _optional_float(record["price"])
+        a_good.c_owner = agent(record["owner"])
+        a_good.c_producer = agent(record["producer"])
+        if cls is CapitalGood or cls is Loan:
+            a_good.c_id = _optional(record["c_id"])
+        if cls is Loan:
+            a_good.n_term = _optional(record["n_term"])
+            a_good.n_paid = _optional(record["n_paid"])
+            a_good.value_paid = _optional_float(record["value_paid"])
+            a_good.ammount_due = _optional_float(record["ammount_due"])
+            a_good.date_contract = _optional(record["date_contract"])
+        restored[row] = a_good
+    return restored
+
+
+def load_snapshot(path, agents):
+    """Restore the state of the agents from a snapshot directory
+
+    The agents are matched by name, agents that are not in the snapshot
+    are not changed. The constants of the agent equations are loaded
+    from the active scenario, as the first step would do.
+
+    Args:
+        path (str): directory of the snapshot
+        agents (list): the agents of the model
+    """
+    header, tables = read_snapshot(path)
+    strings = header["strings"]
+    by_name = {an_agent.name: an_agent for an_agent in agents}
+    snapshot_agents = [by_name.get(name) for name in header["agents"]]
+    goods = _restore_goods(tables["goods"], strings, snapshot_agents)
+
+    for record in tables["scalars"]:
+        an_agent = snapshot_agents[record["agent"]]
+        if an_agent is None:
+            continue
+        target = an_agent if record["owner"] == AGENT else an_agent.bookkeeper
+        name = strings[record["key"]]
+        if name not in state_variables(target):
+            continue
+        kind = record["kind"]
+        value = float(record["value"])
+        if kind == INT:
+            value = int(value)
+        elif kind == BOOL:
+            value = bool(value)
+        setattr(target, name, value)
+
+    entries = {}
+    for i, an_agent in enumerate(snapshot_agents):
+        if an_agent is None or getattr(an_agent, "bookkeeper", None) is None:
+            continue
+        bookkeeper = an_agent.bookkeeper
+        balance_sheet = bookkeeper.balance_sheet
+        entries[i] = ({}, {})
+        # the market books are not saved, nothing is posted
+        bookkeeper.posted_offer = None
+        if hasattr(bookkeeper, "workforce"):
+            bookkeeper.workforce.clear()
+            bookkeeper.wages.clear()
+        balance_sheet.capital_stock = CapitalStock()
+        balance_sheet.loans = LoanBook()
+        books = header["books"][i]
+        balance_sheet.loans.period = books.get("balance_sheet", 0)
+        for name, period in books.items():
+            if name not in ("balance_sheet", "capital_last_id"):
+                setattr(an_agent, name, LoanBook())
+                getattr(an_agent, name).period = period
+
+    for record in tables["refs"]:
+        an_agent = snapshot_agents[record["agent"]]
+        if an_agent is None:
+            continue
+        a_good = goods[record["good"]]
+        place = record["place"]
+        if place == AGENT_ATTRIBUTE:
+            setattr(an_agent, strings[record["key"]], a_good)
+        elif place == BOOKKEEPER_ATTRIBUTE:
+            setattr(an_agent.bookkeeper, strings[record["key"]], a_good)
+        elif place == ASSET:
+            entries[record["agent"]][0][strings[record["key"]]] = a_good
+        elif place == LIABILITY:
+            entries[record["agent"]][1][strings[record["key"]]] = a_good
+        elif place == WORKFORCE:
+            worker = snapshot_agents[record["key"]] if record["key"] != NONE else None
+            if worker is not None:
+                an_agent.bookkeeper.workforce[worker] = a_good
+                an_agent.bookkeeper.wages[worker] = float(record["value"])
+
+    for i, (assets, liabilities) in entries.items():
+        bookkeeper = snapshot_agents[i].bookkeeper
+        bookkeeper.balance_sheet.restore_entries(assets, liabilities)
+        if hasattr(bookkeeper, "wage_bill"):
+            bookkeeper.wage_bill = sum(bookkeeper.wages.values())
+
+    for record in tables["capital"]:
+        an_agent = snapshot_agents[record["agent"]]
+        if an_agent is None:
+            continue
+        stock = an_agent.bookkeeper.balance_sheet.capital_stock
+        stock.add(goods[record["good"]], float(record["productivity"]))
+        stock.quantity[stock.size - 1] = record["quantity"]
+        stock.price[stock.size - 1] = record["price"]
+        stock.age[stock.size - 1] = record["age"]
+        stock.value = float(np.dot(stock.quantity[:stock.size], stock.price[:stock.size]))
+
+    for record in tables["loans"]:
+        an_agent = snapshot_agents[record["agent"]]
+        if an_agent is None:
+            continue
+        book_name = strings[record["book"]]
+        if book_name == "balance_sheet":
+            book = an_agent.bookkeeper.balance_sheet.loans
+        else:
+            book = getattr(an_agent, book_name)
+        row = book.book(goods[record["good"]], int(record["key"]), int(record["term"]))
+        book.start[row] = record["start"]
+        book.paid[row] = record["paid"]
+        if not record["active"]:
+            book.remove(int(record["key"]))
+
+    for i, an_agent in enumerate(snapshot_agents):
+        if an_agent is None:
+            continue
+        stock = getattr(getattr(an_agent, "bookkeeper", None), "balance_sheet", None)
+        if stock is not None:
+            stock.capital_stock._last_id = max(stock.capital_stock._last_id,
+                                               header["books"][i].get("capital_last_id", 0))
+        eq = getattr(an_agent, "eq", None)
+        if eq is not None and hasattr(eq, "get_constants"):
+            eq.get_constants(an_agent.active_scenario)
+
+    clock.step = header["loan_ids"]["step"]
+    loan_book.loan_ids.sync()
+    loan_book.loan_ids.sequence = header["loan_ids"]["sequence"]
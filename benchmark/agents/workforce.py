@@ -0,0 +1,40 @@
+""" Workforce
+
+This module implements the container of the workers of a firm.
+
+A ``Workforce`` behaves like the ``{worker: labor}`` dictionary used
+before. It is an ``IndexedDict`` (see indexed_dict.py), so hiring,
+laying off and drawing a random worker are O(1), and drawing k workers
+for a lay off is O(k).
+
+Example:
+
+    workforce = Workforce()
+    workforce[worker] = labor
+    for worker in workforce.sample_without_replacement(3):
+        workforce.pop(worker)
+
+Todo:
+
+"""
+
+from .indexed_dict import IndexedDict
+
+
+class Workforce(IndexedDict):
+    """Indexed workforce of a firm"""
+
+    def random_worker(self):
+        """Return a random worker without removing it"""
+        return self.random_key()
+
+    def sample_without_replacement(self, k):
+        """Return k distinct random workers (all of them if k >= size)
+
+        Args:
+            k (int): number of workers
+
+        Returns:
+            list: the workers, in random order
+        """
+        return self.sample_keys(k)
@@ -0,0 +1,295 @@
+"""Market clearing micro-benchmark
+
+Clears ``CGMarket`` and ``LaborMarket`` with synthetic agents for a
+range of population sizes, for every market type and clearing mode,
+and reports fills per second, peak memory and scaling exponents as
+JSON. The agents are light stand-ins for Household and CGFirm with
+mock bookkeepers, so only the matching hot path is measured.
+
+Usage:
+
+    python market_benchmark.py --sizes 100,1000,10000 --output bench.json
+    python market_benchmark.py --app-dir ../simple_economy_ai --market-types random
+
+The population size is the number of households. As in the benchmark
+model there is one firm for every 50 households.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+MARKET_TYPES = ["random", "hop", "lop", "bhop", "blop", "call"]
+CLEARINGS = ["sequential", "batch"]
+HOUSEHOLDS_PER_FIRM = 50
+
+
+class SyntheticGood:
+    """Stand-in for a Good with the attributes used by the markets"""
+
+    def __init__(self, c_category="w", c_quantity=0.0, c_price=0.0,
+                 c_owner=None, c_producer=None):
+        self.c_name = c_category
+        self.c_type = "real"
+        self.c_category = c_category
+        self.c_consume = "immediate"
+        self.c_quantity = c_quantity
+        self.c_price = c_price
+        self.c_owner = c_owner
+        self.c_producer = c_producer
+
+    def ammount(self):
+        return self.c_price * self.c_quantity
+
+    def c_value(self):
+        return self.c_price * self.c_quantity
+
+    def copy_attributes(self, a_good):
+        for attr in self.__dict__:
+            setattr(a_good, attr, getattr(self, attr))
+        return a_good
+
+    def partial_fill(self, quantity):
+        a_fill = self.copy_attributes(SyntheticGood())
+        a_fill.c_quantity = quantity
+        return a_fill
+
+
+class MockBalanceSheet:
+    """Balance sheet holding only cash"""
+
+    def __init__(self, cash):
+        self.assets = {"cash": SyntheticGood("csh", cash, 1.0)}
+
+
+class MockBookkeeper:
+    """Bookkeeper with the protocol used by the markets"""
+
+    def __init__(self, owner, cash=1e12):
+        self.owner = owner
+        self.balance_sheet = MockBalanceSheet(cash)
+        self.offer = None
+
+    def set_offer(self, space, offer):
+        self.offer = offer
+        space.set_offer(self.owner, offer)
+
+    def pay(self, an_agent, quantity):
+        self.balance_sheet.assets["cash"].c_quantity -= quantity
+        an_agent.bookkeeper.balance_sheet.assets["cash"].c_quantity += quantity
+
+    def got_good(self, a_good):
+        self.owner.goods_received += 1
+
+
+class SyntheticAgent:
+    """Stand-in for Household and CGFirm in a market"""
+
+    def __init__(self, name):
+        self.name = name
+        self.bookkeeper = MockBookkeeper(self)
+        self.has_offer = False
+        self.goods_received = 0
+        self.fills = 0
+
+    def offer_accepted(self, market, buyer):
+        offer = self.bookkeeper.offer
+        buyer.bookkeeper.pay(self, offer.ammount())
+        offer.c_owner = buyer
+        buyer.bookkeeper.got_good(offer)
+        self.got_contract(market, offer, buyer)
+        self.has_offer = False
+
+    def offer_partially_accepted(self, market, buyer, an_offer):
+        buyer.bookkeeper.pay(self, an_offer.ammount())
+        an_offer.c_owner = buyer
+        buyer.bookkeeper.got_good(an_offer)
+        self.got_partial_contract(market, self.bookkeeper.offer, buyer)
+
+    def got_contract(self, market, an_offer, buyer):
+        self.fills += 1
+
+    def got_partial_contract(self, market, an_offer, buyer):
+        self.fills += 1
+
+    def release_offer(self, market, an_offer):
+        pass
+
+    def release_demand(self):
+        pass
+
+    def demand_is_met(self):
+        pass
+
+    def get_accepted_offers(self, accepted_offers):
+        pass
+
+
+def load_markets(app_dir):
+    """Import the market classes of a model application"""
+    app_dir = os.path.abspath(app_dir)
+    if app_dir not in sys.path:
+        sys.path.insert(0, app_dir)
+    import spaces
+    return {"CGMarket": spaces.CGMarket, "LaborMarket": spaces.LaborMarket}
+
+
+def build_market(market_class, market_name, market_type, clearing, households, seed):
+    """Create a market and post the offers and demands of the agents"""
+    random.seed(seed)
+    market = market_class(None, market_name,
+                          {"market_type": market_type,
+                           "intensity_of_choice": 1.0,
+                           "clearing": clearing})
+    # Spaces may or may not copy the variables to attributes
+    market.market_type = market_type
+    market.intensity_of_choice = 1.0
+    market.clearing = clearing
+    if hasattr(market, "create_book"):
+        market.offers = market.create_book()
+        market.demand = market.create_book()
+
+    firms = max(1, households // HOUSEHOLDS_PER_FIRM)
+    hh = [SyntheticAgent("HH_%d" % i) for i in range(households)]
+    cg = [SyntheticAgent("CG_%d" % i) for i in range(firms)]
+
+    if market_name == "Labor_Market":
+        sellers, buyers, category = hh, cg, "w"
+        offer_qty, demand_qty = (0.5, 1.5), (0.5 * HOUSEHOLDS_PER_FIRM, 1.0 * HOUSEHOLDS_PER_FIRM)
+    else:
+        sellers, buyers, category = cg, hh, "cg"
+        offer_qty, demand_qty = (20.0, 60.0), (0.5, 1.5)
+
+    for seller in sellers:
+        offer = SyntheticGood(category, random.uniform(*offer_qty),
+                              random.uniform(1.0, 5.0), seller, seller)
+        seller.bookkeeper.set_offer(market, offer)
+    for buyer in buyers:
+        market.set_demand(buyer, SyntheticGood(category, random.uniform(*demand_qty),
+                                               random.uniform(1.0, 5.0), buyer, buyer))
+    return market, sellers, len(sellers), len(buyers)
+
+
+def run_case(market_class, market_name, market_type, clearing, households, seed,
+             measure_memory):
+    """Clear one market once and return its measures"""
+    market, sellers, n_offers, n_demands = build_market(market_class, market_name,
+                                                        market_type, clearing,
+                                                        households, seed)
+    if measure_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    market.update()
+    seconds = time.perf_counter() - start
+    peak = None
+    if measure_memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    fills = sum(seller.fills for seller in sellers)
+    return {"market": market_class.__name__,
+            "market_type": market_type,
+            "clearing": clearing,
+            "agents": households + max(1, households // HOUSEHOLDS_PER_FIRM),
+            "offers": n_offers,
+            "demands": n_demands,
+            "fills": fills,
+            "seconds": seconds,
+            "fills_per_sec": fills / seconds if seconds > 0 else None,
+            "peak_bytes": peak}
+
+
+def scaling_exponents(results):
+    """Fit seconds ~ agents ** k for every market, type and clearing"""
+    groups = {}
+    for row in results:
+        if row.get("error") is None and row["seconds"] > 0:
+            key = (row["market"], row["market_type"], row["clearing"])
+            groups.setdefault(key, []).append((row["agents"], row["seconds"]))
+
+    exponents = []
+    for (market, market_type, clearing), points in sorted(groups.items()):
+        if len(points) < 2:
+            continue
+        x = np.log([p[0] for p in points])
+        y = np.log([p[1] for p in points])
+        exponent = float(np.polyfit(x, y, 1)[0])
+        exponents.append({"market": market, "market_type": market_type,
+                          "clearing": clearing, "exponent": exponent})
+    return exponents
+
+
+def run_benchmark(app_dir, sizes, market_types, clearings, repeats, seed, measure_memory):
+    """Run every case and return the JSON report"""
+    markets = load_markets(app_dir)
+    results = []
+    for market_name, market_class in (("CG_Market", markets["CGMarket"]),
+                                      ("Labor_Market", markets["LaborMarket"])):
+        for market_type in market_types:
+            # the call auction clears the same way in every clearing mode
+            for clearing in (["call"] if market_type == "call" else clearings):
+                for households in sizes:
+                    best = None
+                    try:
+                        for r in range(repeats):
+                            row = run_case(market_class, market_name, market_type,
+                                           clearing, households, seed + r, False)
+                            if best is None or row["seconds"] < best["seconds"]:
+                                best = row
+                        if measure_memory:
+                            best["peak_bytes"] = run_case(market_class, market_name,
+                                                          market_type, clearing,
+                                                          households, seed, True)["peak_bytes"]
+                    except Exception as error:
+                        best = {"market": market_class.__name__,
+                                "market_type": market_type,
+                                "clearing": clearing,
+                                "agents": households + max(1, households // HOUSEHOLDS_PER_FIRM),
+                                "error": repr(error)}
+                    results.append(best)
+                    print(json.dumps(best), file=sys.stderr)
+
+    return {"app_dir": os.path.abspath(app_dir),
+            "sizes": sizes,
+            "repeats": repeats,
+            "seed": seed,
+            "results": results,
+            "scaling": scaling_exponents(results)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--app-dir", default=os.path.dirname(os.path.abspath(__file__)),
+                        help="model application with the spaces package")
+    parser.add_argument("--sizes", default="100,1000,10000,100000,1000000",
+                        help="comma separated numbers of households")
+    parser.add_argument("--market-types", default=",".join(MARKET_TYPES))
+    parser.add_argument("--clearings", default=",".join(CLEARINGS))
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--no-memory", action="store_true",
+                        help="skip the tracemalloc peak memory runs")
+    parser.add_argument("--output", help="JSON file (default: stdout)")
+    args = parser.parse_args()
+
+    sizes = [int(float(s)) for s in args.sizes.split(",")]
+    report = run_benchmark(args.app_dir, sizes,
+                           args.market_types.split(","),
+                           args.clearings.split(","),
+                           args.repeats, args.seed, not args.no_memory)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
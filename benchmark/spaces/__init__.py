@@ -1,3 +1,6 @@
 from .market import Market, CGMarket, LaborMarket
+from .order_book import OfferBook, PriceBook, LogitBook
+from .metrics import MarketMetrics
 
-__all__ = ["Market", "CGMarket", "LaborMarket"]
+__all__ = ["Market", "CGMarket", "LaborMarket",
+           "OfferBook", "PriceBook", "LogitBook", "MarketMetrics"]
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+""" Batch market clearing kernels
+
+This module implements the array kernels used by the batch
+clearing mode of the markets. The kernels only see NumPy arrays
+(quantities and prices); collecting the goods from the books and
+settling the fills with the agents is done by the market.
+
+The markets can also be split in independent submarkets (shards),
+for example by region or by a hash of the agent names. Each shard is
+cleared on its own, possibly in a worker process, and the fills are
+merged in shard order, so the result does not depend on the number
+of workers.
+
+Example:
+
+    offer_idx, demand_idx, quantity, full = allocate(offer_qty, demand_qty)
+
+Todo:
+"""
+
+import zlib
+
+import numpy as np
+
+
+def allocate(offer_qty, demand_qty):
+    """Allocate queued offers to queued demands
+
+    Demands are served in order, each one taking offers in order
+    until it is satisfied, and a partially sold offer stays at the
+    head of the queue for the next demand. The fills are computed at
+    once from the cumulative supply and demand: every fill is one
+    segment between two consecutive breakpoints of the merged
+    cumulative curves.
+
+    Args:
+        offer_qty (array): offered quantities, in matching order
+        demand_qty (array): demanded quantities, in matching order
+
+    Returns:
+        tuple: (offer_idx, demand_idx, quantity, full) arrays, one
+            entry per fill, in matching order. ``full`` is True when
+            the fill exhausts the offer.
+    """
+    offer_qty = np.asarray(offer_qty, dtype=float)
+    demand_qty = np.asarray(demand_qty, dtype=float)
+    if offer_qty.size == 0 or demand_qty.size == 0:
+        empty = np.empty(0, dtype=np.intp)
+        return empty, empty, np.empty(0), np.empty(0, dtype=bool)
+
+    supply = np.cumsum(np.clip(offer_qty, 0.0, None))
+    demand = np.cumsum(np.clip(demand_qty, 0.0, None))
+    total = min(supply[-1], demand[-1])
+
+    breaks = np.union1d(supply[supply < total], demand[demand < total])
+    starts = np.concatenate(([0.0], breaks))
+    ends = np.concatenate((breaks, [total]))
+    quantity = ends - starts
+    keep = quantity > 0.0
+    starts, ends, quantity = starts[keep], ends[keep], quantity[keep]
+
+    offer_idx = np.searchsorted(supply, starts, side="right")
+    demand_idx = np.searchsorted(demand, starts, side="right")
+    full = ends >= supply[offer_idx]
+    return offer_idx, demand_idx, quantity, full
+
+
+def priority_order(prices, market_type, intensity_of_choice=0.0, rng=None):
+    """Order in which the offers are queued for a batch clearing
+
+    Args:
+        prices (array): prices of the offers
+        market_type (str): random, hop, lop, bhop or blop
+        intensity_of_choice (float): logit intensity for bhop/blop
+        rng (numpy.random.Generator, optional): random generator
+
+    Returns:
+        array: indices of the offers in matching order
+    """
+    prices = np.asarray(prices, dtype=float)
+    if rng is None:
+        rng = np.random.default_rng()
+    if market_type == "hop":
+        return np.argsort(-prices, kind="stable")
+    elif market_type == "lop":
+        return np.argsort(prices, kind="stable")
+    elif market_type in ("bhop", "blop"):
+        # Gumbel-top-k: sorting the perturbed utilities gives a
+        # weighted draw without replacement with weights exp(beta * p)
+        beta = intensity_of_choice if market_type == "bhop" else -intensity_of_choice
+        utility = beta * prices + rng.gumbel(size=prices.size)
+        return np.argsort(-utility, kind="stable")
+    elif market_type == "random":
+        return rng.permutation(prices.size)
+    else:
+        raise ValueError("Invalid market matching type")
+
+
+def clear_shard(offer_qty, demand_qty):
+    """Clear one independent submarket
+
+    Args:
+        offer_qty (array): offered quantities, in matching order
+        demand_qty (array): demanded quantities, in matching order
+
+    Returns:
+        tuple: the ``allocate`` arrays and a ``met`` array that is
+            True for the demands that are fully satisfied.
+    """
+    offer_idx, demand_idx, quantity, full = allocate(offer_qty, demand_qty)
+    supply = np.clip(np.asarray(offer_qty, dtype=float), 0.0, None).sum()
+    met = np.cumsum(np.clip(np.asarray(demand_qty, dtype=float), 0.0, None)) <= supply
+    return offer_idx, demand_idx, quantity, full, met
+
+
+def clear_shards(shards, executor=None):
+    """Clear a list of independent submarkets
+
+    Args:
+        shards (list): (offer_qty, demand_qty) pairs, one per shard
+        executor (concurrent.futures.Executor, optional): executor
+            used to clear the shards in parallel
+
+    Returns:
+        list: the ``clear_shard`` results, in shard order
+    """
+    offer_qty = [shard[0] for shard in shards]
+    demand_qty = [shard[1] for shard in shards]
+    if executor is None:
+        return list(map(clear_shard, offer_qty, demand_qty))
+    return list(executor.map(clear_shard, offer_qty, demand_qty))
+
+
+def shard_of(an_agent, shards, shard_key="hash"):
+    """Submarket of an agent
+
+    Args:
+        an_agent (EconomicAgent): the agent
+        shards (int): number of submarkets
+        shard_key (str): "hash" to use a hash of the agent name, or
+            the name of an agent attribute (e.g. "region")
+
+    Returns:
+        int: the submarket of the agent, from 0 to shards - 1
+    """
+    if shard_key == "hash":
+        key = an_agent.name
+    else:
+        key = getattr(an_agent, shard_key)
+    if isinstance(key, (int, np.integer)):
+        return int(key) % shards
+    # crc32 is stable across processes and runs, unlike hash()
+    return zlib.crc32(str(key).encode("utf-8")) % shards
+
+
+def call_auction(offer_qty, offer_price, demand_qty, demand_price):
+    """Single-price call auction
+
+    The supply curve (offers sorted by increasing price) and the
+    demand curve (demands sorted by decreasing price) are aggregated
+    and the clearing price is the candidate price that maximizes the
+    traded volume, ties broken by the smallest excess supply or
+    demand. Offers priced at or below the clearing price and demands
+    priced at or above it trade at that price, and the long side of
+    the market is rationed pro-rata. The cost is one sort per side.
+
+    Args:
+        offer_qty (array): offered quantities
+        offer_price (array): asked prices
+        demand_qty (array): demanded quantities
+        demand_price (array): bid prices
+
+    Returns:
+        tuple: (price, offer_fill, demand_fill), the clearing price and
+            the quantity traded by each offer and each demand. The
+            price is None if no trade is possible.
+    """
+    offer_qty = np.clip(np.asarray(offer_qty, dtype=float), 0.0, None)
+    offer_price = np.asarray(offer_price, dtype=float)
+    demand_qty = np.clip(np.asarray(demand_qty, dtype=float), 0.0, None)
+    demand_price = np.asarray(demand_price, dtype=float)
+    offer_fill = np.zeros(offer_qty.size)
+    demand_fill = np.zeros(demand_qty.size)
+    if offer_qty.size == 0 or demand_qty.size == 0:
+        return None, offer_fill, demand_fill
+
+    ask_order = np.argsort(offer_price, kind="stable")
+    asks = offer_price[ask_order]
+    supply = np.cumsum(offer_qty[ask_order])
+    bid_order = np.argsort(demand_price, kind="stable")
+    bids = demand_price[bid_order]
+    # demand at price p: quantity of the bids >= p
+    demand_at = np.concatenate((np.cumsum(demand_qty[bid_order][::-1])[::-1], [0.0]))
+
+    candidates = np.union1d(asks, bids)
+    supplied = np.concatenate(([0.0], supply))[np.searchsorted(asks, candidates, side="right")]
+    demanded = demand_at[np.searchsorted(bids, candidates, side="left")]
+    volume = np.minimum(supplied, demanded)
+    best = volume.max()
+    if best <= 0.0:
+        return None, offer_fill, demand_fill
+
+    imbalance = np.where(volume == best, np.abs(supplied - demanded), np.inf)
+    k = int(np.argmin(imbalance))
+    price = float(candidates[k])
+
+    eligible_offers = offer_price <= price
+    eligible_demands = demand_price >= price
+    offer_fill[eligible_offers] = offer_qty[eligible_offers] * (best / supplied[k])
+    demand_fill[eligible_demands] = demand_qty[eligible_demands] * (best / demanded[k])
+    return price, offer_fill, demand_fill
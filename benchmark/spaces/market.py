@@ -11,27 +11,100 @@ Todo:
 """
 
 from EcoSimpy import Space
+from agents.bookkeeper import Bookkeeper
+from agents.clock import clock
+from agents.journal import TransactionJournal
+from .order_book import OfferBook, PriceBook, LogitBook
+from .clearing import allocate, call_auction, priority_order, clear_shards, shard_of
+from .metrics import MarketMetrics
+from concurrent.futures import ProcessPoolExecutor
+import atexit
+import numpy as np
 import random
+import time
 
 class Market(Space):
     """ Abstract Market """
     def __init__(self, model, name, variables):
         """ Intialize abstract market """
         super().__init__(model, name, variables)
-        self.offers = {}
-        self.demand = {}
+        clock.register(self.name)
+        self.offers = self.create_book()
+        self.demand = self.create_book()
         self.accepted_offers = {}
 
+        self.full_fills = 0
+        self.partial_fills = 0
+        self.unmet_demand = 0.0
+        if getattr(self, "collect_metrics", False):
+            self.metrics = MarketMetrics(self.name,
+                                         getattr(self, "metrics_path", "runs"),
+                                         getattr(self, "metrics_flush_every", 100))
+        else:
+            self.metrics = None
+        if getattr(self, "record_transactions", False):
+            # markets share the journal of the bookkeepers
+            self.transactions = TransactionJournal.active()
+            if self.transactions is None:
+                self.transactions = TransactionJournal(
+                    getattr(self, "transactions_path", "runs"),
+                    getattr(self, "transactions_chunk_size", 65536),
+                    getattr(self, "transactions_format", "npy")).activate()
+        else:
+            self.transactions = None
+
     def update(self):
-        """ """
-        self.matching()
+        """ Clear the market
+
+        The ``clearing`` space variable selects the clearing mode:
+            sequential - (default) match demands and offers one by one,
+                         until the first demand is met
+            batch      - compute the fills of all the demands at once
+                         with NumPy (see batch_matching)
+
+        The "call" market type always clears as a call auction.
+
+        With the ``collect_metrics`` space variable set, the wall time,
+        fills, unmet demand and book depth of every step are recorded
+        in ``self.metrics`` (see ``spaces.metrics``).
+
+        With the ``record_transactions`` space variable set, the
+        payments of the bookkeepers are recorded in a transaction
+        journal (see ``agents.journal``).
+
+        The step of the simulation clock (see ``agents.clock``) ends
+        when all the markets have cleared.
+        """
+        self.full_fills = 0
+        self.partial_fills = 0
+        self.unmet_demand = 0.0
+        if self.metrics is not None:
+            offer_depth = len(self.offers)
+            demand_depth = len(self.demand)
+            start = time.perf_counter()
+
+        if getattr(self, "market_type", "random") == "call":
+            self.call_matching()
+        elif getattr(self, "clearing", "sequential") == "batch":
+            self.batch_matching()
+        else:
+            self.matching()
+
+        if self.metrics is not None:
+            self.metrics.record(time.perf_counter() - start,
+                                self.full_fills,
+                                self.partial_fills,
+                                self.unmet_demand,
+                                offer_depth,
+                                demand_depth)
+        clock.cleared(self.name)
 
 
     def matching(self):
 
         self.market_not_empty = True
 
-        while self.has_demand():
+        while self.has_demand() and self.market_not_empty:
             self.a_demand = self.get_demand()
             self.this_remaining_demand = self.a_demand.c_quantity
             self.buyer = self.a_demand.c_owner
@@ -46,14 +119,16 @@ class Market(Space):
                         self.seller.offer_accepted(self, self.buyer)
                         self.accepted_offers[self.seller.name] = self.an_offer
                         self.offers.pop(self.seller.name)
+                        self.full_fills += 1
                     else:
-                        self.partial_offer = self.set_partial_offer(self.an_offer)
-                        self.partial_offer.c_quantity = self.this_remaining_demand
+                        self.partial_offer = self.set_partial_offer(self.an_offer,
+                                                                    self.this_remaining_demand)
                         self.an_offer.c_quantity -= self.this_remaining_demand
                         self.this_remaining_demand = 0.0
                         self.have_unmet_demand = False
                         self.seller.offer_partially_accepted(self, self.buyer, self.partial_offer)
                         self.accepted_offers[self.seller.name] = self.partial_offer
+                        self.partial_fills += 1
                     if self.this_remaining_demand == 0:
                         self.have_unmet_demand = False
                         self.release_offers()
@@ -61,12 +136,202 @@ class Market(Space):
                         self.buyer.get_accepted_offers(self.accepted_offers)
 
                 else:
+                    self.unmet_demand += self.this_remaining_demand + self.demand_volume()
                     self.market_has_no_offers()
                     self.have_unmet_demand = False
                     self.buyer.get_accepted_offers(self.accepted_offers)
 
 
 
+    def batch_matching(self):
+        """ Clear the whole market in one pass
+
+        The demands are queued in the order given by the demand book
+        and the offers in the order given by the market type. The
+        fills are computed with ``clearing.allocate`` and then settled
+        with the sellers and buyers. At the end the book is released.
+
+        This is not the sequential matching computed at once: the
+        sequential matching releases the offers as soon as the first
+        demand is met, so it serves one demand per step, while the
+        batch clearing serves every demand until the offers run out.
+
+        If the ``shards`` space variable is larger than one, the
+        market is split in independent submarkets by ``shard_key``
+        ("hash" of the agent names by default, or an agent attribute
+        such as "region"). With ``shard_workers`` larger than zero the
+        submarkets are cleared by a process pool.
+        """
+        demands = []
+        while self.demand:
+            demands.append(self.demand.popitem()[1])
+        offers = self.offers.values()
+        if not demands or not offers:
+            self.release_offers()
+            return
+
+        shards = max(1, int(getattr(self, "shards", 1)))
+        if shards > 1:
+            shard_key = getattr(self, "shard_key", "hash")
+            offer_groups = [[] for _ in range(shards)]
+            demand_groups = [[] for _ in range(shards)]
+            for an_offer in offers:
+                offer_groups[shard_of(an_offer.c_producer, shards, shard_key)].append(an_offer)
+            for a_demand in demands:
+                demand_groups[shard_of(a_demand.c_owner, shards, shard_key)].append(a_demand)
+        else:
+            offer_groups = [offers]
+            demand_groups = [demands]
+
+        rng = np.random.default_rng(random.getrandbits(64))
+        market_type = getattr(self, "market_type", "random")
+        intensity_of_choice = getattr(self, "intensity_of_choice", 0.0)
+        jobs = []
+        for g, group in enumerate(offer_groups):
+            prices = np.fromiter((o.c_price for o in group), float, len(group))
+            order = priority_order(prices, market_type, intensity_of_choice, rng)
+            group = offer_groups[g] = [group[i] for i in order]
+            jobs.append((np.fromiter((o.c_quantity for o in group), float, len(group)),
+                         np.fromiter((d.c_quantity for d in demand_groups[g]), float,
+                                     len(demand_groups[g]))))
+
+        results = clear_shards(jobs, self.shard_executor() if shards > 1 else None)
+
+        fills = []
+        queued_demands = []
+        met = []
+        for group, group_demands, job, result in zip(offer_groups, demand_groups, jobs, results):
+            offer_idx, demand_idx, quantity, full, group_met = result
+            n_full = int(full.sum())
+            self.full_fills += n_full
+            self.partial_fills += len(full) - n_full
+            self.unmet_demand += max(0.0, float(np.clip(job[1], 0.0, None).sum()
+                                                - np.clip(job[0], 0.0, None).sum()))
+            self.collect_fills(group, group_demands, offer_idx.tolist(), demand_idx.tolist(),
+                               quantity.tolist(), full.tolist(), fills)
+            queued_demands.extend(group_demands)
+            met.extend(group_met.tolist())
+
+        self.settle_fills(fills, queued_demands, met)
+        self.release_offers()
+
+    def call_matching(self):
+        """ Clear the market as a call auction
+
+        All the posted offers and demands are aggregated in supply and
+        demand curves and cleared at a single price (see
+        ``clearing.call_auction``), with pro-rata rationing of the long
+        side. The traded quantities are then paired seller to buyer
+        with ``clearing.allocate`` and settled in bulk at the clearing
+        price, which is also the price of the goods sold. At the end
+        the book is released.
+        """
+        demands = []
+        while self.demand:
+            demands.append(self.demand.popitem()[1])
+        offers = self.offers.values()
+        if not demands or not offers:
+            self.unmet_demand += sum(d.c_quantity for d in demands)
+            self.release_offers()
+            return
+
+        offer_qty = np.fromiter((o.c_quantity for o in offers), float, len(offers))
+        offer_price = np.fromiter((o.c_price for o in offers), float, len(offers))
+        demand_qty = np.fromiter((d.c_quantity for d in demands), float, len(demands))
+        demand_price = np.fromiter((d.c_price for d in demands), float, len(demands))
+        price, offer_fill, demand_fill = call_auction(offer_qty, offer_price,
+                                                      demand_qty, demand_price)
+        self.clearing_price = price
+        met = demand_fill >= demand_qty
+        self.unmet_demand += float(np.clip(demand_qty, 0.0, None).sum() - demand_fill.sum())
+
+        fills = []
+        if price is not None:
+            sellers = np.flatnonzero(offer_fill > 0.0)
+            buyers = np.flatnonzero(demand_fill > 0.0)
+            offer_idx, demand_idx, quantity, full = allocate(offer_fill[sellers],
+                                                             demand_fill[buyers])
+            # Only the offers sold at 100% are fully filled and leave the book
+            full &= offer_fill[sellers][offer_idx] >= offer_qty[sellers][offer_idx]
+            n_full = int(full.sum())
+            self.full_fills += n_full
+            self.partial_fills += len(full) - n_full
+            for i, j, q, is_full in zip(sellers[offer_idx].tolist(), buyers[demand_idx].tolist(),
+                                        quantity.tolist(), full.tolist()):
+                an_offer = offers[i]
+                if is_full:
+                    self.offers.pop(an_offer.c_producer.name, None)
+                fills.append((an_offer.c_producer, demands[j].c_owner, q, price))
+
+        self.settle_fills(fills, demands, met.tolist())
+        self.release_offers()
+
+    def collect_fills(self, offers, demands, offer_idx, demand_idx, quantity, full, fills):
+        """ Append the fills of a batch clearing to ``fills``
+
+        Args:
+            offers (list): offered goods, in matching order
+            demands (list): demanded goods, in matching order
+            offer_idx (list): offer of each fill
+            demand_idx (list): demand of each fill
+            quantity (list): quantity of each fill
+            full (list): True if the fill exhausts the offer
+            fills (list): (seller, buyer, quantity, price) tuples
+
+        The fills keep the allocated quantity: the offer is only
+        reduced by the earlier fills when they are settled, and the
+        settlement decides if a fill takes what is left of it.
+        """
+        for i, j, q, is_full in zip(offer_idx, demand_idx, quantity, full):
+            an_offer = offers[i]
+            if is_full:
+                self.offers.pop(an_offer.c_producer.name, None)
+            fills.append((an_offer.c_producer, demands[j].c_owner, q, an_offer.c_price))
+
+    def settle_fills(self, fills, demands, met):
+        """ Settle the fills computed by a batch clearing
+
+        The fills are settled in bulk by ``Bookkeeper.settle_fills``
+        and each buyer then receives its accepted offers. The quantity
+        a buyer short of cash could not take is unmet demand.
+
+        Args:
+            fills (list): (seller, buyer, quantity, price) tuples
+            demands (list): demanded goods
+            met (list): True if the demand is fully satisfied
+        """
+        accepted, rationed = Bookkeeper.settle_fills(self, fills)
+        self.unmet_demand += sum(rationed.values())
+
+        for a_demand, is_met in zip(demands, met):
+            buyer = a_demand.c_owner
+            if is_met and buyer not in rationed:
+                buyer.demand_is_met()
+            if buyer in accepted:
+                buyer.get_accepted_offers(accepted.pop(buyer))
+
+    def shard_executor(self):
+        """ Process pool used to clear the submarkets
+
+        Returns None (clear in this process) unless the
+        ``shard_workers`` space variable is larger than zero. The pool
+        is shut down when the interpreter exits.
+        """
+        workers = int(getattr(self, "shard_workers", 0))
+        if workers <= 0:
+            return None
+        if getattr(self, "_shard_executor", None) is None:
+            self._shard_executor = ProcessPoolExecutor(max_workers=workers)
+            atexit.register(self.shutdown_shard_executor)
+        return self._shard_executor
+
+    def shutdown_shard_executor(self):
+        """ Stop the worker processes of the market, if any """
+        if getattr(self, "_shard_executor", None) is not None:
+            self._shard_executor.shutdown()
+            self._shard_executor = None
+            atexit.unregister(self.shutdown_shard_executor)
+
     def set_demand(self, an_owner, a_good):
         """
         Set the demand for a good.
@@ -90,6 +355,52 @@ class Market(Space):
         """
         self.offers[an_owner.name] = a_good
 
+    def amend_offer(self, an_owner, a_good):
+        """
+        Replace (or post) the offer of an owner in the book.
+
+        In a persistent book the offers stay from one step to the
+        next, so an owner only needs to amend its offer when the
+        quantity or the price of the good changed.
+
+        Parameters:
+        - an_owner: The owner of the offer.
+        - a_good: The good being offered.
+        """
+        self.offers[an_owner.name] = a_good
+
+    def cancel_offer(self, an_owner):
+        """
+        Remove the offer of an owner from the book, if any.
+
+        Parameters:
+        - an_owner: The owner of the offer.
+        """
+        self.offers.pop(an_owner.name, None)
+
+    def cancel_demand(self, an_owner):
+        """
+        Remove the demand of an owner from the book, if any.
+
+        Parameters:
+        - an_owner: The owner of the demand.
+        """
+        self.demand.pop(an_owner.name, None)
+
+    def has_offer_from(self, an_owner):
+        """ A market answers if an owner has an offer in the book """
+        return an_owner.name in self.offers
+
+    def is_persistent(self):
+        """ A market answers if its book persists across steps
+
+        Set by the ``persistent_book`` space variable. In a persistent
+        book the offers that were not bought, and the demands that
+        were not served because the market ran out of offers, stay in
+        the book for the next step instead of being released.
+        """
+        return getattr(self, "persistent_book", False)
+
 
     def get_demand(self):
          """ Implements the maching in market """
@@ -119,14 +430,14 @@ class Market(Space):
          elif(self.market_type == "bhop"):
              an_offer = self.bhop_offer_matching()
          elif(self.market_type == "blop"):
-             an_offer = self.blop__offer_matching()
+             an_offer = self.blop_offer_matching()
          else:
              # Add error treatment here
              raise ValueError("Invalid market matching type")
          return an_offer
 
     def random_demand_matching(self):
-        """ Randomly pop a demand from the demand dictionary and return it """
+        """ Randomly pop a demand from the demand book and return it """
         if not self.demand:
             raise ValueError("No demand available in market ", self.name)
         else:   
@@ -134,32 +445,80 @@ class Market(Space):
             return a_demand
 
     def hop_demand_matching(self):
-        pass
+        """ Pop the demand with the highest price """
+        return self.pop_demand_from_book()
 
     def lop_demand_matching(self):
-        pass
+        """ Pop the demand with the lowest price """
+        return self.pop_demand_from_book()
 
     def bhop_demand_matching(self):
-        pass
+        """ Pop a demand drawn by logit choice biased to high prices """
+        return self.pop_demand_from_book()
 
     def blop_demand_matching(self):
-        pass
+        """ Pop a demand drawn by logit choice biased to low prices """
+        return self.pop_demand_from_book()
 
     def hop_offer_matching(self):
-        pass
+        """ Get the offer with the highest price without excluding it """
+        return self.best_offer_from_book()
 
     def lop_offer_matching(self):
-        pass
+        """ Get the offer with the lowest price without excluding it """
+        return self.best_offer_from_book()
 
     def bhop_offer_matching(self):
-        pass
+        """ Get an offer drawn by logit choice biased to high prices """
+        return self.random_offer_matching()
 
     def blop_offer_matching(self):
-        pass
+        """ Get an offer drawn by logit choice biased to low prices """
+        return self.random_offer_matching()
+
+    def create_book(self):
+        """ Create the book that keeps offers or demands
+
+        The kind of book follows the market matching type:
+            random - OfferBook, uniform random draws
+            hop    - PriceBook, highest price first
+            lop    - PriceBook, lowest price first
+            bhop   - LogitBook, logit choice biased to high prices
+            blop   - LogitBook, logit choice biased to low prices
+            call   - OfferBook, the call auction reads the whole book
+
+        The logit books use the ``intensity_of_choice`` space variable.
+        """
+        market_type = getattr(self, "market_type", "random")
+        intensity_of_choice = getattr(self, "intensity_of_choice", 0.0)
+        if market_type == "hop":
+            return PriceBook(highest_first=True)
+        elif market_type == "lop":
+            return PriceBook(highest_first=False)
+        elif market_type == "bhop":
+            return LogitBook(intensity_of_choice, sign=1)
+        elif market_type == "blop":
+            return LogitBook(intensity_of_choice, sign=-1)
+        else:
+            return OfferBook()
+
+    def pop_demand_from_book(self):
+        """ Pop the demand selected by the demand book """
+        if not self.demand:
+            raise ValueError("No demand available in market ", self.name)
+        return self.demand.popitem()[1]
+
+    def best_offer_from_book(self):
+        """ Get the best priced offer without excluding it from the book """
+        if not self.offers:
+            raise ValueError("No offers available in market ", self.name)
+        return self.offers.best_value()
 
 
     def market_has_no_offers(self):
-        self.demand = {}
+        self.market_not_empty = False
+        if not self.is_persistent():
+            self.demand.clear()
         
     def has_offers(self):
         """ A market answers if is has offers (True or False) """
@@ -175,16 +534,20 @@ class Market(Space):
         else:
             return True
 
+    def demand_volume(self):
+        """ A market answers the total quantity demanded in the book """
+        return sum(a_demand.c_quantity for a_demand in self.demand.values())
+
     def no_of_offers(self):
         """ A market answers the number of offers it has """
         return self.offers.__len__()
         
     def random_offer_matching(self):
-        """ Randomly get an item from self.offers dict without excluding it from dict """
+        """ Randomly get an item from self.offers book without excluding it from book """
         if not self.offers:
             raise ValueError("No offers available in market ", self.name)
         else:
-            offer = random.choice(list(self.offers.values()))
+            offer = self.offers.random_value()
             return offer
 
     def release_demand(self):
@@ -192,17 +555,26 @@ class Market(Space):
         """
         for demand in self.demand.values():
             demand.c_owner.release_demand()
-            self.demand = {}
+        self.demand.clear()
 
     def release_offers(self):
         """Inform the producers/household that their offer was not bought
         """
-        self.offers = {}
+        if not self.is_persistent():
+            self.offers.clear()
+
+    def set_partial_offer(self, an_offer, quantity=None):
+        """Create the record of a partial fill of an offer
 
-    def set_partial_offer(self, an_offer):
-        partial_offer = type(an_offer)()
-        partial_offer = an_offer.copy_attributes(partial_offer)
-        return partial_offer
+        The record (a ``PartialFill``) only holds the quantity, price,
+        owner and producer of the fill and reads everything else from
+        the offer, so no Good is created and copied per partial match.
+        A capital good is filled with a new ``CapitalGood``, as it
+        enters the capital stock of the buyer.
+        """
+        if quantity is None:
+            quantity = an_offer.c_quantity
+        return an_offer.partial_fill(quantity)
   
    
 
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+""" Market metrics
+
+This module implements the per-step instrumentation of the markets.
+A ``MarketMetrics`` keeps one row per market step with:
+
+    - seconds: wall time of the clearing
+    - full_fills: number of offers completely bought
+    - partial_fills: number of offers partially bought
+    - unmet_demand: demanded quantity that was not served
+    - offer_depth: offers in the book before the clearing
+    - demand_depth: demands in the book before the clearing
+
+The rows are kept in plain lists (one per column) and appended to a
+CSV file every ``flush_every`` steps and at the end of the run, so the
+metrics can be read together with the CSVs in runs/.
+
+Example:
+
+    "space_variables": {
+        "market_type": "random",
+        "collect_metrics": true,
+        "metrics_path": "runs/"
+    }
+
+Todo:
+"""
+
+import atexit
+import csv
+import os
+
+
+class MarketMetrics:
+    """ Per-step metrics of a market """
+
+    COLUMNS = ["step", "seconds", "full_fills", "partial_fills",
+               "unmet_demand", "offer_depth", "demand_depth"]
+
+    def __init__(self, market_name, path=None, flush_every=100):
+        self.market_name = market_name
+        self.path = path
+        self.flush_every = flush_every
+        self.step = 0
+        self.columns = {column: [] for column in self.COLUMNS}
+        self.header_written = False
+        if path is not None:
+            atexit.register(self.flush)
+
+    def record(self, seconds, full_fills, partial_fills, unmet_demand,
+               offer_depth, demand_depth):
+        """ Record the metrics of one market step """
+        columns = self.columns
+        columns["step"].append(self.step)
+        columns["seconds"].append(seconds)
+        columns["full_fills"].append(full_fills)
+        columns["partial_fills"].append(partial_fills)
+        columns["unmet_demand"].append(unmet_demand)
+        columns["offer_depth"].append(offer_depth)
+        columns["demand_depth"].append(demand_depth)
+        self.step += 1
+        if self.path is not None and len(columns["step"]) >= self.flush_every:
+            self.flush()
+
+    def rows(self):
+        """ Return the buffered rows as dictionaries """
+        return [dict(zip(self.COLUMNS, row))
+                for row in zip(*(self.columns[c] for c in self.COLUMNS))]
+
+    def file_name(self):
+        """ CSV file of the market metrics """
+        return os.path.join(self.path, "%s_metrics.csv" % self.market_name)
+
+    def flush(self):
+        """ Append the buffered rows to the CSV file and clear them """
+        if self.path is None or not self.columns["step"]:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        mode = "a" if self.header_written else "w"
+        with open(self.file_name(), mode, newline="") as f:
+            writer = csv.writer(f)
+            if not self.header_written:
+                writer.writerow(["market"] + self.COLUMNS)
+                self.header_written = True
+            for row in zip(*(self.columns[c] for c in self.COLUMNS)):
+                writer.writerow((self.market_name,) + row)
+        for column in self.columns.values():
+            column.clear()
@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+""" Order books used by the markets
+
+This module implements the containers where a market keeps
+the offers (and demands) posted by the agents.
+
+The books behave like the plain ``{agent_name: good}`` dictionaries
+used before, so ``book[name] = good``, ``book.pop(name)``,
+``len(book)`` and ``book.values()`` keep working, but they also know
+how to select an item for the matching process without copying the
+whole book.
+
+Example:
+
+    book = OfferBook()
+    book["HH_1"] = a_labor_offer
+    an_offer = book.random_value()
+    book.pop("HH_1")
+
+Todo:
+"""
+
+import heapq
+import math
+import random
+
+from agents.indexed_dict import IndexedDict
+
+
+class OfferBook(IndexedDict):
+    """ Indexed offer book
+
+    The goods are kept in the dense list of an ``IndexedDict`` with a
+    ``name -> slot`` map. Removing an item moves the last item of the
+    list to the free slot (swap-remove), so insertions, removals and
+    random draws are O(1).
+    """
+
+
+class PriceBook:
+    """ Price-priority book
+
+    The goods are kept in a binary heap keyed on ``c_price`` (taken
+    when the good is posted), so the best priced item is found in
+    O(1) and insertions and removals cost O(log n). Items removed by
+    name, and the old entries of amended items, are deleted lazily
+    when they reach the top of the heap. When the stale entries
+    outnumber the live ones the heap is rebuilt, so a persistent book
+    amended every step keeps a heap of at most twice its size.
+
+    Args:
+        highest_first (bool): True if the highest price has priority,
+            False if the lowest price has priority.
+    """
+
+    def __init__(self, highest_first=False):
+        self.highest_first = highest_first
+        self._heap = []
+        self._entries = {}
+        self._counter = 0
+
+    def _key(self, price):
+        if self.highest_first:
+            return -price
+        return price
+
+    def _compact(self):
+        """ Rebuild the heap from the live entries if most are stale """
+        if len(self._heap) > 2 * len(self._entries):
+            self._heap = [(self._key(price), counter, name)
+                          for name, (counter, _, price) in self._entries.items()]
+            heapq.heapify(self._heap)
+
+    def __setitem__(self, name, a_good):
+        entry = self._entries.get(name)
+        if entry is not None and a_good.c_price == entry[2]:
+            # Same price: amend in place, the heap entry is still valid
+            self._entries[name] = (entry[0], a_good, entry[2])
+            return
+        # The counter keeps the posting order between equal prices
+        # and marks older heap entries of the same name as stale.
+        self._counter += 1
+        self._entries[name] = (self._counter, a_good, a_good.c_price)
+        heapq.heappush(self._heap, (self._key(a_good.c_price), self._counter, name))
+        self._compact()
+
+    def __getitem__(self, name):
+        return self._entries[name][1]
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __bool__(self):
+        return bool(self._entries)
+
+    def __iter__(self):
+        return iter(list(self._entries))
+
+    def get(self, name, default=None):
+        entry = self._entries.get(name)
+        if entry is None:
+            return default
+        return entry[1]
+
+    def pop(self, name, *default):
+        """ Remove the item posted by ``name`` and return it """
+        entry = self._entries.pop(name, None)
+        if entry is None:
+            if default:
+                return default[0]
+            raise KeyError(name)
+        if not self._entries:
+            self._heap.clear()
+        else:
+            self._compact()
+        return entry[1]
+
+    def _discard_stale(self):
+        heap = self._heap
+        entries = self._entries
+        while heap:
+            _, counter, name = heap[0]
+            entry = entries.get(name)
+            if entry is not None and entry[0] == counter:
+                return name
+            heapq.heappop(heap)
+        return None
+
+    def best_value(self):
+        """ Return the best priced good without removing it """
+        name = self._discard_stale()
+        if name is None:
+            raise KeyError("best_value(): book is empty")
+        return self._entries[name][1]
+
+    def popitem(self):
+        """ Remove and return the best priced (name, good) pair """
+        name = self._discard_stale()
+        if name is None:
+            raise KeyError("popitem(): book is empty")
+        heapq.heappop(self._heap)
+        return name, self._entries.pop(name)[1]
+
+    def keys(self):
+        return list(self._entries)
+
+    def values(self):
+        return [entry[1] for entry in self._entries.values()]
+
+    def items(self):
+        return [(name, entry[1]) for name, entry in self._entries.items()]
+
+    def clear(self):
+        self._heap.clear()
+        self._entries.clear()
+
+
+class LogitBook(OfferBook):
+    """ Book with logit (Boltzmann) price choice
+
+    An item is drawn with probability proportional to
+    ``exp(sign * intensity_of_choice * c_price)``. A positive sign
+    favours high prices, a negative sign favours low prices, and an
+    intensity of choice of zero gives a uniform random draw.
+
+    The weights are kept in a Fenwick (binary indexed) tree laid over
+    the dense slots of the ``OfferBook``, so draws, insertions and
+    removals cost O(log n).
+
+    Args:
+        intensity_of_choice (float): the logit intensity of choice.
+        sign (int): +1 to favour high prices, -1 to favour low prices.
+    """
+
+    MAX_EXPONENT = 700.0
+
+    def __init__(self, intensity_of_choice=0.0, sign=1):
+        super().__init__()
+        self.beta = sign * float(intensity_of_choice)
+        self._weights = []
+        self._tree = [0.0]
+        self._reference_price = None
+
+    def _weight(self, a_good):
+        if self._reference_price is None:
+            self._reference_price = a_good.c_price
+        exponent = self.beta * (a_good.c_price - self._reference_price)
+        exponent = max(-self.MAX_EXPONENT, min(self.MAX_EXPONENT, exponent))
+        return math.exp(exponent)
+
+    def _tree_add(self, slot, delta):
+        i = slot + 1
+        tree = self._tree
+        size = len(tree)
+        while i < size:
+            tree[i] += delta
+            i += i & -i
+
+    def _rebuild_tree(self, capacity):
+        tree = [0.0] * (capacity + 1)
+        for slot, weight in enumerate(self._weights):
+            tree[slot + 1] += weight
+        for i in range(1, capacity + 1):
+            parent = i + (i & -i)
+            if parent <= capacity:
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def __setitem__(self, name, a_good):
+        weight = self._weight(a_good)
+        slot = self._slots.get(name)
+        if slot is None:
+            slot = len(self._weights)
+            self._weights.append(weight)
+            if slot + 1 >= len(self._tree):
+                super().__setitem__(name, a_good)
+                self._rebuild_tree(2 * len(self._tree))
+                return
+            self._tree_add(slot, weight)
+        else:
+            self._tree_add(slot, weight - self._weights[slot])
+            self._weights[slot] = weight
+        super().__setitem__(name, a_good)
+
+    def pop(self, name, *default):
+        """ Remove the item posted by ``name`` and return it """
+        slot = self._slots.get(name)
+        if slot is not None:
+            last = len(self._weights) - 1
+            last_weight = self._weights.pop()
+            if slot < last:
+                self._tree_add(slot, last_weight - self._weights[slot])
+                self._weights[slot] = last_weight
+            self._tree_add(last, -last_weight)
+        return super().pop(name, *default)
+
+    def popitem(self):
+        """ Remove and return a (name, good) pair drawn by logit choice """
+        if not self._values:
+            raise KeyError("popitem(): book is empty")
+        name = self._keys[self._draw_slot()]
+        return name, self.pop(name)
+
+    def clear(self):
+        super().clear()
+        self._weights.clear()
+        self._tree = [0.0] * len(self._tree)
+        self._reference_price = None
+
+    def _draw_slot(self):
+        tree = self._tree
+        target = random.random() * self._total()
+        slot = 0
+        step = 1 << (len(tree) - 1).bit_length()
+        while step:
+            nxt = slot + step
+            if nxt < len(tree) and tree[nxt] <= target:
+                slot = nxt
+                target -= tree[nxt]
+            step >>= 1
+        return min(slot, len(self._values) - 1)
+
+    def _total(self):
+        total = 0.0
+        i = len(self._weights)
+        tree = self._tree
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+    def random_value(self):
+        """ Return a good drawn by logit choice without removing it """
+        return self._values[self._draw_slot()]
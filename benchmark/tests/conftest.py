@@ -0,0 +1,73 @@
+import os
+import sys
+import types
+
+# the tests import the packages of the benchmark model (agents, spaces)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _ecosimpy_stand_in():
+    """Minimal EcoSimpy with the base classes the model subclasses
+
+    Used only when EcoSimpy is not installed. The agents and spaces of
+    the tests are created by hand, without a Simulation or a schedule.
+    """
+    module = types.ModuleType("EcoSimpy")
+
+    class DiscreteEventAgent:
+        def __init__(self, simulation, scenario, agent_number, agent_def):
+            self.simulation = simulation
+            self.active_scenario = scenario
+            self.agent_number = agent_number
+            self.name = "%s_%s" % (agent_def.get("agent_prefix", "A"), agent_number)
+            self.spaces = {}
+
+        def get_a_space(self, name):
+            return self.spaces[name]
+
+    class Space:
+        def __init__(self, model, name, variables):
+            self.model = model
+            self.name = name
+            for variable, value in (variables or {}).items():
+                setattr(self, variable, value)
+
+    module.DiscreteEventAgent = DiscreteEventAgent
+    module.Space = Space
+    return module
+
+
+try:
+    import EcoSimpy  # noqa: F401
+except ImportError:
+    sys.modules["EcoSimpy"] = _ecosimpy_stand_in()
+
+import pytest  # noqa: E402
+
+from agents.clock import clock  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def new_simulation():
+    """Every test is a new simulation of the shared clock"""
+    clock.reset()
+    yield
+    clock.reset()
+
+
+# scenario_variables of scenarios/scenarios.json
+SCENARIO_VARIABLES = {"expect_lambda": 0.25, "nu": 0.1, "l_k": 0.1, "mu_k": 1, "mu_n": 1,
+                      "r_bar": 0.4345, "u_bar": 0.8, "gamma_1": 0.01, "gamma_2": 0.02,
+                      "upsilon": 0.02, "mu_ct": 0.318857, "u_w": 0.08, "eta": 20, "kappa": 20}
+
+
+class Scenario:
+    """Active scenario with the scenario variables of the benchmark"""
+
+    def get_scenario_variable(self, name):
+        return SCENARIO_VARIABLES[name]
+
+
+@pytest.fixture
+def scenario():
+    return Scenario()
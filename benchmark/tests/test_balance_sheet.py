@@ -0,0 +1,55 @@
+import pytest
+
+from agents.balance_sheet import BalanceSheet
+from agents.clock import clock
+from agents.goods import CapitalGood, Loan
+from agents.loan_book import AGGREGATE_LOAN_ID
+
+
+def test_empty_loan_book_books_no_loan_liability():
+    balance_sheet = BalanceSheet(None)
+    for _ in range(3):
+        balance_sheet.close_loan_period()
+    assert "loan" not in balance_sheet.liabilities
+
+
+def test_loan_liability_follows_the_loan_book():
+    balance_sheet = BalanceSheet(None)
+    balance_sheet.include_loan(Loan(c_quantity=100.0, c_price=0.05), n_term=2)
+    assert balance_sheet.liabilities["loan"].c_quantity == pytest.approx(100.0)
+    # the first term is due in the step after the loan is granted
+    balance_sheet.close_loan_period()
+    clock.advance()
+    assert balance_sheet.liabilities["loan"].c_quantity == pytest.approx(100.0)
+    balance_sheet.close_loan_period()
+    clock.advance()
+    balance_sheet.close_loan_period()
+    assert balance_sheet.liabilities["loan"].c_quantity == 0.0
+
+
+def test_loan_liability_takes_no_loan_id():
+    balance_sheet = BalanceSheet(None)
+    a_loan = Loan(c_quantity=100.0, c_price=0.05)
+    balance_sheet.include_loan(a_loan, n_term=2)
+    assert balance_sheet.liabilities["loan"].c_id == AGGREGATE_LOAN_ID
+    assert Loan(c_quantity=1.0, c_price=0.05).c_id == a_loan.c_id + 1
+
+
+def test_report_values_the_goods_and_the_capital_stock():
+    balance_sheet = BalanceSheet(None, cash=100.0)
+    balance_sheet.add_capital_stock(CapitalGood(c_quantity=2.0, c_price=10.0))
+    balance_sheet.add_capital_stock(CapitalGood(c_quantity=1.0, c_price=5.0), productivity=0.5)
+    balance_sheet.add_liability("bond", 30.0)
+
+    assert [k_good.c_id for k_good in balance_sheet.capital_stock.values()] == [1, 2]
+    report = balance_sheet.generate_report()
+    assert "1: $20.0\n2: $5.0\n" in report
+    assert "Total Assets: $125.0\n" in report
+    assert "Total Liabilities: $30.0\n" in report
+    assert "Total Capital Stock: $25.0\n" in report
+    assert "Net Worth: $95.0\n" in report
+
+
+def test_capital_stock_takes_only_capital_goods():
+    with pytest.raises(TypeError):
+        BalanceSheet(None).add_capital_stock(Loan(c_quantity=1.0, c_price=0.05))
@@ -0,0 +1,57 @@
+import pytest
+
+from agents.agents import EconomicAgent
+from agents.bank import Bank
+from agents.bookkeeper import CGFirmBookkeeper
+from agents.clock import clock
+
+
+def make_bank(cash):
+    bank = Bank(None, None, 0, {"agent_prefix": "BK"})
+    bank.bookkeeper.balance_sheet.assets["cash"].c_quantity = cash
+    return bank
+
+
+def make_firm():
+    firm = EconomicAgent(None, None, 0, {"agent_prefix": "CG"})
+    firm.bookkeeper = CGFirmBookkeeper(firm)
+    return firm
+
+
+def cash(agent):
+    return agent.bookkeeper.balance_sheet.assets["cash"].c_quantity
+
+
+def test_bank_without_cash_grants_no_loan():
+    bank, firm = make_bank(50.0), make_firm()
+    assert bank.grant_loan(firm, 100.0, 0.05, 4) is None
+    assert (cash(bank), cash(firm)) == (50.0, 0.0)
+    assert len(bank.loan_book) == 0
+    assert "loan" not in firm.bookkeeper.balance_sheet.liabilities
+
+
+@pytest.mark.parametrize("bank_closes_first", [True, False])
+def test_lender_and_borrower_book_the_same_terms(bank_closes_first):
+    bank, firm = make_bank(1000.0), make_firm()
+    firm.bookkeeper.balance_sheet.assets["cash"].c_quantity = 50.0
+    paid, received = [], []
+    for step in range(5):
+        if bank_closes_first:
+            bank.compute_interest_loans()
+        if step == 1:
+            a_loan = bank.grant_loan(firm, 100.0, 0.05, 2)
+            assert (cash(bank), cash(firm)) == (900.0, 150.0)
+        firm_book = firm.bookkeeper.balance_sheet.loans
+        paid.append(firm_book.total_due())
+        firm.bookkeeper.pay_loans()
+        if not bank_closes_first:
+            bank.compute_interest_loans()
+        received.append(bank.interest_on_loans + bank.principal_on_loans)
+        clock.advance()
+
+    assert int(bank.loan_book.start[0]) == int(firm_book.start[0]) == 2
+    assert paid == pytest.approx(received)
+    assert paid[:2] == [0.0, 0.0] and paid[4] == 0.0
+    assert a_loan.c_id not in bank.loan_book and a_loan.c_id not in firm_book
+    assert cash(bank) == pytest.approx(900.0 + paid[2] + paid[3])
+    assert cash(firm) == pytest.approx(150.0 - paid[2] - paid[3])
@@ -0,0 +1,53 @@
+import random
+
+import pytest
+
+from agents.agents import EconomicAgent
+from agents.bookkeeper import CGFirmBookkeeper, FirmBookkeeper
+from agents.goods import CapitalGood, Labor
+
+
+class Worker(EconomicAgent):
+    employed = False
+
+    def is_employed(self):
+        self.employed = True
+
+    def is_unemployed(self):
+        self.employed = False
+
+
+def make_firm(bookkeeper=FirmBookkeeper):
+    return bookkeeper(EconomicAgent(None, None, 0, {"agent_prefix": "CG"}))
+
+
+def test_wage_bill_follows_hires_and_lay_offs():
+    random.seed(1)
+    bookkeeper = make_firm()
+    workers = [Worker(None, None, i, {"agent_prefix": "HH"}) for i in range(30)]
+    for step in range(5):
+        bookkeeper.add_to_workforce({
+            worker.name: Labor(c_quantity=random.uniform(0.5, 1.5),
+                               c_price=random.uniform(1.0, 3.0), c_producer=worker)
+            for worker in random.sample(workers, 10)})
+        bookkeeper.lay_off(3)
+        expected = sum(labor.ammount() for labor in bookkeeper.workforce.values())
+        assert bookkeeper.labor_costs() == pytest.approx(expected)
+        assert all(worker.employed == (worker in bookkeeper.workforce) for worker in workers)
+
+    for worker in list(bookkeeper.workforce):
+        bookkeeper.remove_from_workforce(worker)
+    assert bookkeeper.labor_costs() == 0.0
+
+
+def test_capital_costs_follow_purchases_and_scrapping():
+    bookkeeper = make_firm(CGFirmBookkeeper)
+    kappa = 3
+    for step in range(6):
+        bookkeeper.add_to_capital_stock({
+            "KG_%d" % i: CapitalGood(c_quantity=1.0 + i, c_price=2.0 + step) for i in range(2)})
+        bookkeeper.depreciate_capital(kappa)
+        stock = bookkeeper.balance_sheet.capital_stock
+        expected = sum(k.c_quantity * k.c_price for k in stock.values()) / kappa
+        assert bookkeeper.capital_costs(kappa) == pytest.approx(expected)
+    assert len(bookkeeper.balance_sheet.capital_stock) == 2 * kappa
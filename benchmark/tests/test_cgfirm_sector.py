@@ -0,0 +1,87 @@
+import random
+
+import numpy as np
+import pytest
+
+from agents.cgfirm import CGFirm
+from agents.cgfirm_sector import CGFirmSector
+from agents.rng import RNGService
+from spaces import CGMarket, LaborMarket
+
+FIELDS = ("Se_ct", "yd_ct_q", "ud_ct", "Ndc_t", "mu_ct", "p_ct", "g_ct")
+
+
+def run(scenario, sector, monkeypatch, firms=6, steps=4, seed=5):
+    """Step the CG firms, agent by agent or with the sector, and
+    return the fields of every step"""
+    # produce() overwrites the price, keep the one set in the step
+    produce = CGFirm.produce
+
+    def keep_price(firm):
+        firm.p_ct = firm.y_ct.c_price
+        produce(firm)
+
+    monkeypatch.setattr(CGFirm, "produce", keep_price)
+    random.seed(seed)
+    np.random.seed(seed)
+    rng = RNGService(seed=seed).activate()
+    if sector:
+        sector = CGFirmSector().activate()
+    markets = {"CG_Market": CGMarket(None, "CG_Market", {"market_type": "lop",
+                                                          "clearing": "batch"}),
+               "Labor_Market": LaborMarket(None, "Labor_Market", {"market_type": "lop",
+                                                                  "clearing": "batch"})}
+    population = []
+    for i in range(firms):
+        firm = CGFirm(None, scenario, i, {"agent_prefix": "CG"})
+        firm.spaces = markets
+        firm.W_ct, firm.mu_ct, firm.R_ct = 10.0 + i, 0.3, 5.0 + i
+        population.append(firm)
+
+    values = []
+    try:
+        for step in range(steps):
+            for i, firm in enumerate(population):
+                if step > 0:
+                    # the markets do not sell anything, keep the firms
+                    # out of the corners (no output, no mark-up change)
+                    firm.inv_ct_1.c_quantity = 2.0 + 4.0 * i + step
+                    firm.K_ct.c_quantity = 60.0 + 30.0 * i
+            for firm in population:
+                firm.step()
+            values.append([(firm.Se_ct, firm.yd_ct_q, firm.ud_ct, firm.Ndc_t, firm.mu_ct,
+                            firm.p_ct, firm.g_ct) for firm in population])
+            for market in markets.values():
+                market.update()
+    finally:
+        rng.deactivate()
+        if sector:
+            sector.deactivate()
+    return values
+
+
+def test_sector_steps_the_firms_as_the_agent_by_agent_path(scenario, monkeypatch):
+    scalar = run(scenario, False, monkeypatch)
+    vectorized = run(scenario, True, monkeypatch)
+    for step, (expected, computed) in enumerate(zip(scalar, vectorized)):
+        for firm, (a_firm, b_firm) in enumerate(zip(expected, computed)):
+            for field, a, b in zip(FIELDS, a_firm, b_firm):
+                assert b == pytest.approx(a, rel=1e-12, abs=1e-12), (step, firm, field)
+
+
+def test_sector_computes_once_per_clock_step(scenario):
+    sector = CGFirmSector().activate()
+    try:
+        firm = CGFirm(None, scenario, 0, {"agent_prefix": "CG"})
+        firm.Se_ct, firm.W_ct, firm.mu_ct, firm.R_ct = 80.0, 10.0, 1.0, 5.0
+        firm.spaces = {"CG_Market": CGMarket(None, "CG_Market", {}),
+                       "Labor_Market": LaborMarket(None, "Labor_Market", {})}
+        firm.step()                     # joins the sector
+        firm.step()
+        computed = sector.step_computed
+        firm.Se_ct = 1000.0
+        firm.step()                     # same step, same values
+        assert sector.step_computed == computed
+        assert firm.Se_ct != 1000.0
+    finally:
+        sector.deactivate()
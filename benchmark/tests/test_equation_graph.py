@@ -0,0 +1,58 @@
+from types import SimpleNamespace
+
+import pytest
+
+from agents import model_equations
+from agents.cgfirm import CG_FIRM_EQUATIONS, CGFirm
+from agents.equation_graph import EquationGraph, EquationValues
+
+
+def profit_graph():
+    graph = EquationGraph()
+    graph.add("C_ct", model_equations.C_ct, ("W_ct", "Lp_ct", "C_kct"))
+    graph.add("R_ct", model_equations.R_ct, ("Sr_ct", "I_d", "Inv_c"))
+    graph.add("pi_ct", model_equations.pi_ct, ("R_ct", "C_ct"))
+    return graph
+
+
+def test_cgfirm_outputs_do_not_need_the_profits():
+    values = EquationValues(CG_FIRM_EQUATIONS, None, CGFirm.equation_outputs)
+    assert "pi_ct" not in values.needed
+    assert {"C_ct", "R_ct", "labor_costs", "sales_revenue"} <= values.needed
+
+    values = EquationValues(CG_FIRM_EQUATIONS, None, CGFirm.equation_outputs + ("pi_ct",))
+    assert "pi_ct" in values.needed
+
+
+def test_values_are_evaluated_once_per_step():
+    calls = []
+
+    def counted(*args):
+        calls.append(args)
+        return model_equations.C_ct(*args)
+
+    graph = EquationGraph()
+    graph.add("C_ct", counted, ("W_ct", "Lp_ct", "C_kct"))
+    graph.add("pi_ct", model_equations.pi_ct, ("R_ct", "C_ct"))
+    agent = SimpleNamespace(W_ct=3.0, Lp_ct=1.0, C_kct=2.0, R_ct=10.0)
+    values = EquationValues(graph, agent, outputs=("pi_ct",))
+
+    assert values["pi_ct"] == 4.0
+    assert values["C_ct"] == 6.0
+    assert len(calls) == 1
+
+    values.clear()
+    agent.W_ct = 5.0
+    assert "C_ct" not in values
+    assert values["pi_ct"] == 2.0
+    assert len(calls) == 2
+
+
+def test_graph_rejects_duplicates_and_cycles():
+    graph = profit_graph()
+    with pytest.raises(NameError):
+        graph.add("pi_ct", model_equations.pi_ct, ("R_ct", "C_ct"))
+    with pytest.raises(ValueError):
+        graph.add("W_ct", model_equations.W_ct, ("pi_ct",))
+    assert graph.dependencies(("C_ct",)) == {"C_ct"}
+    assert graph.dependencies(("pi_ct",)) == {"pi_ct", "R_ct", "C_ct"}
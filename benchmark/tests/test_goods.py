@@ -0,0 +1,21 @@
+from agents.agents import EconomicAgent
+from agents.bookkeeper import FirmBookkeeper
+from agents.goods import CapitalGood, ConsumptionGood, PartialFill
+
+
+def test_partial_fill_of_capital_good_enters_capital_stock():
+    offer = CapitalGood(c_quantity=10.0, c_price=2.0)
+    a_fill = offer.partial_fill(3.0)
+    assert isinstance(a_fill, CapitalGood)
+    assert (a_fill.c_quantity, a_fill.c_price, offer.c_quantity) == (3.0, 2.0, 10.0)
+
+    bookkeeper = FirmBookkeeper(EconomicAgent(None, None, 0, {"agent_prefix": "CG"}))
+    bookkeeper.add_to_capital_stock({"KG_0": a_fill})
+    assert a_fill.c_id == 1
+    assert a_fill.c_owner is bookkeeper.owner
+
+
+def test_partial_fill_of_consumption_good_is_a_record():
+    a_fill = ConsumptionGood(c_quantity=10.0, c_price=2.0).partial_fill(3.0)
+    assert isinstance(a_fill, PartialFill)
+    assert a_fill.ammount() == 6.0
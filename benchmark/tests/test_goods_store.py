@@ -0,0 +1,57 @@
+import gc
+import weakref
+
+import pytest
+
+from agents.goods import CapitalGood, GoodCategory, Labor
+from agents.goods_store import GoodsStore, StoredGood
+
+
+@pytest.fixture
+def store():
+    store = GoodsStore().activate()
+    yield store
+    store.deactivate()
+
+
+def test_default_quantity_and_price_are_stored_as_zero(store):
+    goods = [Labor(), CapitalGood(), Labor(c_quantity=2.0, c_price=3.0)]
+    assert (goods[0].c_quantity, goods[0].c_price) == (0.0, 0.0)
+    assert store.total_value() == 6.0
+    assert store.wage_bill() == 6.0
+    assert store.total_quantity(GoodCategory.KG) == 0.0
+
+
+@pytest.mark.parametrize("stored_offer", [True, False])
+def test_partial_fill_copies_between_views_and_plain_goods(store, stored_offer):
+    if not stored_offer:
+        store.deactivate()
+    offer = CapitalGood(c_quantity=10.0, c_price=2.0, c_producer="KG_1")
+    offer.c_id = 7
+    if stored_offer:
+        store.deactivate()
+    else:
+        store.activate()
+
+    a_fill = offer.partial_fill(3.0)
+    assert isinstance(offer, StoredGood) != isinstance(a_fill, StoredGood)
+    assert (a_fill.c_id, a_fill.c_quantity, a_fill.c_price) == (7, 3.0, 2.0)
+    assert a_fill.c_category == GoodCategory.KG
+
+
+def test_store_does_not_keep_agents_alive(store):
+    class Agent:
+        pass
+
+    owner, producer = Agent(), Agent()
+    a_good = Labor(c_quantity=2.0, c_price=3.0, c_owner=owner, c_producer=producer)
+    assert a_good.c_owner is owner
+    assert store.total_value(owner=owner) == 6.0
+
+    gone = weakref.ref(owner)
+    del owner
+    gc.collect()
+    assert gone() is None
+    assert a_good.c_owner is None
+    assert a_good.c_producer is producer
+    assert store.by_owner(value=True).tolist() == [6.0, 0.0]
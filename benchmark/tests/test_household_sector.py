@@ -0,0 +1,128 @@
+import random
+
+import numpy as np
+import pytest
+
+from agents.household import Household
+from agents.household_sector import HouseholdSector
+from agents.rng import RNGService
+from spaces import CGMarket, LaborMarket
+
+FIELDS = ("pe_ht_1", "pe_ht", "wd_ht_1", "wd_ht", "u_ht_n", "labor_qnt", "offer_quantity",
+          "offer_price", "income", "q_cg", "unemployed")
+
+
+def state(household):
+    return (household.pe_ht_1, household.pe_ht, household.wd_ht_1, household.wd_ht,
+            household.u_ht_n, household.labor_qnt, household.offered_labor.c_quantity,
+            household.offered_labor.c_price, household.income,
+            household.consumption_good.c_quantity, household.unemployed)
+
+
+def run(scenario, sector, interleaved=False, households=8, steps=4, seed=3):
+    """Step the households, agent by agent or with the sector, and
+    return their state after every step
+
+    From the second step on, a firm lays off a household at every step,
+    before the households step or, if interleaved, just before that
+    household steps (after the sector was computed).
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+    rng = RNGService(seed=seed).activate()
+    if sector:
+        sector = HouseholdSector().activate()
+    markets = {"CG_Market": CGMarket(None, "CG_Market", {"market_type": "lop",
+                                                          "clearing": "batch"}),
+               "Labor_Market": LaborMarket(None, "Labor_Market", {"market_type": "lop",
+                                                                  "clearing": "batch"})}
+    population = []
+    for i in range(households):
+        household = Household(None, scenario, i, {"agent_prefix": "HH"})
+        household.spaces = markets
+        household.pe_ht = household.pe_ht_1 = 1.0 + 0.1 * i
+        household.wd_ht = household.wd_ht_1 = household.hourly_wage = 10.0 + i
+        household.u_ht_n = 0
+        household.labor_qnt = household.demand_qnt = 1.0
+        household.income = 0.0
+        household.unemployed = i % 3 == 0
+        population.append(household)
+
+    values = []
+    try:
+        for step in range(steps):
+            laid_off = population[(3 * step + 1) % households] if step else None
+            if laid_off is not None and not interleaved:
+                laid_off.is_unemployed()
+            for household in population:
+                if interleaved and household is laid_off:
+                    laid_off.is_unemployed()
+                household.step()
+            values.append([state(household) for household in population])
+            for market in markets.values():
+                market.update()
+    finally:
+        rng.deactivate()
+        if sector:
+            sector.deactivate()
+    return values
+
+
+def test_sector_steps_the_households_as_the_agent_by_agent_path(scenario):
+    scalar = run(scenario, False)
+    vectorized = run(scenario, True)
+    for step, (expected, computed) in enumerate(zip(scalar, vectorized)):
+        for household, (a_household, b_household) in enumerate(zip(expected, computed)):
+            for field, a, b in zip(FIELDS, a_household, b_household):
+                assert b == pytest.approx(a, rel=1e-12, abs=1e-12), (step, household, field)
+
+
+def test_household_laid_off_after_the_sector_computed_offers_its_labor(scenario):
+    scalar = run(scenario, False, interleaved=True)
+    vectorized = run(scenario, True, interleaved=True)
+    # the reservation wages are random draws, the rest of the state
+    # follows the same path
+    deterministic = ("pe_ht_1", "pe_ht", "u_ht_n", "labor_qnt", "offer_quantity", "income",
+                     "q_cg", "unemployed")
+    for step, (expected, computed) in enumerate(zip(scalar, vectorized)):
+        for household, (a_household, b_household) in enumerate(zip(expected, computed)):
+            a_state, b_state = dict(zip(FIELDS, a_household)), dict(zip(FIELDS, b_household))
+            for field in deterministic:
+                assert b_state[field] == pytest.approx(a_state[field]), (step, household, field)
+            if b_state["unemployed"]:
+                # a second draw, offered at the new reservation wage
+                assert b_state["offer_price"] == b_state["wd_ht"]
+                assert b_state["wd_ht"] != b_state["wd_ht_1"]
+
+
+def test_sector_computes_a_laid_off_household_again(scenario):
+    sector = HouseholdSector().activate()
+    try:
+        markets = {"CG_Market": CGMarket(None, "CG_Market", {"market_type": "lop",
+                                                              "clearing": "batch"}),
+                   "Labor_Market": LaborMarket(None, "Labor_Market", {"market_type": "lop",
+                                                                      "clearing": "batch"})}
+        population = []
+        for i in range(2):
+            household = Household(None, scenario, i, {"agent_prefix": "HH"})
+            household.spaces = markets
+            household.pe_ht = household.pe_ht_1 = 1.0
+            household.wd_ht = household.wd_ht_1 = household.hourly_wage = 10.0
+            household.u_ht_n = 0
+            household.labor_qnt = household.demand_qnt = 1.0
+            household.income = 0.0
+            household.unemployed = False
+            household.step()            # joins the sector
+            population.append(household)
+        for market in markets.values():
+            market.update()
+
+        first, second = population
+        first.step()                    # computes the sector
+        second.is_unemployed()
+        second.step()
+        assert second.u_ht_n == 1
+        assert second.offered_labor.c_price == second.wd_ht
+        assert sector.values["unemployed"][sector.rows[second]] == 1
+    finally:
+        sector.deactivate()
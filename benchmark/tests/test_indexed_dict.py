@@ -0,0 +1,25 @@
+import random
+
+import pytest
+
+from agents.indexed_dict import IndexedDict
+from agents.workforce import Workforce
+from spaces.order_book import OfferBook
+
+
+@pytest.mark.parametrize("container", [IndexedDict, Workforce, OfferBook])
+def test_behaves_like_a_dict(container):
+    items, reference = container(), {}
+    rng = random.Random(0)
+    for n in range(500):
+        key = rng.randrange(50)
+        if rng.random() < 0.6:
+            items[key] = reference[key] = n
+        else:
+            assert items.pop(key, None) == reference.pop(key, None)
+        assert len(items) == len(reference)
+    assert dict(items.items()) == reference
+    assert sorted(items) == sorted(reference)
+    assert all(items[key] == value for key, value in reference.items())
+    assert items.random_value() in reference.values()
+    assert set(items.sample_keys(len(items) + 5)) == set(reference)
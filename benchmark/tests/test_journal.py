@@ -0,0 +1,58 @@
+import pytest
+
+from agents.agents import EconomicAgent
+from agents.clock import SimulationClock
+from agents.goods import ConsumptionGood, GoodCategory
+from agents.journal import TransactionJournal
+from spaces import CGMarket, LaborMarket
+
+
+def make_agent(prefix, number, cash):
+    agent = EconomicAgent(None, None, number, {"agent_prefix": prefix})
+    agent.bookkeeper.balance_sheet.assets["cash"].c_quantity = cash
+    return agent
+
+
+def test_clock_ends_the_step_when_all_markets_cleared():
+    clock = SimulationClock()
+    clock.register("CG_Market")
+    clock.register("Labor_Market")
+    clock.cleared("CG_Market")
+    assert clock.step == 0
+    clock.cleared("Labor_Market")
+    assert clock.step == 1
+
+    # a market clearing twice starts a new step too
+    clock.cleared("CG_Market")
+    clock.cleared("CG_Market")
+    assert clock.step == 2
+
+    # registering after the clock ran is a new simulation
+    clock.register("CG_Market")
+    assert (clock.step, clock.markets) == (0, {"CG_Market"})
+
+
+def test_payments_are_labeled_with_the_step_they_are_made_in():
+    journal = TransactionJournal().activate()
+    try:
+        variables = {"market_type": "lop", "clearing": "batch", "record_transactions": True}
+        cg_market = CGMarket(None, "CG_Market", variables)
+        labor_market = LaborMarket(None, "Labor_Market", variables)
+        firm = make_agent("CG", 0, 100.0)
+        worker = make_agent("HH", 0, 100.0)
+
+        for step in range(3):
+            # wages are paid in the agent steps, before the markets clear
+            firm.bookkeeper.pay(worker, 5.0, GoodCategory.W)
+            firm.bookkeeper.set_offer(cg_market, ConsumptionGood(
+                c_quantity=1.0, c_price=2.0, c_owner=firm, c_producer=firm))
+            cg_market.set_demand(worker, ConsumptionGood(
+                c_quantity=1.0, c_price=2.0, c_owner=worker, c_producer=worker))
+            cg_market.update()
+            labor_market.update()
+    finally:
+        journal.deactivate()
+
+    rows = journal.rows()
+    assert rows["step"].tolist() == [0, 0, 1, 1, 2, 2]
+    assert rows["amount"].tolist() == pytest.approx([5.0, 2.0] * 3)
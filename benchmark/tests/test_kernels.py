@@ -0,0 +1,52 @@
+import inspect
+
+import numpy as np
+import pytest
+
+from agents import kernels
+
+# arguments not drawn as positive values
+SIGNED = ("pi_ct", "pi_kt", "OCF", "OCF_xt", "r_ct_prev", "gD_ct")
+FLAGS = ("Q_indicator", "indicator_g", "T_w", "u_hist")
+CONSTANTS = {"eta": 5, "t": 12}
+
+AGENTS = 64
+SEQUENCE = 6
+
+
+def random_arguments(name, equation, rng):
+    """Arrays of AGENTS agents (rows of SEQUENCE values for the
+    sequence arguments) for the arguments of an equation
+    """
+    sequences = kernels.REDUCTIONS.get(name, ())
+    args = []
+    for arg in inspect.signature(equation).parameters:
+        if arg in CONSTANTS:
+            args.append(CONSTANTS[arg])
+            continue
+        shape = (AGENTS, SEQUENCE) if arg in sequences else (AGENTS,)
+        if arg in FLAGS:
+            values = rng.integers(0, 2, size=shape).astype(float)
+        elif arg in SIGNED:
+            values = rng.uniform(-2.0, 2.0, size=shape)
+        else:
+            values = rng.uniform(0.5, 2.0, size=shape)
+        args.append(values)
+    return args
+
+
+def agent_arguments(args, i):
+    """Arguments of the scalar equation for agent i"""
+    return [arg if np.isscalar(arg) else (list(arg[i]) if arg.ndim == 2 else float(arg[i]))
+            for arg in args]
+
+
+@pytest.mark.parametrize("name", sorted(kernels.EQUATIONS))
+def test_kernel_matches_equation(name):
+    equation = kernels.EQUATIONS[name]
+    args = random_arguments(name, equation, np.random.default_rng(0))
+
+    with np.errstate(all="ignore"):
+        result = np.broadcast_to(getattr(kernels, name)(*args), (AGENTS,))
+        expected = [equation(*agent_arguments(args, i)) for i in range(AGENTS)]
+    np.testing.assert_allclose(result, np.array(expected, dtype=float), rtol=1e-9)
@@ -0,0 +1,23 @@
+import numpy as np
+import pytest
+
+from agents.balance_sheet import BalanceSheet
+from agents.ledger import Ledger
+
+
+@pytest.fixture
+def ledger():
+    ledger = Ledger().activate()
+    yield ledger
+    ledger.deactivate()
+
+
+def test_check_consistency_compares_the_expected_net_worth(ledger):
+    balance_sheets = [BalanceSheet(None), BalanceSheet(None)]
+    for balance_sheet, cash in zip(balance_sheets, (100.0, 50.0)):
+        balance_sheet.assets["cash"].c_quantity = cash
+
+    assert list(ledger.check_consistency([100.0, 50.0])) == []
+    assert list(ledger.check_consistency([100.0, 60.0])) == [1]
+    with pytest.raises(ValueError):
+        ledger.check_consistency(np.zeros(3))
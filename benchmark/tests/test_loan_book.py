@@ -0,0 +1,47 @@
+import pytest
+
+from agents.clock import SimulationClock, clock
+from agents.goods import Loan
+from agents.loan_book import LoanBook, LoanIdAllocator
+
+
+def test_loan_ids_follow_the_simulation_clock():
+    a_clock = SimulationClock()
+    allocator = LoanIdAllocator(clock=a_clock)
+    assert [allocator.next_id(), allocator.next_id()] == [0, 1]
+    a_clock.advance()
+    assert allocator.next_id() == LoanIdAllocator.STEP_SPAN
+    assert allocator.step == 1
+
+
+def test_loan_ids_of_workers_do_not_collide():
+    a_clock = SimulationClock()
+    allocators = [LoanIdAllocator(worker, 2, a_clock) for worker in range(2)]
+    ids = [allocator.next_id() for _ in range(3) for allocator in allocators]
+    assert ids == list(range(6))
+    with pytest.raises(ValueError):
+        LoanIdAllocator(2, 2)
+
+
+def test_every_simulation_gives_the_same_loan_ids():
+    def run():
+        ids = []
+        for step in range(3):
+            ids.extend(Loan(c_quantity=10.0, c_price=0.05).c_id for _ in range(2))
+            a_loan = Loan(c_quantity=10.0, c_price=0.05)
+            book = LoanBook()
+            book.book(a_loan, a_loan.c_id, n_term=2)
+            book.advance()
+            clock.advance()
+        return ids
+
+    first = run()
+    clock.reset()
+    assert run() == first
+    assert first[:3] == [0, 1, LoanIdAllocator.STEP_SPAN]
+
+
+def test_loans_are_dated_with_the_clock_step():
+    clock.advance()
+    clock.advance()
+    assert Loan(c_quantity=10.0, c_price=0.05).date_contract == 2
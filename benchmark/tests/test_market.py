@@ -0,0 +1,106 @@
+import pytest
+
+from agents.agents import EconomicAgent
+from agents.goods import ConsumptionGood
+from spaces import CGMarket
+
+
+def make_agent(prefix, number, cash):
+    agent = EconomicAgent(None, None, number, {"agent_prefix": prefix})
+    agent.bookkeeper.balance_sheet.assets["cash"].c_quantity = cash
+    return agent
+
+
+def cash(agent):
+    return agent.bookkeeper.balance_sheet.assets["cash"].c_quantity
+
+
+def split_offer(variables):
+    """One offer of 10 units at 1.0 bought by demands of 4 and 10 units"""
+    market = CGMarket(None, "CG_Market", variables)
+    seller = make_agent("CG", 0, 100.0)
+    buyers = [make_agent("HH", 0, 100.0), make_agent("HH", 1, 100.0)]
+
+    seller.bookkeeper.set_offer(market, ConsumptionGood(c_quantity=10.0, c_price=1.0,
+                                                        c_owner=seller, c_producer=seller))
+    for buyer, quantity in zip(buyers, (4.0, 10.0)):
+        market.set_demand(buyer, ConsumptionGood(c_quantity=quantity, c_price=2.0,
+                                                 c_owner=buyer, c_producer=buyer))
+    market.update()
+    return market, seller, buyers
+
+
+def test_batch_split_offer_conserves_cash():
+    market, seller, buyers = split_offer({"market_type": "lop", "clearing": "batch"})
+
+    assert cash(seller) == pytest.approx(110.0)
+    assert sorted(cash(buyer) for buyer in buyers) == pytest.approx([94.0, 96.0])
+    assert market.full_fills == 1
+    assert market.partial_fills == 1
+
+
+def test_call_split_offer_conserves_cash():
+    market, seller, buyers = split_offer({"market_type": "call"})
+
+    price = market.clearing_price
+    assert cash(seller) == pytest.approx(100.0 + 10.0 * price)
+    assert sum(cash(buyer) for buyer in buyers) == pytest.approx(200.0 - 10.0 * price)
+    assert seller.bookkeeper.offer.c_price == pytest.approx(price)
+
+
+def test_random_offer_matching_draws_without_removing():
+    market = CGMarket(None, "CG_Market", {"market_type": "random"})
+    sellers = [make_agent("CG", i, 0.0) for i in range(20)]
+    for seller in sellers:
+        seller.bookkeeper.set_offer(market, ConsumptionGood(c_quantity=1.0, c_price=1.0,
+                                                            c_owner=seller, c_producer=seller))
+    drawn = {market.random_offer_matching().c_producer for _ in range(500)}
+    assert drawn == set(sellers)
+    assert len(market.offers) == 20
+
+
+@pytest.mark.parametrize("market_type", ["hop", "lop", "bhop", "blop"])
+def test_persistent_book_keeps_unsold_offers(market_type):
+    market = CGMarket(None, "CG_Market", {"market_type": market_type, "clearing": "batch",
+                                          "persistent_book": True, "intensity_of_choice": 1.0})
+    sellers = [make_agent("CG", i, 0.0) for i in range(3)]
+    offers = [ConsumptionGood(c_quantity=10.0, c_price=1.0 + i, c_owner=seller, c_producer=seller)
+              for i, seller in enumerate(sellers)]
+    for seller, offer in zip(sellers, offers):
+        seller.bookkeeper.set_offer(market, offer)
+    buyer = make_agent("HH", 0, 100.0)
+    market.set_demand(buyer, ConsumptionGood(c_quantity=4.0, c_price=2.0,
+                                             c_owner=buyer, c_producer=buyer))
+    market.update()
+
+    assert len(market.offers) == 3
+    assert sum(offer.c_quantity for offer in offers) == pytest.approx(26.0)
+    if market_type == "lop":
+        assert offers[0].c_quantity == pytest.approx(6.0)
+    elif market_type == "hop":
+        assert offers[2].c_quantity == pytest.approx(6.0)
+
+    # an unchanged offer is not posted again, a cancelled one leaves the book
+    sellers[1].bookkeeper.set_offer(market, offers[1])
+    offers[2].c_quantity = 0.0
+    sellers[2].bookkeeper.set_offer(market, offers[2])
+    assert set(market.offers) == {"CG_0", "CG_1"}
+
+
+def test_buyer_short_of_cash_only_takes_what_it_pays_for():
+    market = CGMarket(None, "CG_Market", {"market_type": "lop", "clearing": "batch"})
+    seller = make_agent("CG", 0, 0.0)
+    buyer = make_agent("HH", 0, 3.0)
+    offer = ConsumptionGood(c_quantity=10.0, c_price=1.0, c_owner=seller, c_producer=seller)
+    seller.bookkeeper.set_offer(market, offer)
+    market.set_demand(buyer, ConsumptionGood(c_quantity=5.0, c_price=1.0,
+                                             c_owner=buyer, c_producer=buyer))
+    broke = make_agent("HH", 1, 0.0)
+    market.set_demand(broke, ConsumptionGood(c_quantity=5.0, c_price=1.0,
+                                             c_owner=broke, c_producer=broke))
+    market.update()
+
+    assert (cash(seller), cash(buyer), cash(broke)) == pytest.approx((3.0, 0.0, 0.0))
+    assert offer.c_quantity == pytest.approx(7.0)
+    assert offer.c_owner is seller
+    assert market.unmet_demand == pytest.approx(7.0)
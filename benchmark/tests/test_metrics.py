@@ -0,0 +1,54 @@
+import csv
+
+import pytest
+
+from agents.agents import EconomicAgent
+from agents.goods import ConsumptionGood
+from spaces import CGMarket
+
+
+def make_agent(prefix, number):
+    agent = EconomicAgent(None, None, number, {"agent_prefix": prefix})
+    agent.bookkeeper.balance_sheet.assets["cash"].c_quantity = 100.0
+    return agent
+
+
+def post(market, sellers, buyers, offered, demanded):
+    for seller, quantity in zip(sellers, offered):
+        seller.bookkeeper.set_offer(market, ConsumptionGood(c_quantity=quantity, c_price=1.0,
+                                                            c_owner=seller, c_producer=seller))
+    for buyer, quantity in zip(buyers, demanded):
+        market.set_demand(buyer, ConsumptionGood(c_quantity=quantity, c_price=1.0,
+                                                 c_owner=buyer, c_producer=buyer))
+
+
+def test_metrics_of_every_step(tmp_path):
+    market = CGMarket(None, "CG_Market", {"market_type": "lop", "clearing": "batch",
+                                          "collect_metrics": True,
+                                          "metrics_path": str(tmp_path),
+                                          "metrics_flush_every": 100})
+    sellers = [make_agent("CG", i) for i in range(2)]
+    buyers = [make_agent("HH", i) for i in range(3)]
+
+    post(market, sellers, buyers, (5.0, 5.0), (4.0, 4.0, 4.0))    # 2 units unmet
+    market.update()
+    post(market, sellers[:1], buyers[:1], (5.0,), (2.0,))          # one partial fill
+    market.update()
+
+    rows = market.metrics.rows()
+    assert [row["step"] for row in rows] == [0, 1]
+    assert rows[0]["full_fills"] + rows[0]["partial_fills"] == 4
+    assert rows[0]["full_fills"] == 2
+    assert rows[0]["unmet_demand"] == pytest.approx(2.0)
+    assert (rows[0]["offer_depth"], rows[0]["demand_depth"]) == (2, 3)
+    assert (rows[1]["full_fills"], rows[1]["partial_fills"]) == (0, 1)
+    assert rows[1]["unmet_demand"] == 0.0
+    assert (rows[1]["offer_depth"], rows[1]["demand_depth"]) == (1, 1)
+    assert all(row["seconds"] >= 0.0 for row in rows)
+
+    market.metrics.flush()
+    with open(market.metrics.file_name(), newline="") as f:
+        written = list(csv.DictReader(f))
+    assert [row["step"] for row in written] == ["0", "1"]
+    assert written[0]["market"] == "CG_Market"
+    assert not market.metrics.rows()
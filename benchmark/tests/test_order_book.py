@@ -0,0 +1,73 @@
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from spaces.order_book import LogitBook, PriceBook
+
+
+def good(price, quantity=1.0):
+    return SimpleNamespace(c_price=price, c_quantity=quantity)
+
+
+def drain(book):
+    return [book.popitem()[1].c_price for _ in range(len(book))]
+
+
+@pytest.mark.parametrize("highest_first", [True, False])
+def test_price_book_pops_by_price(highest_first):
+    book = PriceBook(highest_first=highest_first)
+    prices = [random.Random(i).uniform(1.0, 5.0) for i in range(50)]
+    for i, price in enumerate(prices):
+        book["A_%d" % i] = good(price)
+    assert book.best_value().c_price == (max if highest_first else min)(prices)
+    assert drain(book) == sorted(prices, reverse=highest_first)
+
+
+def test_price_book_amend_and_cancel():
+    book = PriceBook(highest_first=False)
+    for i, price in enumerate([3.0, 1.0, 2.0]):
+        book["A_%d" % i] = good(price)
+    book["A_1"] = good(4.0)           # amended to a worse price
+    book["A_2"] = good(2.0, 5.0)      # amended at the same price
+    assert book.pop("A_0").c_price == 3.0
+    assert book["A_2"].c_quantity == 5.0
+    assert [name for name, _ in [book.popitem(), book.popitem()]] == ["A_2", "A_1"]
+    assert not book
+    with pytest.raises(KeyError):
+        book.popitem()
+
+
+def test_price_book_heap_stays_bounded_under_amends():
+    book = PriceBook(highest_first=True)
+    for step in range(200):
+        for i in range(10):
+            book["A_%d" % i] = good(float(step * 10 + i))
+    assert len(book) == 10
+    assert len(book._heap) <= 2 * len(book)
+    assert drain(book) == [float(199 * 10 + i) for i in reversed(range(10))]
+
+
+@pytest.mark.parametrize("sign", [1, -1])
+def test_logit_book_is_biased_to_the_price_side(sign):
+    random.seed(0)
+    book = LogitBook(intensity_of_choice=2.0, sign=sign)
+    for i, price in enumerate([1.0, 2.0, 3.0]):
+        book["A_%d" % i] = good(price)
+    draws = [book.random_value().c_price for _ in range(3000)]
+    favoured, other = (3.0, 1.0) if sign > 0 else (1.0, 3.0)
+    assert draws.count(favoured) > 10 * draws.count(other)
+
+
+def test_logit_book_amend_and_cancel():
+    random.seed(0)
+    book = LogitBook(intensity_of_choice=0.0, sign=1)
+    for i in range(5):
+        book["A_%d" % i] = good(1.0)
+    book["A_3"] = good(2.0)
+    assert book.pop("A_0").c_price == 1.0
+    assert book.pop("A_0", None) is None
+    draws = {book.random_value().c_price for _ in range(200)}
+    assert draws == {1.0, 2.0}
+    assert sorted(name for name, _ in [book.popitem() for _ in range(4)]) == \
+        ["A_1", "A_2", "A_3", "A_4"]
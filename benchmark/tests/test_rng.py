@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from agents.rng import RNGService
+
+
+def test_streams_do_not_depend_on_the_creation_order():
+    first = RNGService(seed=7)
+    household = first.stream("Household").lognormal(1.0, 0.03, size=5)
+    firm = first.stream("CGFirm").random(size=5)
+
+    second = RNGService(seed=7)
+    assert np.array_equal(second.stream("CGFirm").random(size=5), firm)
+    assert np.array_equal(second.stream("Household").lognormal(1.0, 0.03, size=5), household)
+    assert not np.array_equal(household, firm)
+
+
+def test_distributions_of_a_stream_are_independent():
+    first = RNGService(seed=7).stream("Household")
+    second = RNGService(seed=7).stream("Household")
+    second.normal(0.0, 1.0, size=10)
+    assert first.lognormal(1.0, 0.03) == second.lognormal(1.0, 0.03)
+
+
+@pytest.mark.parametrize("block_size", [1, 3, 4096])
+def test_scalar_and_batched_draws_give_the_same_sequence(block_size):
+    scalar = RNGService(seed=11, block_size=block_size).stream("CGFirm")
+    batched = RNGService(seed=11, block_size=block_size).stream("CGFirm")
+
+    draws = [scalar.lognormal(0.0, 0.1) for _ in range(7)]
+    assert batched.lognormal(0.0, 0.1, size=3).tolist() + \
+        batched.lognormal(0.0, 0.1, size=(2, 2)).ravel().tolist() == draws
+
+
+def test_workers_and_seeds_give_different_streams():
+    draws = RNGService(seed=1).stream("Bank").random(size=4)
+    assert not np.array_equal(RNGService(seed=1, worker=1).stream("Bank").random(size=4), draws)
+    assert not np.array_equal(RNGService(seed=2).stream("Bank").random(size=4), draws)
+
+
+def test_activate_routes_the_equations_to_the_service():
+    from agents.equations import Equations
+
+    class CGFirm:
+        pass
+
+    rng = RNGService(seed=3).activate()
+    try:
+        assert Equations.rng is rng
+        draws = Equations(None, CGFirm()).draw("lognormal", 0.0, 0.1, size=3)
+        assert np.array_equal(draws, RNGService(seed=3).stream("CGFirm").lognormal(0.0, 0.1, size=3))
+    finally:
+        rng.deactivate()
+    assert Equations.rng is None
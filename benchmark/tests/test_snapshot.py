@@ -0,0 +1,88 @@
+import pytest
+
+from agents.bank import Bank
+from agents.cgfirm import CGFirm
+from agents.clock import clock
+from agents.goods import CapitalGood, Labor
+from agents.household import Household
+from agents.ledger import Ledger
+from agents.snapshot import load_snapshot, save_snapshot
+
+
+class Scenario:
+    def get_scenario_variable(self, name):
+        return 1.0
+
+
+def cash(agent):
+    return agent.bookkeeper.balance_sheet.assets["cash"].c_quantity
+
+
+@pytest.fixture
+def ledger():
+    ledger = Ledger().activate()
+    yield ledger
+    ledger.deactivate()
+
+
+@pytest.fixture
+def economy(ledger):
+    scenario = Scenario()
+    households = [Household(None, scenario, i, {"agent_prefix": "HH"}) for i in range(3)]
+    firm = CGFirm(None, scenario, 0, {"agent_prefix": "CG"})
+    bank = Bank(None, scenario, 0, {"agent_prefix": "BK"})
+    for i, household in enumerate(households):
+        household.unemployed = True
+        household.pe_ht, household.u_ht_n = 2.0 + i, i
+        household.bookkeeper.balance_sheet.assets["cash"].c_quantity = 10.0 * i
+        household.bookkeeper.create_labor_capacity(Labor(c_quantity=1.0, c_price=5.0,
+                                                         c_producer=household))
+    firm.Se_ct, firm.mu_ct, firm.first = 80.0, 0.1, False
+    firm.scheduler_slot = 1    # not a state variable of the model
+    bank.zt = 3.0
+    bank.bookkeeper.balance_sheet.assets["cash"].c_quantity = 1000.0
+
+    firm.bookkeeper.add_to_workforce({
+        household.name: Labor(c_quantity=1.0, c_price=5.0 + i, c_producer=household)
+        for i, household in enumerate(households[:2])})
+    firm.bookkeeper.add_to_capital_stock({"KG_0": CapitalGood(c_quantity=2.0, c_price=4.0)})
+    bank.grant_loan(firm, 100.0, 0.05, 4)
+    clock.advance()
+    firm.bookkeeper.pay_loans()
+    bank.compute_interest_loans()
+    return households, firm, bank
+
+
+def test_snapshot_roundtrip(tmp_path, ledger, economy):
+    households, firm, bank = economy
+    agents = households + [firm, bank]
+    save_snapshot(str(tmp_path), agents)
+    saved_cash = [cash(an_agent) for an_agent in agents]
+    saved_outstanding = firm.bookkeeper.balance_sheet.loans.outstanding()
+
+    # run on: the state changes
+    households[0].pe_ht, firm.Se_ct, bank.zt = 9.0, 1.0, 9.0
+    firm.bookkeeper.remove_from_workforce(households[0])
+    firm.bookkeeper.depreciate_capital(0)
+    for an_agent in agents:
+        an_agent.bookkeeper.balance_sheet.assets["cash"].c_quantity += 7.0
+    firm.bookkeeper.posted_offer = ("CG_Market", 1.0, 2.0)
+    firm.scheduler_slot = 5
+
+    load_snapshot(str(tmp_path), agents)
+
+    assert [cash(an_agent) for an_agent in agents] == pytest.approx(saved_cash)
+    assert ledger.total("cash") == pytest.approx(sum(saved_cash))
+    assert [household.pe_ht for household in households] == [2.0, 3.0, 4.0]
+    assert [household.u_ht_n for household in households] == [0, 1, 2]
+    assert (firm.Se_ct, firm.mu_ct, firm.first, bank.zt) == (80.0, 0.1, False, 3.0)
+    assert firm.scheduler_slot == 5
+    assert firm.bookkeeper.posted_offer is None
+
+    workforce = firm.bookkeeper.workforce
+    assert set(workforce) == set(households[:2])
+    assert firm.bookkeeper.labor_costs() == pytest.approx(11.0)
+    assert firm.bookkeeper.balance_sheet.capital_stock.value == pytest.approx(8.0)
+    assert firm.bookkeeper.balance_sheet.loans.outstanding() == pytest.approx(saved_outstanding)
+    assert len(bank.loan_book) == 1
+    assert clock.step == 1